@@ -49,10 +49,18 @@ Kant develops the idea of respect for moral law and the difference between hypot
 """
 
 
-summarizer = Agent(
-    model = MODEL_GEMINI,
-    name = 'summarizer',
-    description = 'An academic summarizer specializing in philosophical texts.',
-    generate_content_config=types.GenerateContentConfig(temperature = 0.1),
-    instruction = SUMMARIZER_INSTRUCTION
-)
\ No newline at end of file
+def build_summarizer(model = MODEL_GEMINI, max_output_tokens = None):
+    """
+    Returns a new summarizer agent. ADK agents can only have one parent, so root_agent gets one instance
+    and the direct runners in services/adk_service.py get their own (one per model and output cap).
+    """
+    return Agent(
+        model = model,
+        name = 'summarizer',
+        description = 'An academic summarizer specializing in philosophical texts.',
+        generate_content_config=types.GenerateContentConfig(temperature = 0.1, max_output_tokens = max_output_tokens),
+        instruction = SUMMARIZER_INSTRUCTION
+    )
+
+
+summarizer = build_summarizer()
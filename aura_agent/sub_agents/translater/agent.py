@@ -29,11 +29,18 @@ The final output must contain **only** the translated text.
 """
 
 
-translater = Agent(
-    model = MODEL_GEMINI,
-    name = 'translater',
-    description = 'An academic translater specializing in philosophical texts.',
-    generate_content_config=types.GenerateContentConfig(temperature = 0.1),
-    instruction = TRANSLATER_INSTRUCTION
-)
-    
+def build_translater(model = MODEL_GEMINI, max_output_tokens = None):
+    """
+    Returns a new translater agent. ADK agents can only have one parent, so root_agent gets one instance
+    and the direct runners in services/adk_service.py get their own (one per model and output cap).
+    """
+    return Agent(
+        model = model,
+        name = 'translater',
+        description = 'An academic translater specializing in philosophical texts.',
+        generate_content_config=types.GenerateContentConfig(temperature = 0.1, max_output_tokens = max_output_tokens),
+        instruction = TRANSLATER_INSTRUCTION
+    )
+
+
+translater = build_translater()
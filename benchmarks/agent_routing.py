@@ -0,0 +1,101 @@
+"""
+Measures the cost of routing summaries and translations through root_agent.
+
+Runs the same request through root_agent (which picks the sub-agent and
+transfers control) and directly through the sub-agent's own Runner, and
+reports wall time, model calls and prompt/output tokens per request, taken
+from the usage metadata of the model responses. Needs GOOGLE_API_KEY; the
+result cache is bypassed so every request reaches the model.
+
+    python -m benchmarks.agent_routing path/to/chapter.pdf [--task summarize] [--repeat 3] [--max-tokens 4000]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from aura_agent.agent import root_agent
+from aura_agent.sub_agents.summarizer.agent import build_summarizer
+from aura_agent.sub_agents.translater.agent import build_translater
+from config.settings import APP_NAME_FOR_ADK, USER_ID
+from services.summarize import SUMMARY_PROMPT
+from services.translate import PARAGRAPH_PROMPT
+from utils.helpers import estimate_tokens
+
+# The prompts the UI sent to root_agent before the direct path existed.
+ROUTED_PROMPTS = {
+    'summarize': 'Summarize the following Philosophy chapter, user the summarizer sub-agent: {text}',
+    'translate': 'Translate the following text, use the translater sub-agent: {text}',
+}
+DIRECT_PROMPTS = {'summarize': SUMMARY_PROMPT, 'translate': PARAGRAPH_PROMPT}
+DIRECT_AGENTS = {'summarize': build_summarizer, 'translate': build_translater}
+
+
+def _load_text(path, max_tokens):
+    if path.endswith('.pdf'):
+        from utils.pdf_extract import extract_pages
+        from utils.text_normalize import normalize_pages
+
+        with open(path, 'rb') as f:
+            text, _ = normalize_pages(extract_pages(f.read()))
+    else:
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+    return text[:max_tokens * 4]
+
+
+async def _measure(runner, message):
+    """Runs one request in a new session; returns seconds, model calls, prompt tokens and output tokens."""
+    session_id = f"bench_{os.urandom(4).hex()}"
+    await runner.session_service.create_session(app_name=APP_NAME_FOR_ADK, user_id=USER_ID, session_id=session_id)
+    content = genai_types.Content(role='user', parts=[genai_types.Part(text=message)])
+    calls = prompt_tokens = output_tokens = 0
+    start = time.perf_counter()
+    async for event in runner.run_async(user_id=USER_ID, session_id=session_id, new_message=content):
+        usage = event.usage_metadata
+        if usage is not None and not event.partial:
+            calls += 1
+            prompt_tokens += usage.prompt_token_count or 0
+            output_tokens += usage.candidates_token_count or 0
+    return time.perf_counter() - start, calls, prompt_tokens, output_tokens
+
+
+async def _run(args):
+    text = _load_text(args.path, args.max_tokens)
+    runners = {
+        'routed (root_agent)': (Runner(agent=root_agent, app_name=APP_NAME_FOR_ADK, session_service=InMemorySessionService()),
+                                ROUTED_PROMPTS[args.task]),
+        'direct (sub-agent)': (Runner(agent=DIRECT_AGENTS[args.task](), app_name=APP_NAME_FOR_ADK, session_service=InMemorySessionService()),
+                               DIRECT_PROMPTS[args.task]),
+    }
+
+    print(f"task={args.task} input~{estimate_tokens(text)} tokens repeat={args.repeat}")
+    print(f"{'path':<22}{'seconds':>10}{'calls':>8}{'prompt tok':>12}{'output tok':>12}")
+    rows = {}
+    for name, (runner, prompt) in runners.items():
+        results = [await _measure(runner, prompt.format(length='', text=text)) for _ in range(args.repeat)]
+        rows[name] = [statistics.median(column) for column in zip(*results)]
+        seconds, calls, prompt_tokens, output_tokens = rows[name]
+        print(f"{name:<22}{seconds:>10.2f}{calls:>8.0f}{prompt_tokens:>12.0f}{output_tokens:>12.0f}")
+
+    (routed_s, _, routed_in, routed_out), (direct_s, _, direct_in, direct_out) = rows.values()
+    print(f"saved per request: {routed_s - direct_s:.2f}s, "
+          f"{routed_in - direct_in:.0f} prompt tokens, {routed_out - direct_out:.0f} output tokens")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path', help='A .pdf or a plain-text file')
+    parser.add_argument('--task', choices=sorted(ROUTED_PROMPTS), default='summarize')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-tokens', type=int, default=4_000, help='Truncate the input to about this many tokens')
+    asyncio.run(_run(parser.parse_args(argv)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Measures the globe figure payload and serialization time.
+
+Compares the original encoding (Python float lists for the mesh and ocean
+surface) with the typed-array export, with and without int16 quantization.
+
+    python -m benchmarks.globe_payload [--level high] [--points 15] [--repeat 20]
+
+Only server-side cost is measured here (figure construction + JSON encoding,
+which Streamlit performs on every rerun); browser render time has to be taken
+from the devtools performance panel.
+"""
+import argparse
+import gzip
+import statistics
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+
+from config.settings import GLOBE_LOD_LEVELS
+from utils import globe_payload
+from utils.globe import Globe
+
+
+def _as_lists(fig):
+    """Rebuilds a figure with every array converted to a Python list, as the original code sent it."""
+    data = []
+    for trace in fig.data:
+        trace = trace.to_plotly_json()
+        for key, value in trace.items():
+            if isinstance(value, np.ndarray):
+                trace[key] = value.astype(np.float64).tolist()
+        data.append(trace)
+    return go.Figure(data=data, layout=fig.layout)
+
+
+def _timed(fn, repeat):
+    """Returns the last result of fn() and its median wall time in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--level', default='high')
+    parser.add_argument('--points', type=int, default=15)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(42)
+    lon = rng.uniform(-180, 180, args.points)
+    lat = rng.uniform(-90, 90, args.points)
+
+    def build(quantize):
+        globe = Globe(lod_levels=GLOBE_LOD_LEVELS, quantize=quantize)
+        globe.create_figure(level=args.level)
+        globe.update_scatter_data(lon, lat)
+        return globe
+
+    rows = []
+    for name, quantize, encode in [
+        ('float lists (original)', False, lambda g: globe_payload.figure_to_json(_as_lists(g.fig))),
+        ('float32 typed arrays', False, lambda g: globe_payload.figure_to_json(g.fig)),
+        ('int16 quantized', True, lambda g: globe_payload.figure_to_json(g.fig)),
+    ]:
+        globe = build(quantize)
+        payload, ms = _timed(lambda: encode(globe), args.repeat)
+        raw = payload.encode('utf-8')
+        rows.append((name, len(raw), len(gzip.compress(raw)), ms))
+
+    print(f"level={args.level} points={args.points} repeat={args.repeat}")
+    print(f"{'encoding':<26}{'bytes':>12}{'gzip bytes':>12}{'encode ms':>12}")
+    for name, size, gz_size, ms in rows:
+        print(f"{name:<26}{size:>12}{gz_size:>12}{ms:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
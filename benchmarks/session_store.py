@@ -0,0 +1,102 @@
+"""
+Measures ADK session memory and get_session latency for the session backends.
+
+Fills InMemorySessionService (the original backend) and SqliteSessionService
+with the same sessions, each holding a few turns that carry a document of
+--doc-tokens estimated tokens, the way the app's summaries and translations
+used to. Reports memory per session (traced Python allocations) and the
+latency of get_session, the lookup run_adk_async makes before every turn: for
+SQLite, both a hot (cached) and a cold (read from disk) lookup. No API key is
+needed; no model is called.
+
+    python -m benchmarks.session_store [--sessions 50] [--turns 6] [--doc-tokens 5000] [--repeat 200]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from config.settings import APP_NAME_FOR_ADK
+from services.session_store import SqliteSessionService
+
+
+def _event(author, role, text):
+    return Event(author=author, content=genai_types.Content(role=role, parts=[genai_types.Part(text=text)]))
+
+
+async def _fill(service, sessions, turns, doc_tokens):
+    """Creates the sessions and appends `turns` document turns and replies to each; returns (user, session) IDs."""
+    document = 'lorem ' * (doc_tokens * 4 // 6)
+    ids = []
+    for s in range(sessions):
+        user_id, session_id = f'user{s}', f'session{s}'
+        session = await service.create_session(app_name=APP_NAME_FOR_ADK, user_id=user_id, session_id=session_id)
+        for t in range(turns):
+            await service.append_event(session, _event('user', 'user', f'Summarize document {t}: {document}'))
+            await service.append_event(session, _event('summarizer', 'model', 'summary ' * 300))
+        ids.append((user_id, session_id))
+    return ids
+
+
+async def _memory_per_session(make_service, args):
+    """Returns the service and its traced allocations per session, in KiB."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    service = make_service()
+    ids = await _fill(service, args.sessions, args.turns, args.doc_tokens)
+    if isinstance(service, SqliteSessionService):
+        service.flush()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return service, ids, (after - before) / args.sessions / 1024
+
+
+async def _lookup_ms(service, ids, repeat, before_each=None):
+    """Median get_session latency in milliseconds, cycling through the sessions."""
+    times = []
+    for i in range(repeat):
+        user_id, session_id = ids[i % len(ids)]
+        if before_each is not None:
+            before_each()
+        start = time.perf_counter()
+        session = await service.get_session(app_name=APP_NAME_FOR_ADK, user_id=user_id, session_id=session_id)
+        times.append((time.perf_counter() - start) * 1000)
+        assert session is not None
+    return statistics.median(times)
+
+
+async def _run(args):
+    print(f"sessions={args.sessions} turns={args.turns} doc~{args.doc_tokens} tokens repeat={args.repeat}")
+    print(f"{'backend':<28}{'KiB/session':>12}{'get_session ms':>16}")
+
+    service, ids, kib = await _memory_per_session(InMemorySessionService, args)
+    print(f"{'InMemorySessionService':<28}{kib:>12.1f}{await _lookup_ms(service, ids, args.repeat):>16.3f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'sessions.sqlite3')
+        service, ids, kib = await _memory_per_session(lambda: SqliteSessionService(path, cache_size=args.sessions), args)
+        print(f"{'SqliteSessionService (hot)':<28}{kib:>12.1f}{await _lookup_ms(service, ids, args.repeat):>16.3f}")
+        cold = await _lookup_ms(service, ids, args.repeat, before_each=service._cache.clear)
+        print(f"{'SqliteSessionService (cold)':<28}{'':>12}{cold:>16.3f}")
+        size = sum(os.path.getsize(p) for p in (path, path + '-wal') if os.path.exists(p))
+        print(f"database size: {size / 1024:.0f} KiB for {args.sessions} sessions; {service.stats()}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--turns', type=int, default=6, help='Document turns (and replies) per session')
+    parser.add_argument('--doc-tokens', type=int, default=5_000, help='Estimated tokens of the document in each turn')
+    parser.add_argument('--repeat', type=int, default=200)
+    asyncio.run(_run(parser.parse_args(argv)))
+
+
+if __name__ == '__main__':
+    main()
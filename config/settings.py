@@ -10,10 +10,74 @@ APP_NAME_FOR_ADK = "aura_app" # A unique name for your application within ADK, u
 USER_ID = "charlescro" # A default user ID. In a real application, this would be dynamic (e.g., from a login system).
 MESSAGE_HISTORY_KEY = "messages_final_mem_v2" # Key used by Streamlit to store the chat history in its session state.
 ADK_SESSION_KEY = "adk_session_id" # Key used by Streamlit to store the unique ADK session ID.
+MESH_CACHE_DIR = "ui/assets/cache" # Directory for precomputed globe meshes (see utils/mesh_cache.py).
+MESH_BUILD_WORKERS = None # Process pool size for building the globe mesh; None uses every CPU core.
+# Levels of detail for the globe, coarse to fine. Point shapefile_path at ne_110m_land.shp / ne_10m_land.shp
+# to use the other Natural Earth resolutions instead of simplifying the 50m source.
+GLOBE_LOD_LEVELS = [
+    {'name': 'low', 'shapefile_path': 'ui/assets/ne_50m_land.shp', 'simplify_tolerance': 0.5},
+    {'name': 'medium', 'shapefile_path': 'ui/assets/ne_50m_land.shp', 'simplify_tolerance': 0.1},
+    {'name': 'high', 'shapefile_path': 'ui/assets/ne_50m_land.shp', 'simplify_tolerance': 0.0},
+]
+GLOBE_MESH_BYTE_BUDGET = 400_000 # Largest continent mesh payload (bytes) sent to the browser; None always uses the finest level.
+GLOBE_QUANTIZE = True # Send globe coordinates as int16 instead of float32 (see benchmarks/globe_payload.py).
+GLOBE_RAW_POINT_THRESHOLD = 2_000 # Above this many points the globe bins them into equal-area cells.
+GLOBE_MAX_MARKERS = 1_500 # Maximum number of cell markers drawn when points are binned.
+GLOBE_FRAME_MAX_MARKERS = 200 # Marker cap per frame of the in-browser timeline animation.
+GLOBE_FRAME_BUCKET_YEARS = 10 # Years per frame of the in-browser timeline animation.
+EVENTS_PATH = "ui/assets/events.parquet" # Historical events (.parquet or .csv with year, lat, lon, field, text columns).
+EVENT_YEAR_WINDOW = 10 # The globe shows events within this many years of the Timeline year.
+MAX_EVENTS_LISTED = 10 # Maximum number of events listed under "Historical Happeninings".
+PDF_CACHE_DIR = ".cache/pdf_pages" # Extracted page texts, keyed by PDF content hash and page number.
+PDF_EXTRACT_WORKERS = None # Process pool size for PDF text extraction; None uses every CPU core.
+RESULT_CACHE_PATH = ".cache/results.sqlite3" # Cross-session cache of summaries and translations (see services/result_cache.py).
+RESULT_CACHE_MAX_ENTRIES = 1_000 # Least recently used responses are evicted above this many entries...
+RESULT_CACHE_MAX_BYTES = 200_000_000 # ...or above this total size in bytes.
+LONG_DOCUMENT_TOKENS = 12_000 # Documents estimated above this many tokens are summarized with map-reduce.
+SUMMARY_CHUNK_TOKENS = 6_000 # Maximum estimated tokens per chunk in map-reduce summaries.
+SUMMARY_MAX_CONCURRENCY = 4 # Maximum number of chunk summaries requested at the same time.
+SUMMARY_MAP_MAX_OUTPUT_TOKENS = 2_000 # Output cap of each chunk (and group) summary; the Response Length slider only sets the final one.
+TRANSLATION_SEGMENT_TOKENS = 1_500 # Maximum estimated tokens of paragraphs translated in one call.
+TRANSLATION_MAX_CONCURRENCY = 4 # Maximum number of translation calls in flight.
+JOB_MAX_CONCURRENCY = 4 # Summary/translation jobs running at once across all sessions; the rest wait in line.
+JOB_RETENTION_SECONDS = 3_600 # Finished jobs are forgotten after this long.
+PREFETCH_SUMMARY = False # Start summarizing as soon as a PDF is uploaded, before the summary button is clicked.
+PREFETCH_MAX_TOKENS = 30_000 # Documents estimated above this many tokens are never prefetched.
+PREFETCH_DAILY_TOKEN_BUDGET = 2_000_000 # Estimated input tokens per day (UTC) that prefetching may spend, per process.
+RATE_LIMIT_REQUESTS_PER_MINUTE = 60 # Agent runs started per minute across all sessions; keep below the API quota.
+RATE_LIMIT_TOKENS_PER_MINUTE = 1_000_000 # Estimated input tokens sent per minute across all sessions.
+RATE_LIMIT_MAX_RETRIES = 4 # Retries of a model call failing with 429 or 5xx.
+RATE_LIMIT_BACKOFF_SECONDS = 1.0 # Upper bound of the first retry delay; doubles on every retry (with full jitter)...
+RATE_LIMIT_MAX_BACKOFF_SECONDS = 30.0 # ...up to this many seconds.
+HISTORY_TOKEN_BUDGET = 8_000 # Estimated tokens of conversation history kept per ADK session and sent per model call.
+HISTORY_LARGE_MESSAGE_TOKENS = 500 # Earlier messages above this size are replaced by a short reference.
+HISTORY_KEEP_RECENT_EVENTS = 2 # Most recent session events always kept in full.
+SESSION_DB_PATH = ".cache/sessions.sqlite3" # ADK sessions, scoped per user (see services/session_store.py).
+SESSION_CACHE_SIZE = 64 # Most recently used ADK sessions kept in memory.
+SESSION_TTL_SECONDS = 7 * 24 * 3_600 # ADK sessions untouched for this long are deleted.
+SESSION_FLUSH_EVENTS = 20 # Dirty sessions are written to SQLite after this many new events...
+SESSION_FLUSH_SECONDS = 5.0 # ...or this many seconds after the first unwritten event, whichever comes first.
+RETRIEVAL_PASSAGE_TOKENS = 200 # Maximum estimated tokens per passage of the question-answering index.
+RETRIEVAL_TOP_K = 5 # Passages sent to the model with each question.
+RETRIEVAL_CACHE_DOCUMENTS = 16 # Document indexes kept in memory per process.
+MODEL_TIERS = [ # Model per input size class (estimated tokens), smallest class first; prices in USD per million tokens.
+    {'name': 'short', 'max_input_tokens': LONG_DOCUMENT_TOKENS, 'model': MODEL_GEMINI,
+     'input_cost_per_million': 0.10, 'output_cost_per_million': 0.40, 'output_tokens_per_second': 150},
+    {'name': 'long', 'max_input_tokens': None, 'model': "gemini-2.0-flash-lite",
+     'input_cost_per_million': 0.075, 'output_cost_per_million': 0.30, 'output_tokens_per_second': 200},
+]
+OUTPUT_TOKENS_PER_PAGE = 500 # Target output tokens per page of the "Response Length" slider, stated in the prompt.
+OUTPUT_TOKEN_HEADROOM = 1.5 # The output cap is the target length times this, so a summary that runs long isn't cut off.
+MODEL_CALL_OVERHEAD_SECONDS = 1.5 # Latency added to every model call in time estimates.
+DOC_STORE_DIR = ".cache/documents" # Compressed document texts, summaries and translations, one file per content hash.
+DOC_STORE_PAGE_CHARS = 4_000 # Approximate characters per stored (and displayed) page of a text.
+DOC_STORE_PAGE_CACHE = 256 # Decompressed pages kept in memory per process.
+VIEW_PAGES_PER_SCREEN = 2 # Pages rendered at once in the viewing pane.
+EXTRACTION_PREVIEW_PAGES = 3 # Opening pages shown while a PDF is being extracted; the rest appear in the viewing pane.
 def get_api_key():
     """Retrieves the Google API Key from environment variables."""
     api_key = os.environ.get("GOOGLE_API_KEY")
     # Basic check to ensure the key is present and not the placeholder.
     if not api_key or "YOUR_GOOGLE_API_KEY" in api_key:
         return None
-    return api_key
\ No newline at end of file
+    return api_key
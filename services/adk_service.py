@@ -1,32 +1,54 @@
 import streamlit as st
-import asyncio
 import time
 import os
+from contextlib import asynccontextmanager
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
 from google.genai import types as genai_types
 from aura_agent.agent import root_agent
-from config.settings import APP_NAME_FOR_ADK, USER_ID, ADK_SESSION_KEY
+from aura_agent.sub_agents.summarizer.agent import build_summarizer
+from aura_agent.sub_agents.translater.agent import build_translater
+from services.event_loop import run_sync
+from services.history import HistoryCompactionPlugin
+from services.session_store import SqliteSessionService
+from services.rate_limit import get_rate_limiter
+from services.result_cache import get_result_cache, result_cache_key
+from utils.helpers import estimate_tokens
+from config.settings import APP_NAME_FOR_ADK, USER_ID, ADK_SESSION_KEY, MODEL_GEMINI
 
-# Import nest_asyncio at the top of the file
-import nest_asyncio
-nest_asyncio.apply()  # Apply nest_asyncio to allow nested event loops
+AGENT_ERROR_TEXT = "[Agent encountered an issue]" # Returned when the agent produced no final text response.
+
+# Sub-agents that can be run directly, without the root agent's routing call.
+DIRECT_AGENTS = {
+    'summarizer': build_summarizer,
+    'translater': build_translater,
+}
 
 @st.cache_resource
-def initialize_adk():
+def get_session_runner() -> Runner:
     """
-    Initializes the Google ADK Runner and manages the ADK session.
+    Returns the root agent's Runner, shared by every session of this process.
     Uses Streamlit's cache_resource to ensure this runs only once per app load.
     """
     print("DEBUG: Initializing ADK runner and session service")
     agent = root_agent # Create our ADK agent defined earlier.
-    session_service = InMemorySessionService() # ADK's default in-memory session service for storing session data.
-    runner = Runner( # The ADK Runner orchestrates the agent's execution.
+    # SQLite-backed sessions scoped per user, with a hot in-memory cache and compacted history (see services/session_store.py).
+    session_service = SqliteSessionService()
+    return Runner( # The ADK Runner orchestrates the agent's execution.
         agent=agent,
         app_name=APP_NAME_FOR_ADK,
-        session_service=session_service
+        session_service=session_service,
+        plugins=[HistoryCompactionPlugin()] # Old documents in the history are not resent with every turn.
     )
-    
+
+def initialize_adk(user_id: str = USER_ID):
+    """
+    Returns the shared ADK Runner and this browser session's ADK session ID, creating the session if needed.
+    Runs on every script run; sessions are stored under user_id, so each user only sees their own.
+    """
+    runner = get_session_runner()
+    session_service = runner.session_service
     print(f"DEBUG: Checking for existing session ID in st.session_state[{ADK_SESSION_KEY}]")
     # Check if an ADK session ID already exists in Streamlit's session state.
     if ADK_SESSION_KEY not in st.session_state:
@@ -38,13 +60,11 @@ def initialize_adk():
         
         # Create a new session in ADK's session service.
         print(f"DEBUG: Creating new session in ADK session service: {session_id}")
-        # Since create_session is async, we need to run it in an event loop
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(
+        # Since create_session is async, run it on the shared background event loop
+        run_sync(
             session_service.create_session(
                 app_name=APP_NAME_FOR_ADK,
-                user_id=USER_ID,
+                user_id=user_id,
                 session_id=session_id
             )
         )
@@ -57,19 +77,17 @@ def initialize_adk():
         # Verify if the session still exists in the ADK session service.
         print(f"DEBUG: Checking if session exists in ADK session service: {session_id}")
         # get_session might also be async, so handle it properly
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        session_exists = loop.run_until_complete(
-            session_service.get_session(app_name=APP_NAME_FOR_ADK, user_id=USER_ID, session_id=session_id)
+        session_exists = run_sync(
+            session_service.get_session(app_name=APP_NAME_FOR_ADK, user_id=user_id, session_id=session_id)
         )
         
         if not session_exists:
             print(f"DEBUG: Session not found in ADK service, recreating: {session_id}")
             # If the session was lost (e.g., full app restart without clearing cache), recreate it.
-            loop.run_until_complete(
+            run_sync(
                 session_service.create_session(
                     app_name=APP_NAME_FOR_ADK,
-                    user_id=USER_ID,
+                    user_id=user_id,
                     session_id=session_id
                 )
             )
@@ -78,58 +96,259 @@ def initialize_adk():
             print(f"DEBUG: Session exists in ADK service: {session_id}")
     return runner, session_id
 
-async def run_adk_async(runner: Runner, session_id: str, user_message_text: str):
+@st.cache_resource
+def get_agent_runner(agent_name: str, model: str = MODEL_GEMINI, max_output_tokens: int = None) -> Runner:
+    """
+    Returns a Runner whose root is the named sub-agent, shared by every session of this process.
+    Summaries and translations go straight to the sub-agent: no routing call to root_agent, and the
+    document is sent to the model once instead of twice. Calls run in ephemeral sessions.
+    One Runner is kept per model and output cap (see services/planner.py).
+    """
+    print(f"DEBUG: Initializing direct runner for {agent_name} ({model}, max_output_tokens={max_output_tokens})")
+    return Runner(
+        agent=DIRECT_AGENTS[agent_name](model=model, max_output_tokens=max_output_tokens),
+        app_name=APP_NAME_FOR_ADK,
+        session_service=InMemorySessionService()
+    )
+
+async def run_adk_async(runner: Runner, session_id: str, user_message_text: str, user_id: str = USER_ID,
+                        outcome: dict = None):
     """
     Asynchronously runs a single turn of the ADK agent conversation.
+    If an outcome dict is given, its 'truncated' entry is set when the response was cut off at the output cap.
     """
     print(f"DEBUG: Attempting to get session with ID: {session_id}")
-    print(f"DEBUG: App name: {APP_NAME_FOR_ADK}, User ID: {USER_ID}")
+    print(f"DEBUG: App name: {APP_NAME_FOR_ADK}, User ID: {user_id}")
     
     # Check if session exists in the session service - properly await the async call
-    session = await runner.session_service.get_session(app_name=APP_NAME_FOR_ADK, user_id=USER_ID, session_id=session_id)
+    session = await runner.session_service.get_session(app_name=APP_NAME_FOR_ADK, user_id=user_id, session_id=session_id)
     if not session:
         print(f"ERROR: Session not found in session service: {session_id}")
         # Try to recreate the session before failing - properly await the async call
         print(f"DEBUG: Attempting to recreate session: {session_id}")
         await runner.session_service.create_session(
             app_name=APP_NAME_FOR_ADK,
-            user_id=USER_ID,
+            user_id=user_id,
             session_id=session_id
         )
         # Try to get the session again - properly await the async call
-        session = await runner.session_service.get_session(app_name=APP_NAME_FOR_ADK, user_id=USER_ID, session_id=session_id)
+        session = await runner.session_service.get_session(app_name=APP_NAME_FOR_ADK, user_id=user_id, session_id=session_id)
         if not session:
             return "Error: ADK session not found and could not be recreated."
         print(f"DEBUG: Session recreated successfully: {session_id}")
     # Prepare the user's message in the format expected by ADK/Gemini.
     content = genai_types.Content(role='user', parts=[genai_types.Part(text=user_message_text)])
-    final_response_text = "[Agent encountered an issue]" # Default error message
+    final_response_text = AGENT_ERROR_TEXT # Default error message
     # Iterate through the asynchronous events generated by the ADK runner.
     # ADK can yield multiple events (e.g., tool calls, interim responses) before the final response.
-    async for event in runner.run_async(user_id=USER_ID, session_id=session_id, new_message=content):
+    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
+        _record_outcome(outcome, event)
         if event.is_final_response(): # We are only interested in the final response from the agent.
             if event.content and event.content.parts and hasattr(event.content.parts[0], 'text'):
                 final_response_text = event.content.parts[0].text
             break # Exit the loop once the final response is received.
     return final_response_text
 
-def run_adk_sync(runner: Runner, session_id: str, user_message_text: str) -> str:
+@asynccontextmanager
+async def ephemeral_session(runner: Runner, user_id: str = USER_ID):
     """
-    Synchronous wrapper for running ADK, as Streamlit does not directly support async calls in the main thread.
+    Creates a throwaway ADK session and deletes it on exit; yields its session ID.
     """
-    print(f"DEBUG: Starting synchronous ADK run with session ID: {session_id}")
-    
-    # Check if we have an existing event loop
+    session_id = f"ephemeral_{int(time.time())}_{os.urandom(4).hex()}"
+    await runner.session_service.create_session(app_name=APP_NAME_FOR_ADK, user_id=user_id, session_id=session_id)
     try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            print("DEBUG: Using existing running event loop")
-            # Use nest_asyncio to run in existing loop
-            return loop.run_until_complete(run_adk_async(runner, session_id, user_message_text))
+        yield session_id
+    finally:
+        await runner.session_service.delete_session(app_name=APP_NAME_FOR_ADK, user_id=user_id, session_id=session_id)
+
+@asynccontextmanager
+async def turn_attempt(runner: Runner, session_id: str, user_id: str = USER_ID):
+    """
+    Yields the session ID one attempt at a turn runs in, so that retrying the turn never repeats its message.
+    With session_id None, every attempt gets a new throwaway session. In a persistent session, ADK has already
+    stored the user message when a model call fails, so the events added by a failed attempt are removed again.
+    """
+    if session_id is None:
+        async with ephemeral_session(runner, user_id) as ephemeral_id:
+            yield ephemeral_id
+        return
+    service = runner.session_service
+    session = await service.get_session(app_name=APP_NAME_FOR_ADK, user_id=user_id, session_id=session_id)
+    before = {event.id for event in session.events} if session else set()
+    try:
+        yield session_id
+    except Exception:
+        if hasattr(service, 'discard_events'):
+            await service.discard_events(app_name=APP_NAME_FOR_ADK, user_id=user_id, session_id=session_id, keep_ids=before)
         else:
-            print("DEBUG: Using existing non-running event loop")
-            return loop.run_until_complete(run_adk_async(runner, session_id, user_message_text))
-    except RuntimeError:
-        print("DEBUG: No event loop found, creating new one")
-        # No event loop exists, create a new one
-        return asyncio.run(run_adk_async(runner, session_id, user_message_text))
\ No newline at end of file
+            print(f"DEBUG: {type(service).__name__} can't discard the events of a failed turn in session {session_id}")
+        raise
+
+async def run_adk_ephemeral_async(runner: Runner, user_message_text: str, use_cache: bool = True,
+                                  outcome: dict = None) -> str:
+    """
+    Runs a single message in a throwaway ADK session, consulting the result cache first.
+    Concurrent calls (e.g. one per document chunk) therefore never share conversation history,
+    and identical calls in flight at the same time share one model call (see services/rate_limit.py).
+    Every retry runs in a new session. A response cut off at the output cap is not cached; if an outcome
+    dict is given, its 'truncated' entry is set (and stays set across calls sharing the dict).
+    """
+    cache, key, cached = _cache_lookup(runner, user_message_text, use_cache)
+    if cached is not None:
+        return cached
+
+    call_outcome = {}
+
+    async def attempt():
+        async with ephemeral_session(runner) as session_id:
+            return await run_adk_async(runner, session_id, user_message_text, outcome=call_outcome)
+
+    flight_key = key or result_cache_key(runner.agent, user_message_text)
+    response = await get_rate_limiter().call(attempt, estimate_tokens(user_message_text), flight_key)
+
+    _merge_outcome(outcome, call_outcome)
+    if not call_outcome.get('truncated'):
+        _cache_store(cache, key, runner, response)
+    return response
+
+def _hit_output_cap(event) -> bool:
+    """
+    Returns True if the model stopped at max_output_tokens. Streamed responses report it on the last partial
+    event's finish_reason and on the aggregated final event's error_code.
+    """
+    return genai_types.FinishReason.MAX_TOKENS in (event.finish_reason, event.error_code)
+
+def _record_outcome(outcome, event):
+    if outcome is not None and _hit_output_cap(event):
+        print(f"DEBUG: Response of {event.author} reached the output token cap")
+        outcome['truncated'] = True
+
+def _merge_outcome(outcome, call_outcome):
+    if outcome is not None and call_outcome.get('truncated'):
+        outcome['truncated'] = True
+
+def _event_text(event) -> str:
+    """
+    Returns the text parts of an ADK event joined together, skipping model thoughts.
+    """
+    if not event.content or not event.content.parts:
+        return ''
+    return ''.join(part.text for part in event.content.parts if part.text and not part.thought)
+
+async def stream_adk_async(runner: Runner, session_id: str, user_message_text: str, use_cache: bool = None,
+                           user_id: str = USER_ID, outcome: dict = None):
+    """
+    Asynchronously runs a single turn of the ADK agent conversation, yielding text as the model produces it.
+    With session_id None, the turn runs in a throwaway session, a new one for every attempt (see turn_attempt()).
+    With SSE streaming, ADK emits partial events carrying each new piece of text, then a final event with the
+    whole response; the final text is only yielded if no partial text came before it. A cached response is
+    yielded in one piece. The complete response is stored in the result cache.
+    With caching on, an identical request already in flight is waited for and its response yielded in one piece.
+    use_cache defaults to on for throwaway sessions only: a turn of a persistent session depends on its history,
+    and a cached reply would never be recorded in it.
+    The run is rate limited and retried on transient errors until the first text has been yielded.
+    A response cut off at the output cap is not cached; if an outcome dict is given, its 'truncated' entry is set.
+    """
+    if use_cache is None:
+        use_cache = session_id is None
+    cache, key, cached = _cache_lookup(runner, user_message_text, use_cache)
+    if cached is not None:
+        yield cached
+        return
+    limiter = get_rate_limiter()
+    if key is not None:
+        shared = await limiter.follow(key)
+        if not limiter.is_missing(shared):
+            yield shared
+            return
+
+    content = genai_types.Content(role='user', parts=[genai_types.Part(text=user_message_text)])
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+    final_response_text = AGENT_ERROR_TEXT
+    call_outcome = {}
+    streamed_author = None # Author of the partial text yielded so far (the root agent may hand over to a sub-agent).
+    async with limiter.lead(key) as flight:
+        attempt = 0
+        while True:
+            await limiter.acquire(estimate_tokens(user_message_text))
+            try:
+                async with turn_attempt(runner, session_id, user_id) as attempt_session_id:
+                    async for event in runner.run_async(user_id=user_id, session_id=attempt_session_id, new_message=content,
+                                                        run_config=run_config):
+                        _record_outcome(call_outcome, event)
+                        text = _event_text(event)
+                        if event.partial:
+                            if text:
+                                streamed_author = event.author
+                                yield text
+                            continue
+                        if event.is_final_response():
+                            if text:
+                                final_response_text = text
+                                if streamed_author != event.author:
+                                    yield text
+                            break
+                break
+            except Exception as e:
+                # Text already shown can't be taken back, so only a request that failed before streaming is retried.
+                if streamed_author is not None or not await limiter.backoff(attempt, e):
+                    raise
+                attempt += 1
+        flight.set_result(final_response_text)
+    _merge_outcome(outcome, call_outcome)
+    if not call_outcome.get('truncated'):
+        _cache_store(cache, key, runner, final_response_text)
+
+def run_adk_sync(runner: Runner, session_id: str, user_message_text: str, use_cache: bool = False, user_id: str = USER_ID) -> str:
+    """
+    Synchronous wrapper for running ADK, as Streamlit does not directly support async calls in the main thread.
+    The turn belongs to a persistent session, whose history shapes the answer and has to record it, so the
+    cross-session result cache is off by default; only turns that don't depend on the history may set use_cache.
+    """
+    print(f"DEBUG: Starting synchronous ADK run with session ID: {session_id}")
+
+    cache, key, cached = _cache_lookup(runner, user_message_text, use_cache)
+    if cached is not None:
+        return cached
+
+    response = run_coroutine_sync(lambda: run_adk_limited_async(runner, session_id, user_message_text, user_id))
+
+    _cache_store(cache, key, runner, response)
+    return response
+
+async def run_adk_limited_async(runner: Runner, session_id: str, user_message_text: str, user_id: str = USER_ID) -> str:
+    """
+    Runs run_adk_async() under the process-wide rate limiter, retrying transient errors.
+    Turns of a persistent session depend on its history, so they are never coalesced with other requests.
+    A failed attempt's events are removed from the session before the retry (see turn_attempt()).
+    """
+    async def attempt():
+        async with turn_attempt(runner, session_id, user_id):
+            return await run_adk_async(runner, session_id, user_message_text, user_id)
+
+    return await get_rate_limiter().call(attempt, estimate_tokens(user_message_text))
+
+def _cache_lookup(runner: Runner, user_message_text: str, use_cache: bool):
+    """
+    Returns (cache, key, cached response or None); cache and key are None when caching is off.
+    """
+    if not use_cache:
+        return None, None, None
+    cache = get_result_cache()
+    key = result_cache_key(runner.agent, user_message_text)
+    cached = cache.get(key)
+    if cached is not None:
+        print(f"DEBUG: Result cache hit for {runner.agent.name} ({cache.stats()['hit_rate']:.0%} hit rate)")
+    return cache, key, cached
+
+def _cache_store(cache, key, runner: Runner, response: str):
+    # Only successful answers are cached; error placeholders must be retried on the next request.
+    if cache is not None and response and response != AGENT_ERROR_TEXT and not response.startswith('Error:'):
+        cache.put(key, response, runner.agent.name)
+
+def run_coroutine_sync(make_coroutine):
+    """
+    Runs the coroutine returned by make_coroutine() on the shared background event loop and waits for it.
+    The calling (Streamlit script) thread blocks; other sessions' requests keep running on the loop meanwhile.
+    """
+    return run_sync(make_coroutine())
@@ -0,0 +1,84 @@
+"""
+One long-lived asyncio event loop on a background thread, shared by every Streamlit session.
+
+Streamlit runs each session's script in its own thread, and those threads
+must not block each other or create throwaway event loops. All ADK coroutines
+are instead submitted to this loop: it owns the runners' async HTTP clients
+(so their connection pools are reused) and runs requests from many sessions
+concurrently. Script threads wait on the returned concurrent.futures.Future.
+"""
+import asyncio
+import threading
+
+_default_loop = None
+_default_loop_lock = threading.Lock()
+
+
+class BackgroundLoop:
+    """An asyncio event loop running forever on a daemon thread, with a thread-safe submit API."""
+
+    def __init__(self, name='adk-event-loop'):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coroutine):
+        """
+        Schedules a coroutine on the loop from any thread.
+
+        Args:
+            coroutine: The coroutine object to run.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the coroutine's result (or exception).
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Waiting on the background loop from its own thread would deadlock; await instead.")
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine, timeout=None):
+        """
+        Runs a coroutine on the loop and blocks the calling thread until it finishes.
+
+        Args:
+            coroutine: The coroutine object to run.
+            timeout (float): Seconds to wait; None waits indefinitely.
+
+        Returns:
+            The coroutine's result.
+        """
+        future = self.submit(coroutine)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel() # E.g. Streamlit stopped the script: don't leave the request running.
+            raise
+
+    def stop(self):
+        """Stops the loop and waits for its thread to exit."""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
+def get_background_loop():
+    """Returns the process-wide background loop, starting it on first use."""
+    global _default_loop
+    with _default_loop_lock:
+        if _default_loop is None:
+            _default_loop = BackgroundLoop()
+            print("DEBUG: Started background event loop thread")
+        return _default_loop
+
+
+def submit(coroutine):
+    """Schedules a coroutine on the process-wide background loop; returns a concurrent.futures.Future."""
+    return get_background_loop().submit(coroutine)
+
+
+def run_sync(coroutine, timeout=None):
+    """Runs a coroutine on the process-wide background loop and waits for its result."""
+    return get_background_loop().run(coroutine, timeout)
@@ -0,0 +1,174 @@
+"""
+Bounded conversation history for long-lived ADK sessions.
+
+Every turn of a persistent session (such as the chat session created in
+initialize_adk) is stored, and ADK resends the whole history with each model
+call, so one uploaded chapter pasted into a message would be paid for on every
+later turn. Two pieces keep both memory and prompt size bounded:
+
+- HistoryCompactionPlugin rewrites the contents of each model request: large
+  text parts of earlier messages become a short reference (size, opening
+  words and content digest), and the oldest messages are dropped once the
+  history exceeds HISTORY_TOKEN_BUDGET.
+- compact_events() applies the same policy to a stored session; the session
+  service (services/session_store.py) runs it after every appended event, so
+  the session itself stops growing too.
+
+The turn in progress is never touched: not just its last message, but
+everything from the user's message on, including the function calls and
+"For context:" messages ADK adds after a transfer_to_agent, so a sub-agent
+always receives the document the user just sent.
+"""
+from google.adk.plugins.base_plugin import BasePlugin
+from google.genai import types as genai_types
+
+from config.settings import HISTORY_KEEP_RECENT_EVENTS, HISTORY_LARGE_MESSAGE_TOKENS, HISTORY_TOKEN_BUDGET
+from utils.helpers import content_hash, estimate_tokens
+
+REFERENCE_PREVIEW_CHARS = 160 # Opening characters of a compacted message kept in its reference.
+
+
+def _reference(text):
+    """Returns the short stand-in for a large text part."""
+    preview = ' '.join(text[:REFERENCE_PREVIEW_CHARS].split())
+    return (f'[Earlier text of about {estimate_tokens(text)} tokens omitted; '
+            f'it began: "{preview}..." (digest {content_hash(text)[:12]})]')
+
+
+def content_tokens(content):
+    """Returns the estimated tokens of the text parts of a genai Content (0 for None)."""
+    if content is None or not content.parts:
+        return 0
+    return sum(estimate_tokens(part.text) for part in content.parts if part.text)
+
+
+def compact_content(content, large_message_tokens=HISTORY_LARGE_MESSAGE_TOKENS):
+    """
+    Replaces the large text parts of a message with references.
+
+    Args:
+        content (genai_types.Content): The message.
+        large_message_tokens (int): Text parts above this many estimated tokens are replaced.
+
+    Returns:
+        genai_types.Content: The same object if nothing changed, otherwise a compacted copy.
+    """
+    if content is None or not content.parts:
+        return content
+    if not any(part.text and estimate_tokens(part.text) > large_message_tokens for part in content.parts):
+        return content
+    parts = [
+        genai_types.Part(text=_reference(part.text)) if part.text and estimate_tokens(part.text) > large_message_tokens else part
+        for part in content.parts
+    ]
+    return content.model_copy(update={'parts': parts})
+
+
+def _over_budget(items, tokens_of, token_budget, keep=1):
+    """Returns how many leading items must be dropped for the rest to fit in token_budget (the last keep items are always kept)."""
+    total = sum(tokens_of(item) for item in items)
+    dropped = 0
+    while dropped < len(items) - keep and total > token_budget:
+        total -= tokens_of(items[dropped])
+        dropped += 1
+    return dropped
+
+
+def _text(content):
+    return ''.join(part.text for part in content.parts if part.text) if content is not None and content.parts else ''
+
+
+def current_turn_length(contents, user_content):
+    """
+    Returns how many trailing contents belong to the turn being answered: the user's message and everything after it.
+
+    Args:
+        contents (list): genai Contents of a model request, oldest first.
+        user_content (genai_types.Content): The message that started the invocation (callback_context.user_content).
+
+    Returns:
+        int: At least 1, the last content, if the user's message is not found.
+    """
+    text = _text(user_content)
+    if text:
+        for i in range(len(contents) - 1, -1, -1):
+            if contents[i].role == 'user' and _text(contents[i]) == text:
+                return len(contents) - i
+    return 1
+
+
+def compact_contents(contents, token_budget=HISTORY_TOKEN_BUDGET, large_message_tokens=HISTORY_LARGE_MESSAGE_TOKENS,
+                     current_turn=1):
+    """
+    Compacts the history of a model request.
+
+    Args:
+        contents (list): genai Contents, oldest first.
+        token_budget (int): Maximum estimated tokens of the whole history.
+        large_message_tokens (int): Text parts of earlier messages above this size are replaced by references.
+        current_turn (int): Number of trailing contents that belong to the turn being answered; sent as is.
+
+    Returns:
+        list: The compacted contents.
+    """
+    current_turn = min(max(current_turn, 1), len(contents))
+    if len(contents) <= current_turn:
+        return contents
+    split = len(contents) - current_turn
+    compacted = [compact_content(content, large_message_tokens) for content in contents[:split]] + contents[split:]
+    compacted = compacted[_over_budget(compacted, content_tokens, token_budget, current_turn):]
+    # The history must open with a user turn, not with a model reply whose question was dropped.
+    while len(compacted) > current_turn and compacted[0].role != 'user':
+        compacted.pop(0)
+    return compacted
+
+
+class HistoryCompactionPlugin(BasePlugin):
+    """Keeps the history sent with every model call within HISTORY_TOKEN_BUDGET."""
+
+    def __init__(self, token_budget=HISTORY_TOKEN_BUDGET, large_message_tokens=HISTORY_LARGE_MESSAGE_TOKENS):
+        super().__init__(name='history_compaction')
+        self.token_budget = token_budget
+        self.large_message_tokens = large_message_tokens
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        before = sum(content_tokens(content) for content in llm_request.contents)
+        current_turn = current_turn_length(llm_request.contents, callback_context.user_content)
+        llm_request.contents = compact_contents(llm_request.contents, self.token_budget, self.large_message_tokens, current_turn)
+        after = sum(content_tokens(content) for content in llm_request.contents)
+        if after < before:
+            print(f"DEBUG: Compacted request history from ~{before} to ~{after} tokens")
+        return None
+
+
+def compact_events(events, token_budget=HISTORY_TOKEN_BUDGET, large_message_tokens=HISTORY_LARGE_MESSAGE_TOKENS,
+                   keep_recent_events=HISTORY_KEEP_RECENT_EVENTS):
+    """
+    Compacts the stored events of a session in place.
+    Every event of the latest invocation (the turn in progress, from the user's message on) is kept in full,
+    and so are at least the keep_recent_events most recent events.
+
+    Args:
+        events (list): The session's ADK events, oldest first.
+        token_budget (int): Maximum estimated tokens of all events.
+        large_message_tokens (int): Text parts of older events above this size are replaced by references.
+        keep_recent_events (int): Minimum number of most recent events never compacted or dropped.
+
+    Returns:
+        bool: True if any event was changed or dropped.
+    """
+    split = max(len(events) - keep_recent_events, 0)
+    if events:
+        current = events[-1].invocation_id
+        while split > 0 and events[split - 1].invocation_id == current:
+            split -= 1
+    changed = False
+    for i in range(split):
+        compacted = compact_content(events[i].content, large_message_tokens)
+        if compacted is not events[i].content:
+            events[i] = events[i].model_copy(update={'content': compacted})
+            changed = True
+    dropped = _over_budget(events, lambda event: content_tokens(event.content), token_budget, len(events) - split)
+    if dropped:
+        del events[:dropped]
+    return changed or dropped > 0
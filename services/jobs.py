@@ -0,0 +1,232 @@
+"""
+Background jobs for summaries and translations.
+
+A job runs as a task on the shared background event loop (services/event_loop.py),
+so the Streamlit script returns immediately and the user can keep browsing the
+text or moving the timeline. Jobs are keyed by (session, document, kind): asking
+again for a job that is still queued or running returns the same job. At most
+JOB_MAX_CONCURRENCY jobs run at once across every session; the rest wait in
+line. The UI polls status, progress and partial output and can cancel a job,
+which cancels its in-flight model calls. A finished job keeps its output only
+in the document store (utils/doc_store.py), so the jobs retained for
+JOB_RETENTION_SECONDS hold handles rather than texts.
+"""
+import asyncio
+import itertools
+import threading
+import time
+
+from config.settings import JOB_MAX_CONCURRENCY, JOB_RETENTION_SECONDS
+from services.adk_service import get_agent_runner
+from services.event_loop import get_background_loop
+from services.summarize import stream_summary_async
+from services.translate import split_paragraphs, translate_async
+from utils.doc_store import get_document_store
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+class Job:
+    """
+    One background request. Fields are written on the event loop thread and read by script threads.
+
+    pieces holds the partial output while the job runs: streamed text pieces for a summary,
+    or one slot per paragraph (None until translated) for a translation. Once the job is
+    done, pieces is emptied and result is the DocumentHandle of the stored output.
+    """
+
+    def __init__(self, job_id, key, kind, plan=None):
+        self.id = job_id
+        self.key = key
+        self.kind = kind
+        self.plan = plan
+        self.status = QUEUED
+        self.progress = 0.0
+        self.pieces = []
+        self.result = None
+        self.error = None
+        self.truncated = False # The model reached the output cap; the result may end mid-sentence.
+        self.created = time.time()
+        self.started = None
+        self.first_output = None # Seconds from start to the first partial output.
+        self.finished = None
+        self._future = None
+
+    @property
+    def active(self):
+        return self.status in ACTIVE_STATUSES
+
+    @property
+    def partial_text(self):
+        """The output available so far: streamed text, or the translated paragraphs in order up to the first gap."""
+        pieces = list(self.pieces)
+        if self.kind == 'summary':
+            return ''.join(pieces)
+        done = []
+        for piece in pieces:
+            if piece is None:
+                break
+            done.append(piece)
+        return '\n\n'.join(done)
+
+    def _output(self):
+        if self.first_output is None:
+            self.first_output = time.time() - self.started
+
+    def _on_done(self, future):
+        # A job cancelled while still queued never enters _run, so its status is settled here.
+        if future.cancelled() and self.finished is None:
+            self.status = CANCELLED
+            self.finished = time.time()
+
+    def cancel(self):
+        """Cancels the job; a queued job never starts and a running one stops its model calls."""
+        if self._future is not None:
+            self._future.cancel()
+
+
+class JobManager:
+    """Runs jobs on the background event loop with a global concurrency limit."""
+
+    def __init__(self, max_concurrency=JOB_MAX_CONCURRENCY, retention_seconds=JOB_RETENTION_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.retention_seconds = retention_seconds
+        self._jobs = {}
+        self._by_key = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._semaphore = None # Created on the loop thread by the first job.
+
+    def submit(self, session_key, document_key, kind, text, plan=None):
+        """
+        Starts (or returns the already active) job for a session, document and kind.
+
+        Args:
+            session_key (str): Identifies the browser session.
+            document_key (str): Identifies the input (e.g. a content hash of the text, or RequestPlan.key).
+            kind (str): 'summary' or 'translation'.
+            text (str): The text to summarize or translate.
+            plan (RequestPlan): Model and output cap to use (see services/planner.py); None uses the agents' defaults.
+
+        Returns:
+            Job: The new or existing job.
+        """
+        key = (session_key, document_key, kind)
+        with self._lock:
+            self._prune()
+            existing = self._by_key.get(key)
+            if existing is not None and existing.active:
+                return existing
+            job = Job(next(self._ids), key, kind, plan)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+        job._future = get_background_loop().submit(self._run(job, text))
+        job._future.add_done_callback(job._on_done)
+        print(f"DEBUG: Submitted {kind} job {job.id} for session {session_key}")
+        return job
+
+    def latest(self, session_key, document_key, kind):
+        """Returns the most recent job (active or finished) for a session, document and kind, or None."""
+        with self._lock:
+            return self._by_key.get((session_key, document_key, kind))
+
+    def get(self, job_id):
+        """Returns a job by ID, or None if it is unknown or was pruned."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancels a job by ID."""
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def stats(self):
+        """Returns the number of jobs per status."""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id, job in list(self._jobs.items()):
+            if job.finished is not None and job.finished < cutoff:
+                del self._jobs[job_id]
+                if self._by_key.get(job.key) is job:
+                    del self._by_key[job.key]
+
+    async def _run(self, job, text):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            async with self._semaphore:
+                job.status = RUNNING
+                job.started = time.time()
+                if job.kind == 'summary':
+                    output = await self._summarize(job, text)
+                else:
+                    output = await self._translate(job, text)
+                job.result = await asyncio.to_thread(get_document_store().put_text, output)
+                job.pieces = []
+                job.progress = 1.0
+                job.status = DONE
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+            raise
+        except Exception as e:
+            print(f"DEBUG: {job.kind} job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+            print(f"DEBUG: {job.kind} job {job.id} {job.status}")
+
+    @staticmethod
+    def _runner(job, agent_name, map_pass=False):
+        if job.plan is None:
+            return get_agent_runner(agent_name)
+        max_output_tokens = job.plan.map_max_output_tokens if map_pass else job.plan.max_output_tokens
+        return get_agent_runner(agent_name, job.plan.model, max_output_tokens)
+
+    async def _summarize(self, job, text):
+        def on_progress(fraction):
+            job.progress = 0.9 * fraction # The final reduce pass accounts for the rest.
+
+        outcome = {}
+        target_tokens = job.plan.target_tokens if job.plan is not None else None
+        async for piece in stream_summary_async(text, runner=self._runner(job, 'summarizer'), on_progress=on_progress,
+                                                target_tokens=target_tokens, outcome=outcome,
+                                                map_runner=self._runner(job, 'summarizer', map_pass=True)):
+            job._output()
+            job.pieces.append(piece)
+        job.truncated = outcome.get('truncated', False)
+        return ''.join(job.pieces)
+
+    async def _translate(self, job, text):
+        total = len(split_paragraphs(text))
+        job.pieces = [None] * total
+        translated = 0
+
+        def on_paragraph(index, translation):
+            nonlocal translated
+            job._output()
+            job.pieces[index] = translation
+            translated += 1
+            job.progress = translated / max(total, 1)
+
+        return await translate_async(text, on_paragraph=on_paragraph, runner=self._runner(job, 'translater'))
+
+
+def get_job_manager():
+    """Returns the process-wide job manager."""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = JobManager()
+        return _default_manager
@@ -0,0 +1,147 @@
+"""
+Pre-flight planning of summaries and translations.
+
+Before a request runs, plan_request() estimates its input tokens and decides
+how it will run: in one call or chunked (map-reduce summaries, segmented
+translations; see services/summarize.py and services/translate.py), on which
+model (the first of MODEL_TIERS whose size class fits the input), and with
+which target length (the "Response Length" slider in pages times
+OUTPUT_TOKENS_PER_PAGE, summaries only). The target is stated in the prompt;
+the output cap leaves OUTPUT_TOKEN_HEADROOM above it, so the model isn't cut
+off mid-sentence for writing a little more. Only the final summary is held to
+that length: the chunk summaries of a map-reduce pass have their own cap,
+SUMMARY_MAP_MAX_OUTPUT_TOKENS. The resulting RequestPlan also
+carries the number of model calls and a rough cost and duration, so the UI can
+show them before anything is sent, and a key that identifies the work for
+the job manager.
+
+Token counts are estimates (see utils/helpers.estimate_tokens) cached per
+document hash.
+"""
+import math
+import threading
+from collections import OrderedDict
+
+from config.settings import (
+    LONG_DOCUMENT_TOKENS, MODEL_CALL_OVERHEAD_SECONDS, MODEL_TIERS, OUTPUT_TOKEN_HEADROOM, OUTPUT_TOKENS_PER_PAGE,
+    SUMMARY_CHUNK_TOKENS, SUMMARY_MAP_MAX_OUTPUT_TOKENS, SUMMARY_MAX_CONCURRENCY, TRANSLATION_MAX_CONCURRENCY,
+    TRANSLATION_SEGMENT_TOKENS
+)
+from utils.doc_store import DocumentHandle
+from utils.helpers import content_hash, estimate_tokens
+
+TRANSLATION_EXPANSION = 1.1 # Output tokens per input token of a translation (English <-> Italian).
+_TOKEN_CACHE_SIZE = 256
+
+_token_counts = OrderedDict() # Document hash -> estimated tokens.
+_token_counts_lock = threading.Lock()
+
+
+def count_tokens(text):
+    """
+    Returns the hash and estimated token count of a document, caching the count per hash.
+
+    Args:
+        text (str or DocumentHandle): The document text, or a handle to the stored text (which carries both).
+
+    Returns:
+        tuple: (document hash, estimated tokens).
+    """
+    if isinstance(text, DocumentHandle):
+        return text.digest, text.tokens
+    document_key = content_hash(text)
+    with _token_counts_lock:
+        tokens = _token_counts.get(document_key)
+        if tokens is None:
+            tokens = _token_counts[document_key] = estimate_tokens(text)
+            while len(_token_counts) > _TOKEN_CACHE_SIZE:
+                _token_counts.popitem(last=False)
+        else:
+            _token_counts.move_to_end(document_key)
+    return document_key, tokens
+
+
+def model_tier(input_tokens):
+    """Returns the first entry of MODEL_TIERS whose size class holds input_tokens."""
+    for tier in MODEL_TIERS:
+        if tier['max_input_tokens'] is None or input_tokens <= tier['max_input_tokens']:
+            return tier
+    return MODEL_TIERS[-1]
+
+
+class RequestPlan:
+    """How a summary or translation will run, and its expected size, cost and duration."""
+
+    def __init__(self, kind, document_key, input_tokens, mode, calls, waves, tier, max_output_tokens,
+                 total_input_tokens, output_tokens, target_tokens=None, map_max_output_tokens=None):
+        self.kind = kind
+        self.document_key = document_key
+        self.input_tokens = input_tokens # Of the document.
+        self.mode = mode # 'one-shot', 'map-reduce' or 'segmented'.
+        self.calls = calls
+        self.waves = waves # Rounds of concurrent calls, the last one being the reduce pass of a map-reduce summary.
+        self.tier = tier
+        self.max_output_tokens = max_output_tokens # Per call (the final one of a map-reduce); None leaves the model's own limit.
+        self.map_max_output_tokens = map_max_output_tokens # Per map-pass call of a map-reduce summary.
+        self.total_input_tokens = total_input_tokens # Of every call, e.g. including the partial summaries reduced.
+        self.output_tokens = output_tokens # Upper estimate over every call.
+        self.target_tokens = target_tokens # Length asked for in the prompt; None leaves it to the model.
+
+    @property
+    def model(self):
+        return self.tier['model']
+
+    @property
+    def key(self):
+        """Identifies the work: same document, model, target length and output cap give the same result."""
+        return content_hash(self.document_key, self.model, str(self.target_tokens), str(self.max_output_tokens),
+                            str(self.map_max_output_tokens))
+
+    @property
+    def estimated_cost(self):
+        """Upper estimate of the price in USD, from the tier's per-million token prices."""
+        return (self.total_input_tokens * self.tier['input_cost_per_million']
+                + self.output_tokens * self.tier['output_cost_per_million']) / 1_000_000
+
+    @property
+    def estimated_seconds(self):
+        """Rough duration: every wave of calls takes the call overhead plus the time to generate one call's output."""
+        per_call_output = self.output_tokens / max(self.calls, 1)
+        return self.waves * (MODEL_CALL_OVERHEAD_SECONDS + per_call_output / self.tier['output_tokens_per_second'])
+
+    def __str__(self):
+        calls = '1 call' if self.calls == 1 else f"{self.mode} in {self.calls} calls"
+        cap = f" · ~{self.target_tokens:,} output tokens" if self.target_tokens else ''
+        return (f"~{self.input_tokens:,} tokens · {calls} · {self.model}{cap} · "
+                f"≤${self.estimated_cost:.4f} · ~{self.estimated_seconds:.0f}s")
+
+
+def plan_request(kind, text, response_pages=1):
+    """
+    Plans a summary or translation of a text.
+
+    Args:
+        kind (str): 'summary' or 'translation'.
+        text (str or DocumentHandle): The text to summarize or translate.
+        response_pages (int): The "Response Length" setting in pages; the target length of summaries.
+
+    Returns:
+        RequestPlan: The plan.
+    """
+    document_key, tokens = count_tokens(text)
+    tier = model_tier(tokens)
+    if kind == 'summary':
+        target = response_pages * OUTPUT_TOKENS_PER_PAGE
+        cap = math.ceil(target * OUTPUT_TOKEN_HEADROOM)
+        if tokens <= LONG_DOCUMENT_TOKENS:
+            return RequestPlan(kind, document_key, tokens, 'one-shot', 1, 1, tier, cap, tokens, cap, target)
+        chunks = math.ceil(tokens / SUMMARY_CHUNK_TOKENS)
+        waves = math.ceil(chunks / SUMMARY_MAX_CONCURRENCY) + 1
+        map_cap = SUMMARY_MAP_MAX_OUTPUT_TOKENS
+        return RequestPlan(kind, document_key, tokens, 'map-reduce', chunks + 1, waves, tier, cap,
+                           tokens + chunks * map_cap, chunks * map_cap + cap, target, map_cap)
+
+    segments = max(math.ceil(tokens / TRANSLATION_SEGMENT_TOKENS), 1)
+    mode = 'one-shot' if segments == 1 else 'segmented'
+    return RequestPlan(kind, document_key, tokens, mode, segments, math.ceil(segments / TRANSLATION_MAX_CONCURRENCY),
+                       tier, None, tokens, math.ceil(tokens * TRANSLATION_EXPANSION))
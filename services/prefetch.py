@@ -0,0 +1,76 @@
+"""
+Speculative summary prefetch right after a PDF upload.
+
+Most users ask for the summary as soon as their document is uploaded, so with
+PREFETCH_SUMMARY on, the upload handler starts the summary job immediately.
+Clicking the summary button then finds the finished job, or joins it while it
+is still running (jobs are keyed by session, document and kind). Spend is
+bounded per deployment: documents above PREFETCH_MAX_TOKENS are never
+prefetched, and prefetches stop for the day once PREFETCH_DAILY_TOKEN_BUDGET
+estimated input tokens have been used.
+"""
+import threading
+import time
+
+from config.settings import PREFETCH_DAILY_TOKEN_BUDGET, PREFETCH_MAX_TOKENS, PREFETCH_SUMMARY
+from services.jobs import get_job_manager
+from services.planner import plan_request
+
+
+class DailyTokenBudget:
+    """A thread-safe token allowance that resets at midnight UTC."""
+
+    def __init__(self, daily_tokens):
+        self.daily_tokens = daily_tokens
+        self.spent = 0
+        self._day = None
+        self._lock = threading.Lock()
+
+    def try_spend(self, tokens):
+        """
+        Reserves tokens from today's allowance.
+
+        Args:
+            tokens (int): Estimated tokens the request will use.
+
+        Returns:
+            bool: True if the tokens were reserved, False if they would exceed the budget.
+        """
+        with self._lock:
+            day = time.gmtime().tm_yday
+            if day != self._day:
+                self._day = day
+                self.spent = 0
+            if self.spent + tokens > self.daily_tokens:
+                return False
+            self.spent += tokens
+            return True
+
+
+_budget = DailyTokenBudget(PREFETCH_DAILY_TOKEN_BUDGET)
+
+
+def prefetch_summary(session_key, text, response_pages=1):
+    """
+    Starts the summary job for a freshly uploaded document if prefetching is enabled and within budget.
+
+    Args:
+        session_key (str): Identifies the browser session (same key the summary button uses).
+        text (str): The normalized document text.
+        response_pages (int): The "Response Length" setting the summary is planned with.
+
+    Returns:
+        Job: The started (or already running) job, or None if nothing was prefetched.
+    """
+    if not PREFETCH_SUMMARY:
+        return None
+    plan = plan_request('summary', text, response_pages)
+    tokens = plan.total_input_tokens
+    if tokens > PREFETCH_MAX_TOKENS:
+        print(f"DEBUG: Not prefetching summary: {tokens} tokens exceeds PREFETCH_MAX_TOKENS")
+        return None
+    if not _budget.try_spend(tokens):
+        print(f"DEBUG: Not prefetching summary: daily prefetch budget spent ({_budget.spent} tokens)")
+        return None
+    print(f"DEBUG: Prefetching summary ({tokens} tokens, {_budget.spent} of today's budget used)")
+    return get_job_manager().submit(session_key, plan.key, 'summary', text, plan)
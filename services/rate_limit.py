@@ -0,0 +1,237 @@
+"""
+Request coalescing, rate limiting and retries for model calls.
+
+Every agent run goes through one process-wide RateLimiter on the background
+event loop (services/event_loop.py):
+
+- Single flight: while a request is in flight, identical requests (same agent
+  and text, e.g. two sessions summarizing the same chapter) wait for its
+  result instead of calling the model again. If the leading request is
+  cancelled, a waiting request takes over.
+- Token buckets: runs start only when both the requests-per-minute and the
+  (estimated) tokens-per-minute budget allow, so bursts queue up locally
+  instead of failing with quota errors.
+- Retries: 429 and 5xx errors are retried with exponential backoff and full
+  jitter, so concurrent callers don't retry in lockstep.
+
+stats() reports queue depth, wait times and counts for the debug log and UI.
+"""
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from google.genai import errors as genai_errors
+
+from config.settings import (
+    RATE_LIMIT_BACKOFF_SECONDS, RATE_LIMIT_MAX_BACKOFF_SECONDS, RATE_LIMIT_MAX_RETRIES,
+    RATE_LIMIT_REQUESTS_PER_MINUTE, RATE_LIMIT_TOKENS_PER_MINUTE
+)
+
+_MISSING = object() # follow() found no usable in-flight request.
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    A bucket refilled continuously at per_minute / 60 units per second, holding at most per_minute units.
+    Used only from the event loop thread, so it needs no lock.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def take(self, amount):
+        """
+        Waits until amount units are available and takes them.
+
+        Args:
+            amount (float): Units to take; amounts above the capacity are capped to it.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        amount = min(amount, self.capacity)
+        start = time.monotonic()
+        while True:
+            self._refill()
+            if self.level >= amount:
+                self.level -= amount
+                return time.monotonic() - start
+            await asyncio.sleep((amount - self.level) / self.rate)
+
+
+def is_retryable(error):
+    """Returns True for quota (429) and server (5xx) errors from the Gemini API."""
+    if not isinstance(error, genai_errors.APIError):
+        return False
+    return error.code == 429 or (error.code or 0) >= 500
+
+
+class RateLimiter:
+    """Coalesces identical in-flight requests, enforces RPM/TPM budgets and retries transient errors."""
+
+    def __init__(self, requests_per_minute=RATE_LIMIT_REQUESTS_PER_MINUTE, tokens_per_minute=RATE_LIMIT_TOKENS_PER_MINUTE,
+                 max_retries=RATE_LIMIT_MAX_RETRIES, backoff_seconds=RATE_LIMIT_BACKOFF_SECONDS,
+                 max_backoff_seconds=RATE_LIMIT_MAX_BACKOFF_SECONDS):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._flights = {}
+        self._waiting = 0
+        self._counts = {'requests': 0, 'coalesced': 0, 'retries': 0, 'failures': 0}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    async def acquire(self, tokens):
+        """
+        Waits until one request of about `tokens` tokens fits in both budgets.
+
+        Args:
+            tokens (int): Estimated tokens of the request.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        self._waiting += 1
+        try:
+            waited = await self.requests.take(1) + await self.tokens.take(tokens)
+        finally:
+            self._waiting -= 1
+        self._counts['requests'] += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        if waited > 0.1:
+            print(f"DEBUG: Rate limit delayed a request by {waited:.1f}s ({self._waiting} still queued)")
+        return waited
+
+    async def backoff(self, attempt, error):
+        """
+        Sleeps before retrying a failed request, if the error is transient and retries are left.
+
+        Args:
+            attempt (int): Number of the attempt that failed, starting at 0.
+            error (Exception): The error it raised.
+
+        Returns:
+            bool: True if the request should be retried, False if the error should be raised.
+        """
+        if not is_retryable(error) or attempt >= self.max_retries:
+            self._counts['failures'] += 1
+            return False
+        delay = random.uniform(0, min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt))
+        print(f"DEBUG: Model call failed ({error.code}); retry {attempt + 1} of {self.max_retries} in {delay:.1f}s")
+        self._counts['retries'] += 1
+        await asyncio.sleep(delay)
+        return True
+
+    async def follow(self, key):
+        """
+        Waits for the in-flight request with the same key, if there is one.
+
+        Args:
+            key (str): Identifies the request (e.g. its result cache key).
+
+        Returns:
+            The leading request's result, or a sentinel (see is_missing()) if there is no in-flight
+            request or it was cancelled before finishing. Raises the leading request's error.
+        """
+        while (flight := self._flights.get(key)) is not None:
+            self._counts['coalesced'] += 1
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise
+                # The leading request was cancelled (e.g. its job was); another waiter or this one takes over.
+        return _MISSING
+
+    @staticmethod
+    def is_missing(result):
+        """Returns True if follow() found nothing to wait for."""
+        return result is _MISSING
+
+    @asynccontextmanager
+    async def lead(self, key):
+        """
+        Registers the caller as the one request in flight for key; yields a future to resolve with its result.
+        If the block exits without resolving it, waiting requests take over (on cancellation) or see the error.
+        """
+        flight = asyncio.get_running_loop().create_future()
+        if key is not None:
+            self._flights[key] = flight
+        try:
+            yield flight
+        except Exception as e:
+            if not flight.done():
+                flight.set_exception(e)
+                flight.exception() # Retrieved here so an unwaited flight doesn't log "exception never retrieved".
+            raise
+        finally:
+            if not flight.done():
+                flight.cancel()
+            if key is not None and self._flights.get(key) is flight:
+                del self._flights[key]
+
+    async def call(self, make_coroutine, tokens, key=None):
+        """
+        Runs a model request under the limits, coalescing it with an identical in-flight request.
+
+        Args:
+            make_coroutine (callable): Returns a new coroutine for each attempt.
+            tokens (int): Estimated tokens of the request.
+            key (str): Identifies identical requests; None never coalesces (e.g. turns of a chat session).
+
+        Returns:
+            The coroutine's result.
+        """
+        if key is not None:
+            result = await self.follow(key)
+            if not self.is_missing(result):
+                return result
+        async with self.lead(key) as flight:
+            attempt = 0
+            while True:
+                await self.acquire(tokens)
+                try:
+                    result = await make_coroutine()
+                    break
+                except Exception as e:
+                    if not await self.backoff(attempt, e):
+                        raise
+                    attempt += 1
+            flight.set_result(result)
+            return result
+
+    def stats(self):
+        """Returns queue depth, in-flight requests, wait times and request/coalesced/retry/failure counts."""
+        requests = self._counts['requests']
+        return {
+            **self._counts,
+            'queued': self._waiting,
+            'in_flight': len(self._flights),
+            'average_wait_seconds': self._wait_total / requests if requests else 0.0,
+            'max_wait_seconds': self._wait_max,
+        }
+
+
+def get_rate_limiter():
+    """Returns the process-wide rate limiter."""
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter()
+        return _default_limiter
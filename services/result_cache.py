@@ -0,0 +1,175 @@
+"""
+Content-addressed, cross-session cache of agent responses.
+
+Responses are stored in a SQLite file keyed by a hash of the request text and
+everything that shapes the answer: each agent's name, instruction, model and
+generation config, recursing into sub-agents. Two users uploading the same
+chapter (or one user re-uploading it) share one model call. Entries are
+evicted least-recently-used once the entry count or total size exceeds its
+limit. A single connection guarded by a lock is shared by every Streamlit
+worker thread.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from config.settings import RESULT_CACHE_MAX_BYTES, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_PATH
+from utils.helpers import content_hash
+
+# Bump to invalidate every stored response (e.g. after changing how responses are post-processed).
+RESULT_CACHE_VERSION = 1
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def agent_fingerprint(agent) -> str:
+    """
+    Returns a stable description of everything in an agent tree that affects its responses.
+
+    Args:
+        agent: An ADK agent; its sub_agents are included recursively.
+
+    Returns:
+        str: The name, model, instruction and generation config of the agent and its sub-agents.
+    """
+    instruction = getattr(agent, 'instruction', '')
+    if callable(instruction): # An InstructionProvider; identify it by name.
+        instruction = f"{instruction.__module__}.{instruction.__qualname__}"
+    model = getattr(agent, 'model', '')
+    model = getattr(model, 'model', model) # A BaseLlm instance carries the model name.
+    config = getattr(agent, 'generate_content_config', None)
+    config = config.model_dump_json(exclude_none=True) if config is not None else ''
+    sub_agents = ','.join(agent_fingerprint(sub_agent) for sub_agent in getattr(agent, 'sub_agents', []))
+    return content_hash(agent.name, str(model), instruction, config, sub_agents)
+
+
+def result_cache_key(agent, text: str) -> str:
+    """
+    Returns the cache key of a request.
+
+    Args:
+        agent: The agent (tree) that answers the request.
+        text (str): The full user message sent to the agent.
+
+    Returns:
+        str: A SHA-256 hex digest.
+    """
+    return content_hash(str(RESULT_CACHE_VERSION), agent_fingerprint(agent), text)
+
+
+class ResultCache:
+    """SQLite-backed LRU cache of response texts, safe to share between threads."""
+
+    def __init__(self, path=RESULT_CACHE_PATH, max_entries=RESULT_CACHE_MAX_ENTRIES, max_bytes=RESULT_CACHE_MAX_BYTES):
+        """
+        Opens (or creates) the cache file.
+
+        Args:
+            path (str): SQLite file; ':memory:' keeps the cache in this process only.
+            max_entries (int): Maximum number of stored responses.
+            max_bytes (int): Maximum total size of the stored responses (UTF-8 bytes).
+        """
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # One connection shared by every thread; the lock serializes access to it.
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL') # Readers in other processes don't block on writes.
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, agent TEXT, value TEXT, size INTEGER, created REAL, accessed REAL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+
+    def get(self, key):
+        """
+        Returns the cached response for a key, or None, and marks it as recently used.
+
+        Args:
+            key (str): A key from result_cache_key().
+
+        Returns:
+            str: The cached response, or None on a miss.
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute('UPDATE results SET accessed = ? WHERE key = ?', (time.time(), key))
+            return row[0]
+
+    def put(self, key, value, agent_name=''):
+        """
+        Stores a response, then evicts the least recently used entries over the limits.
+
+        Args:
+            key (str): A key from result_cache_key().
+            value (str): The response text.
+            agent_name (str): Name of the answering agent, kept for inspection.
+        """
+        now = time.time()
+        size = len(value.encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO results (key, agent, value, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)',
+                (key, agent_name, value, size, now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        count, total = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Evict down to 90% of both limits so the next few inserts don't each trigger another pass.
+        max_entries, max_bytes = int(self.max_entries * 0.9), int(self.max_bytes * 0.9)
+        removed = []
+        for key, size in self._conn.execute('SELECT key, size FROM results ORDER BY accessed'):
+            if count <= max_entries and total <= max_bytes:
+                break
+            removed.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany('DELETE FROM results WHERE key = ?', removed)
+        print(f"DEBUG: Result cache evicted {len(removed)} entries")
+
+    def stats(self):
+        """
+        Returns the hit/miss counters of this process and the current size of the cache.
+
+        Returns:
+            dict: hits, misses, hit_rate, entries and bytes.
+        """
+        with self._lock:
+            count, total = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': count,
+                'bytes': total,
+            }
+
+    def clear(self):
+        """Removes every stored response."""
+        with self._lock:
+            self._conn.execute('DELETE FROM results')
+
+
+def get_result_cache():
+    """Returns the process-wide result cache, opening it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache()
+        return _default_cache
@@ -0,0 +1,326 @@
+"""
+Durable, bounded ADK session storage on local SQLite.
+
+Each session is stored as one JSON row keyed by (app, user, session ID), so
+sessions are scoped per user and survive restarts. Recently used sessions
+stay in a hot in-memory LRU cache of SESSION_CACHE_SIZE sessions, and
+get_session returns the cached object instead of a deep copy, which is what
+InMemorySessionService pays for on every lookup. Appended events mark a
+session dirty; dirty sessions are written together in one transaction once
+SESSION_FLUSH_EVENTS events have accumulated or SESSION_FLUSH_SECONDS have
+passed, before they leave the cache, and at exit. SQLite is read and
+written on worker threads, so the shared event loop keeps serving other
+turns meanwhile. Sessions untouched for SESSION_TTL_SECONDS are deleted.
+Stored history is compacted after every event (see services/history.py).
+
+App- and user-scoped state ('app:' / 'user:' keys) is kept per session.
+"""
+import asyncio
+import atexit
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+
+from google.adk.sessions import Session
+from google.adk.sessions.base_session_service import BaseSessionService, ListSessionsResponse
+
+from config.settings import (
+    SESSION_CACHE_SIZE, SESSION_DB_PATH, SESSION_FLUSH_EVENTS, SESSION_FLUSH_SECONDS, SESSION_TTL_SECONDS
+)
+from services.history import compact_events
+
+PURGE_INTERVAL_SECONDS = 60 # Expired sessions are looked for at most this often.
+
+_services = weakref.WeakSet() # Live services, flushed once at exit without being kept alive by it.
+
+
+def _flush_all():
+    for service in list(_services):
+        service.flush()
+
+
+atexit.register(_flush_all)
+
+
+class SqliteSessionService(BaseSessionService):
+    """An ADK session service backed by SQLite, with a hot LRU cache and batched writes."""
+
+    def __init__(self, path=SESSION_DB_PATH, cache_size=SESSION_CACHE_SIZE, ttl_seconds=SESSION_TTL_SECONDS,
+                 flush_events=SESSION_FLUSH_EVENTS, flush_seconds=SESSION_FLUSH_SECONDS, compact=True):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.cache_size = cache_size
+        self.ttl_seconds = ttl_seconds
+        self.flush_events = flush_events
+        self.flush_seconds = flush_seconds
+        self.compact = compact
+        self._cache = OrderedDict() # (app, user, session ID) -> Session, least recently used first.
+        self._dirty = set()
+        self._writing = set() # Keys whose rows are being written; like dirty ones, they stay cached until then.
+        self._pending_events = 0
+        self._flush_handle = None
+        self._flush_task = None
+        self._last_purge = 0.0
+        self._counts = {'hits': 0, 'misses': 0, 'flushes': 0, 'rows_written': 0, 'expired': 0}
+        self._lock = threading.RLock() # Guards the cache and the counters.
+        self._db_lock = threading.Lock() # Guards the connection, which is used from worker threads.
+        self._write_lock = asyncio.Lock() # Keeps writes and deletes from the event loop in order.
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            ' app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL,'
+            ' data TEXT NOT NULL, last_update_time REAL NOT NULL,'
+            ' PRIMARY KEY (app_name, user_id, session_id))'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS sessions_by_update ON sessions (last_update_time)')
+        _services.add(self)
+
+    async def create_session(self, *, app_name, user_id, state=None, session_id=None):
+        await self._purge_expired()
+        session = Session(
+            id=(session_id or '').strip() or str(uuid.uuid4()),
+            app_name=app_name,
+            user_id=user_id,
+            state=dict(state or {}),
+            last_update_time=time.time(),
+        )
+        key = (app_name, user_id, session.id)
+        existing, _ = await self._lookup(key)
+        if existing is not None:
+            raise ValueError(f'Session {session.id} already exists')
+        async with self._write_lock:
+            with self._lock:
+                self._remember(key, session)
+                self._writing.add(key)
+                rows = [self._row(key, session)]
+            # Written at once, so a session that gets no events still exists after a restart.
+            await asyncio.to_thread(self._write_rows, rows)
+            self._written({key})
+        return session
+
+    async def get_session(self, *, app_name, user_id, session_id, config=None):
+        key = (app_name, user_id, session_id)
+        session, hit = await self._lookup(key)
+        with self._lock:
+            self._counts['hits' if hit else 'misses'] += 1
+        if session is None:
+            return None
+        if time.time() - session.last_update_time > self.ttl_seconds:
+            await self._delete(key)
+            return None
+        with self._lock:
+            over_budget = self._remember(key, session)
+        if over_budget:
+            await self._flush_async()
+        if config is None or not (config.num_recent_events or config.after_timestamp):
+            return session # The live object: the Runner appends events to it through append_event.
+        events = session.events
+        if config.num_recent_events:
+            events = events[-config.num_recent_events:]
+        if config.after_timestamp:
+            events = [event for event in events if event.timestamp >= config.after_timestamp]
+        return session.model_copy(update={'events': events})
+
+    async def list_sessions(self, *, app_name, user_id):
+        await self._flush_async()
+        rows = await asyncio.to_thread(self._select, app_name, user_id)
+        sessions = []
+        for (data,) in rows:
+            session = Session.model_validate_json(data)
+            session.events = []
+            sessions.append(session)
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name, user_id, session_id):
+        await self._delete((app_name, user_id, session_id))
+
+    async def append_event(self, session, event):
+        event = await super().append_event(session=session, event=event)
+        if event.partial:
+            return event
+        session.last_update_time = event.timestamp
+        key = (session.app_name, session.user_id, session.id)
+        stored, _ = await self._lookup(key)
+        if stored is None:
+            print(f"DEBUG: Event appended to unknown ADK session {session.id}; not stored")
+            return event
+        if stored is not session:
+            # A filtered copy from get_session(config=...): apply the event to the stored session as well.
+            await super().append_event(session=stored, event=event)
+            stored.last_update_time = event.timestamp
+        if self.compact:
+            compact_events(stored.events)
+        await self._mark_dirty(key, stored, 1)
+        return event
+
+    async def discard_events(self, *, app_name, user_id, session_id, keep_ids):
+        """
+        Removes the events of a session whose ID is not in keep_ids, e.g. those a failed turn added before it is retried.
+
+        Args:
+            app_name (str): The app name.
+            user_id (str): The session's user.
+            session_id (str): The session ID.
+            keep_ids (set): IDs of the events to keep.
+
+        Returns:
+            int: The number of events removed.
+        """
+        key = (app_name, user_id, session_id)
+        session, _ = await self._lookup(key)
+        if session is None:
+            return 0
+        kept = [event for event in session.events if event.id in keep_ids]
+        removed = len(session.events) - len(kept)
+        if removed:
+            session.events[:] = kept
+            await self._mark_dirty(key, session, removed)
+            print(f"DEBUG: Removed {removed} events of a failed turn from ADK session {session_id}")
+        return removed
+
+    def flush(self):
+        """Writes every dirty session to SQLite in one transaction, on the calling thread (e.g. at exit)."""
+        with self._lock:
+            rows, keys = self._take_dirty()
+        if rows:
+            self._write_rows(rows)
+            self._written(keys, flush=True)
+
+    def stats(self):
+        """Returns cache hits/misses, flush counts and the number of cached, dirty and stored sessions."""
+        with self._db_lock:
+            stored = self._conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+        with self._lock:
+            return {**self._counts, 'cached': len(self._cache), 'dirty': len(self._dirty), 'stored': stored}
+
+    async def _flush_async(self):
+        """Like flush, but writes on a worker thread so the event loop keeps serving other turns."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        async with self._write_lock:
+            with self._lock:
+                rows, keys = self._take_dirty()
+            if rows:
+                await asyncio.to_thread(self._write_rows, rows)
+                self._written(keys, flush=True)
+
+    def _flush_later(self):
+        self._flush_handle = None
+        self._flush_task = asyncio.ensure_future(self._flush_async())
+
+    async def _mark_dirty(self, key, session, events):
+        with self._lock:
+            self._remember(key, session)
+            self._dirty.add(key)
+            self._pending_events += events
+            flush_now = self._pending_events >= self.flush_events or len(self._cache) > self.cache_size
+        if flush_now:
+            await self._flush_async()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_seconds, self._flush_later)
+
+    async def _lookup(self, key):
+        """Returns (session, cache hit), loading the session from SQLite on a worker thread on a miss."""
+        with self._lock:
+            session = self._cache.get(key)
+        if session is not None:
+            return session, True
+        loaded = await asyncio.to_thread(self._load, key)
+        with self._lock:
+            return self._cache.get(key, loaded), False # Keep one live object if a concurrent call cached it.
+
+    async def _delete(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+            self._dirty.discard(key)
+        async with self._write_lock:
+            await asyncio.to_thread(self._delete_row, key)
+
+    async def _purge_expired(self):
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        cutoff = now - self.ttl_seconds
+        with self._lock:
+            for key in [key for key, session in self._cache.items() if session.last_update_time < cutoff]:
+                self._cache.pop(key)
+                self._dirty.discard(key)
+        async with self._write_lock:
+            deleted = await asyncio.to_thread(self._delete_expired, cutoff)
+        if deleted:
+            with self._lock:
+                self._counts['expired'] += deleted
+            print(f"DEBUG: Deleted {deleted} expired ADK sessions")
+
+    def _remember(self, key, session):
+        """Caches a session and evicts clean ones past cache_size; returns whether dirty ones still exceed it."""
+        self._cache[key] = session
+        self._cache.move_to_end(key)
+        return self._trim()
+
+    def _trim(self):
+        for old_key in list(self._cache):
+            if len(self._cache) <= self.cache_size:
+                break
+            if old_key not in self._dirty and old_key not in self._writing:
+                del self._cache[old_key]
+        return len(self._cache) > self.cache_size
+
+    def _take_dirty(self):
+        rows = [self._row(key, self._cache[key]) for key in self._dirty]
+        keys = set(self._dirty)
+        self._writing |= keys
+        self._dirty.clear()
+        self._pending_events = 0
+        return rows, keys
+
+    def _written(self, keys, flush=False):
+        with self._lock:
+            self._writing -= keys
+            self._counts['rows_written'] += len(keys)
+            if flush:
+                self._counts['flushes'] += 1
+            self._trim() # Dirty sessions that were kept past cache_size can leave the cache now.
+
+    @staticmethod
+    def _row(key, session):
+        return (*key, session.model_dump_json(), session.last_update_time)
+
+    def _write_rows(self, rows):
+        with self._db_lock:
+            self._conn.execute('BEGIN')
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO sessions (app_name, user_id, session_id, data, last_update_time) VALUES (?, ?, ?, ?, ?)',
+                rows,
+            )
+            self._conn.execute('COMMIT')
+
+    def _load(self, key):
+        with self._db_lock:
+            row = self._conn.execute(
+                'SELECT data FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?', key
+            ).fetchone()
+        return Session.model_validate_json(row[0]) if row else None
+
+    def _select(self, app_name, user_id):
+        with self._db_lock:
+            return self._conn.execute(
+                'SELECT data FROM sessions WHERE app_name = ? AND user_id = ?', (app_name, user_id)
+            ).fetchall()
+
+    def _delete_row(self, key):
+        with self._db_lock:
+            self._conn.execute('DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?', key)
+
+    def _delete_expired(self, cutoff):
+        with self._db_lock:
+            return self._conn.execute('DELETE FROM sessions WHERE last_update_time < ?', (cutoff,)).rowcount
@@ -0,0 +1,145 @@
+"""
+Summaries through the summarizer sub-agent, with map-reduce for long documents.
+
+Requests go straight to the summarizer's own Runner (see get_agent_runner),
+so there is no routing call to root_agent. Short texts are summarized in a
+single call. Longer texts are split into token-bounded chunks (see
+utils/chunking.py) that are summarized concurrently, each in its own throwaway
+session and at most SUMMARY_MAX_CONCURRENCY at a time; the partial summaries
+are then merged by a final reduce pass into the `## Summary of ...` format of
+SUMMARIZER_INSTRUCTION. Every chunk result goes through the result cache, so
+after a partial edit only the changed chunks (and the reduce pass) are sent to
+the model again. For that, map prompts hold nothing but the chunk text: a
+chunk's position would change every prompt after an inserted chunk. The
+order of the parts is given to the final reduce pass instead.
+"""
+import asyncio
+
+from config.settings import LONG_DOCUMENT_TOKENS, SUMMARY_CHUNK_TOKENS, SUMMARY_MAX_CONCURRENCY
+from services.adk_service import get_agent_runner, run_adk_ephemeral_async, stream_adk_async
+from utils.chunking import chunk_text
+from utils.helpers import estimate_tokens
+
+SUMMARY_PROMPT = 'Summarize the following Philosophy chapter{length}: {text}'
+LENGTH_PROMPT = ' in about {words:,} words' # Inserted into SUMMARY_PROMPT and REDUCE_PROMPT for a target length.
+MAP_PROMPT = (
+    'Summarize the following excerpt of a longer Philosophy text. '
+    'Cover every study point of this excerpt only: {text}'
+)
+REDUCE_PROMPT = (
+    'The following are summaries of consecutive parts of one Philosophy text, numbered in order. '
+    'Merge them into a single summary of the whole text{length}, following that order, without repeating points: {text}'
+)
+GROUP_REDUCE_PROMPT = (
+    'The following are summaries of consecutive parts of a longer Philosophy text, in order. '
+    'Merge them into a single summary of these parts, without repeating points: {text}'
+)
+
+
+async def _map(runner, chunks, prompt, max_concurrency, on_progress=None):
+    """Summarizes every chunk concurrently, at most max_concurrency calls at a time."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    finished = 0
+
+    async def summarize_chunk(index, chunk):
+        nonlocal finished
+        async with semaphore:
+            print(f"DEBUG: Summarizing chunk {index} of {len(chunks)} ({estimate_tokens(chunk)} tokens)")
+            summary = await run_adk_ephemeral_async(runner, prompt.format(text=chunk)) # Cached by chunk text alone.
+        finished += 1
+        if on_progress is not None:
+            on_progress(finished / len(chunks))
+        return summary
+
+    return await asyncio.gather(*(summarize_chunk(i, chunk) for i, chunk in enumerate(chunks, start=1)))
+
+
+async def _partial_summaries_async(runner, text, chunk_tokens, max_concurrency, on_progress=None):
+    """
+    Runs the map pass (and any grouped reduce passes); returns the summaries left for the final reduce.
+    on_progress receives the fraction of map calls finished.
+    """
+    chunks = chunk_text(text, chunk_tokens)
+    print(f"DEBUG: Map-reduce summary of {estimate_tokens(text)} tokens in {len(chunks)} chunks")
+    summaries = await _map(runner, chunks, MAP_PROMPT, max_concurrency, on_progress)
+
+    # If the partial summaries are themselves too long for one call, merge them in groups first.
+    while len(summaries) > 1 and estimate_tokens('\n\n'.join(summaries)) > chunk_tokens:
+        groups = chunk_text('\n\n'.join(summaries), chunk_tokens)
+        if len(groups) >= len(summaries):
+            break # Every summary is a group of its own; merging in one call is the only option left.
+        summaries = await _map(runner, groups, GROUP_REDUCE_PROMPT, max_concurrency)
+    return summaries
+
+
+def _length(target_tokens):
+    """Returns the length clause of a prompt: about three words per four tokens, or nothing without a target."""
+    return LENGTH_PROMPT.format(words=int(round(target_tokens * 0.75, -1))) if target_tokens else ''
+
+
+def _reduce_prompt(summaries, target_tokens=None):
+    """Returns the final reduce prompt, numbering the partial summaries so the model keeps their order."""
+    parts = '\n\n'.join(f'Part {index} of {len(summaries)}:\n{summary}' for index, summary in enumerate(summaries, start=1))
+    return REDUCE_PROMPT.format(length=_length(target_tokens), text=parts)
+
+
+async def summarize_async(text, runner=None, long_document_tokens=LONG_DOCUMENT_TOKENS,
+                          chunk_tokens=SUMMARY_CHUNK_TOKENS, max_concurrency=SUMMARY_MAX_CONCURRENCY,
+                          target_tokens=None, outcome=None, map_runner=None):
+    """
+    Summarizes a document, switching to map-reduce for texts longer than long_document_tokens.
+
+    Args:
+        text (str): The document text, with paragraphs separated by blank lines.
+        runner (Runner): Runner of the summarizer; defaults to get_agent_runner('summarizer').
+        long_document_tokens (int): Estimated token count above which map-reduce is used.
+        chunk_tokens (int): Maximum estimated tokens per chunk (and per reduce input).
+        max_concurrency (int): Maximum number of model calls in flight.
+        target_tokens (int): Length of the summary asked for in the prompt (see RequestPlan.target_tokens).
+        outcome (dict): If given, 'truncated' is set when the final summary was cut off at the output cap.
+        map_runner (Runner): Runner of the map pass, with its own output cap; defaults to runner.
+
+    Returns:
+        str: The summary.
+    """
+    runner = runner or get_agent_runner('summarizer')
+    if estimate_tokens(text) <= long_document_tokens:
+        return await run_adk_ephemeral_async(runner, SUMMARY_PROMPT.format(length=_length(target_tokens), text=text),
+                                             outcome=outcome)
+    summaries = await _partial_summaries_async(map_runner or runner, text, chunk_tokens, max_concurrency)
+    if len(summaries) == 1:
+        return summaries[0]
+    return await run_adk_ephemeral_async(runner, _reduce_prompt(summaries, target_tokens), outcome=outcome)
+
+
+async def stream_summary_async(text, runner=None, long_document_tokens=LONG_DOCUMENT_TOKENS, on_progress=None,
+                               target_tokens=None, outcome=None, map_runner=None):
+    """
+    Like summarize_async(), but yields the summary text as the model produces it.
+    For long documents the map pass runs first and only the final reduce pass is streamed.
+
+    Args:
+        text (str): The document text.
+        runner (Runner): Runner of the summarizer; defaults to get_agent_runner('summarizer').
+        long_document_tokens (int): Estimated token count above which map-reduce is used.
+        on_progress (callable): For long documents, called with the fraction of chunks summarized.
+        target_tokens (int): Length of the summary asked for in the prompt (see RequestPlan.target_tokens).
+        outcome (dict): If given, 'truncated' is set when the final summary was cut off at the output cap.
+        map_runner (Runner): Runner of the map pass, with its own output cap; defaults to runner.
+
+    Yields:
+        str: Successive pieces of the summary.
+    """
+    runner = runner or get_agent_runner('summarizer')
+    if estimate_tokens(text) <= long_document_tokens:
+        prompt = SUMMARY_PROMPT.format(length=_length(target_tokens), text=text)
+    else:
+        summaries = await _partial_summaries_async(map_runner or runner, text, SUMMARY_CHUNK_TOKENS,
+                                                   SUMMARY_MAX_CONCURRENCY, on_progress)
+        if len(summaries) == 1:
+            yield summaries[0]
+            return
+        prompt = _reduce_prompt(summaries, target_tokens)
+
+    async for piece in stream_adk_async(runner, None, prompt, outcome=outcome): # A new throwaway session per attempt.
+        yield piece
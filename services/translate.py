@@ -0,0 +1,149 @@
+"""
+Chunked, order-preserving concurrent translation through the translater sub-agent.
+
+Requests go straight to the translater's own Runner (see get_agent_runner),
+so there is no routing call to root_agent. The text is split into paragraphs.
+Paragraphs already translated (by any session) are read from the result
+cache; the rest are grouped into segments of at most
+TRANSLATION_SEGMENT_TOKENS, which are translated concurrently by at most
+TRANSLATION_MAX_CONCURRENCY calls, each in its own throwaway session. A
+paragraph longer than a segment is first split into sentence groups that
+fit one, which are translated as separate passages and joined back.
+Paragraphs inside a segment are separated by a marker line so the response
+can be split back; if the marker count doesn't match, that segment falls back
+to one call per paragraph. Every paragraph is cached under the key of its
+single-paragraph request, so an edited document only re-translates the
+paragraphs that changed, and a failed segment loses no other work.
+"""
+import asyncio
+import re
+
+from config.settings import TRANSLATION_MAX_CONCURRENCY, TRANSLATION_SEGMENT_TOKENS
+from services.adk_service import AGENT_ERROR_TEXT, get_agent_runner, run_adk_ephemeral_async
+from services.result_cache import get_result_cache, result_cache_key
+from utils.chunking import split_long_paragraph
+from utils.helpers import estimate_tokens
+
+PARAGRAPH_PROMPT = '{text}' # The translater's instruction already says what to do with the message.
+SEGMENT_MARKER = '<<<>>>'
+SEGMENT_PROMPT = (
+    f'The paragraphs below are separated by lines containing only {SEGMENT_MARKER}; '
+    'keep every such line unchanged, in the same place.\n\n{text}'
+)
+_MARKER_SPLIT = re.compile(rf'\s*{re.escape(SEGMENT_MARKER)}\s*')
+
+
+def split_paragraphs(text):
+    """Returns the non-empty paragraphs of a text (separated by blank lines)."""
+    return [paragraph.strip() for paragraph in text.split('\n\n') if paragraph.strip()]
+
+
+def _passages(paragraphs, max_tokens):
+    """
+    Returns the passages translated in one piece (whole paragraphs, or sentence groups of the paragraphs longer
+    than max_tokens) and the index of the paragraph each one belongs to.
+    """
+    passages, owners = [], []
+    for index, paragraph in enumerate(paragraphs):
+        pieces = [paragraph] if estimate_tokens(paragraph) + 2 <= max_tokens else split_long_paragraph(paragraph, max_tokens - 2)
+        passages.extend(pieces)
+        owners.extend([index] * len(pieces))
+    return passages, owners
+
+
+def _segments(indices, paragraphs, max_tokens):
+    """Groups paragraph indices into consecutive runs of at most max_tokens (estimated)."""
+    segments, current, size = [], [], 0
+    for index in indices:
+        tokens = estimate_tokens(paragraphs[index]) + 2
+        if current and (size + tokens > max_tokens or index != current[-1] + 1):
+            segments.append(current)
+            current, size = [], 0
+        current.append(index)
+        size += tokens
+    if current:
+        segments.append(current)
+    return segments
+
+
+def _failed(response):
+    return not response or response == AGENT_ERROR_TEXT or response.startswith('Error:')
+
+
+async def translate_async(text, on_paragraph=None, runner=None, segment_tokens=TRANSLATION_SEGMENT_TOKENS,
+                          max_concurrency=TRANSLATION_MAX_CONCURRENCY):
+    """
+    Translates a text paragraph by paragraph, concurrently, and reassembles it in order.
+
+    Args:
+        text (str): Text with paragraphs separated by blank lines.
+        on_paragraph (callable): Called as on_paragraph(index, translation) as soon as each
+            paragraph is available (cached paragraphs first, then in completion order).
+        runner (Runner): Runner of the translater; defaults to get_agent_runner('translater').
+        segment_tokens (int): Maximum estimated tokens sent per call.
+        max_concurrency (int): Maximum number of model calls in flight.
+
+    Returns:
+        str: The translated paragraphs, in the original order, separated by blank lines.
+            Paragraphs that could not be translated are kept in the source language.
+    """
+    runner = runner or get_agent_runner('translater')
+    # Passages are what is translated and cached: whole paragraphs, or sentence groups of over-long ones.
+    passages, owners = _passages(split_paragraphs(text), segment_tokens)
+    cache = get_result_cache()
+    keys = [result_cache_key(runner.agent, PARAGRAPH_PROMPT.format(text=passage)) for passage in passages]
+    translations = [None] * len(passages)
+    members = [[] for _ in range(owners[-1] + 1 if owners else 0)] # Passage indices of each source paragraph.
+    for index, owner in enumerate(owners):
+        members[owner].append(index)
+    remaining = [len(indices) for indices in members]
+
+    def paragraph_translation(owner):
+        return ' '.join(translations[index] for index in members[owner])
+
+    def done(index, translation):
+        translations[index] = translation
+        remaining[owners[index]] -= 1
+        if on_paragraph is not None and not remaining[owners[index]]:
+            on_paragraph(owners[index], paragraph_translation(owners[index]))
+
+    for index, key in enumerate(keys):
+        cached = cache.get(key)
+        if cached is not None:
+            done(index, cached)
+
+    missing = [i for i, translation in enumerate(translations) if translation is None]
+    segments = _segments(missing, passages, segment_tokens)
+    print(f"DEBUG: Translating {len(missing)} of {len(passages)} passages in {len(segments)} segments")
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def translate_paragraph(index):
+        # Cached by run_adk_ephemeral_async under keys[index] on success.
+        translation = await run_adk_ephemeral_async(runner, PARAGRAPH_PROMPT.format(text=passages[index]))
+        if _failed(translation):
+            print(f"DEBUG: Passage {index} could not be translated; keeping the source text")
+            translation = passages[index]
+        done(index, translation)
+
+    async def translate_segment(segment):
+        async with semaphore:
+            if len(segment) == 1:
+                return await translate_paragraph(segment[0])
+            joined = f'\n\n{SEGMENT_MARKER}\n\n'.join(passages[i] for i in segment)
+            try:
+                response = await run_adk_ephemeral_async(runner, SEGMENT_PROMPT.format(text=joined), use_cache=False)
+            except Exception as e:
+                print(f"DEBUG: Segment of {len(segment)} passages failed ({e}); translating them one by one")
+                response = None
+            parts = [] if _failed(response) else [part for part in _MARKER_SPLIT.split(response.strip()) if part]
+            if len(parts) == len(segment):
+                for index, part in zip(segment, parts):
+                    cache.put(keys[index], part, runner.agent.name)
+                    done(index, part)
+                return
+            print(f"DEBUG: Segment returned {len(parts)} of {len(segment)} passages; translating them one by one")
+        # Outside the semaphore: translate_segment calls re-acquire it per paragraph.
+        await asyncio.gather(*(translate_segment([index]) for index in segment))
+
+    await asyncio.gather(*(translate_segment(segment) for segment in segments))
+    return '\n\n'.join(paragraph_translation(owner) for owner in range(len(members)))
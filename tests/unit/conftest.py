@@ -0,0 +1,23 @@
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from config.settings import APP_NAME_FOR_ADK
+from services import rate_limit, result_cache
+
+
+@pytest.fixture
+def make_runner(monkeypatch):
+    """
+    Returns a factory for ADK Runners around a fake model, with a fresh in-memory result cache and a rate
+    limiter that retries at once, so tests share neither cached answers nor backoff delays.
+    """
+    monkeypatch.setattr(result_cache, '_default_cache', result_cache.ResultCache(':memory:'))
+    monkeypatch.setattr(rate_limit, '_default_limiter', rate_limit.RateLimiter(backoff_seconds=0.001))
+
+    def make(model, name='summarizer', session_service=None):
+        return Runner(agent=LlmAgent(name=name, model=model), app_name=APP_NAME_FOR_ADK,
+                      session_service=session_service or InMemorySessionService())
+
+    return make
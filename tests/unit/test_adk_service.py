@@ -0,0 +1,98 @@
+import asyncio
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import errors as genai_errors
+from google.genai import types as genai_types
+
+from config.settings import APP_NAME_FOR_ADK
+from services import adk_service, result_cache
+from services.event_loop import run_sync
+from services.session_store import SqliteSessionService
+
+REQUESTS = [] # Characters of user text in each model request.
+
+
+class FlakyLlm(BaseLlm):
+    """Fails its first call with a 503, then answers 'ok'."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        REQUESTS.append(sum(len(part.text or '') for content in llm_request.contents if content.role == 'user'
+                            for part in content.parts))
+        if len(REQUESTS) == 1:
+            raise genai_errors.ServerError(503, {'error': {'message': 'overloaded'}})
+        yield LlmResponse(content=genai_types.Content(role='model', parts=[genai_types.Part(text='ok')]))
+
+
+async def _collect(generator):
+    return [piece async for piece in generator]
+
+
+def test_stream_retry_runs_in_a_new_ephemeral_session(make_runner):
+    REQUESTS.clear()
+    runner = make_runner(FlakyLlm(model='flaky'))
+    text = 'document ' * 100
+    pieces = asyncio.run(_collect(adk_service.stream_adk_async(runner, None, text, use_cache=False)))
+    assert pieces == ['ok']
+    assert REQUESTS == [len(text), len(text)] # The document is sent once per attempt, not once more per retry.
+
+
+def test_stream_retry_removes_the_failed_turn_from_a_persistent_session(make_runner):
+    service = SqliteSessionService(':memory:')
+    REQUESTS.clear()
+    runner = make_runner(FlakyLlm(model='flaky'), session_service=service)
+    text = 'document ' * 100
+
+    async def scenario():
+        await service.create_session(app_name=APP_NAME_FOR_ADK, user_id='user', session_id='chat')
+        pieces = await _collect(adk_service.stream_adk_async(runner, 'chat', text, use_cache=False, user_id='user'))
+        session = await service.get_session(app_name=APP_NAME_FOR_ADK, user_id='user', session_id='chat')
+        return pieces, session
+
+    pieces, session = asyncio.run(scenario())
+    assert pieces == ['ok']
+    assert REQUESTS == [len(text), len(text)]
+    assert [event.author for event in session.events] == ['user', 'summarizer']
+
+
+def test_limited_run_retries_without_repeating_the_message(make_runner):
+    service = SqliteSessionService(':memory:')
+    REQUESTS.clear()
+    runner = make_runner(FlakyLlm(model='flaky'), session_service=service)
+    text = 'document ' * 100
+
+    async def scenario():
+        await service.create_session(app_name=APP_NAME_FOR_ADK, user_id='user', session_id='chat')
+        response = await adk_service.run_adk_limited_async(runner, 'chat', text, 'user')
+        session = await service.get_session(app_name=APP_NAME_FOR_ADK, user_id='user', session_id='chat')
+        return response, session
+
+    response, session = asyncio.run(scenario())
+    assert response == 'ok'
+    assert REQUESTS == [len(text), len(text)]
+    assert [event.author for event in session.events] == ['user', 'summarizer']
+
+
+class CountingLlm(BaseLlm):
+    """Answers every request with the number of model calls so far."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        REQUESTS.append(len(llm_request.contents))
+        yield LlmResponse(content=genai_types.Content(role='model', parts=[genai_types.Part(text=f'answer {len(REQUESTS)}')]))
+
+
+def test_persistent_turns_are_not_served_from_the_result_cache(make_runner):
+    REQUESTS.clear()
+    service = SqliteSessionService(':memory:')
+    runner = make_runner(CountingLlm(model='counting'), name='aura', session_service=service)
+    for user_id in ('alice', 'bob'):
+        run_sync(service.create_session(app_name=APP_NAME_FOR_ADK, user_id=user_id, session_id='chat'))
+
+    assert adk_service.run_adk_sync(runner, 'chat', 'What is a category?', user_id='alice') == 'answer 1'
+    assert adk_service.run_adk_sync(runner, 'chat', 'What is a category?', user_id='bob') == 'answer 2'
+    pieces = run_sync(_collect(adk_service.stream_adk_async(runner, 'chat', 'What is a category?', user_id='bob')))
+    assert pieces == ['answer 3']
+
+    session = run_sync(service.get_session(app_name=APP_NAME_FOR_ADK, user_id='bob', session_id='chat'))
+    assert [event.author for event in session.events] == ['user', 'aura', 'user', 'aura'] # Every reply is in the history.
+    assert result_cache.get_result_cache().stats()['entries'] == 0
@@ -0,0 +1,45 @@
+import os
+
+from utils.doc_store import PAGE_SEPARATOR, DocumentStore, session_memory
+
+
+def _text(paragraphs):
+    return PAGE_SEPARATOR.join(f'Paragraph {i}: Über die Kategorien, §{i}. ' * 5 for i in range(paragraphs))
+
+
+def test_put_text_round_trips_across_compressed_pages(tmp_path):
+    store = DocumentStore(str(tmp_path))
+    text = _text(200)
+    handle = store.put_text(text, page_chars=2_000)
+
+    assert len(handle) > 10 and handle.chars == len(text)
+    assert handle.stored_bytes < len(text.encode('utf-8')) / 2 # Pages are stored compressed.
+    assert handle.text() == text
+    assert PAGE_SEPARATOR.join(handle.page(i) for i in range(len(handle))) == text
+    assert handle.pages(3, 5) == [handle.page(3), handle.page(4)]
+    assert all(len(page) <= 2_000 for page in handle.pages())
+
+
+def test_same_text_is_stored_once_and_readable_from_a_new_store(tmp_path):
+    text = _text(50)
+    first = DocumentStore(str(tmp_path)).put_text(text, page_chars=1_000)
+    data_path = tmp_path / f'{first.digest}.zpages'
+    written = os.stat(data_path).st_mtime_ns
+
+    again = DocumentStore(str(tmp_path)).put_text(text, page_chars=1_000)
+    assert again.digest == first.digest and again.page_count == first.page_count
+    assert os.stat(data_path).st_mtime_ns == written
+    assert again.text() == text
+
+
+def test_pages_are_stored_one_per_page(tmp_path):
+    pages = ['Page one.', '', 'Page three.']
+    handle = DocumentStore(str(tmp_path)).put_pages(pages)
+    assert handle.pages() == pages and handle.page(2) == 'Page three.'
+
+
+def test_session_memory_counts_handles_by_their_stored_size(tmp_path):
+    handle = DocumentStore(str(tmp_path)).put_text(_text(100))
+    report = session_memory({'document': handle, 'notes': 'x' * 100})
+    assert report['document_chars'] == handle.chars and report['stored_bytes'] == handle.stored_bytes
+    assert report['memory_bytes'] < handle.chars # The session holds the handle, not the text.
@@ -0,0 +1,16 @@
+from utils.events import EventStore, load_event_store
+
+
+def test_missing_events_file_loads_an_empty_store(tmp_path):
+    store = load_event_store(str(tmp_path / 'events.parquet'))
+    assert len(store) == 0
+    assert len(store.query(1900, 2000)) == 0
+
+
+def test_events_load_from_csv_in_year_order(tmp_path):
+    path = tmp_path / 'events.csv'
+    path.write_text('year,lat,lon,field,text\n1950,1,2,Art,b\n1900,3,4,Science,a\n,5,6,Art,dropped\n')
+    store = load_event_store(str(path))
+    assert [event['text'] for event in store.query(1800, 2000).records()] == ['a', 'b']
+    assert store.query(1950, fields=['Art']).records()[0]['year'] == 1950
+    assert store.version == EventStore([1900, 1950], [3, 1], [4, 2], ['Science', 'Art'], ['a', 'b']).version
@@ -0,0 +1,31 @@
+import numpy as np
+
+from utils.geo_aggregate import aggregate_points
+
+
+def _uniform_points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    lon = rng.uniform(-180, 180, n)
+    lat = np.rad2deg(np.arcsin(rng.uniform(-1, 1, n))) # Uniform over the sphere's surface.
+    return lon, lat
+
+
+def test_uniform_points_fill_most_of_the_marker_budget():
+    lon, lat = _uniform_points(500_000)
+    cells = aggregate_points(lon, lat, max_markers=1_500)
+    assert 750 < len(cells) <= 1_500
+    assert cells.counts.sum() == 500_000
+
+
+def test_max_markers_is_a_hard_upper_bound():
+    lon, lat = _uniform_points(10_000)
+    for max_markers in (1, 2, 3, 7, 100):
+        assert len(aggregate_points(lon, lat, max_markers)) <= max_markers
+    single = aggregate_points(lon, lat, max_markers=1)
+    assert single.counts.tolist() == [10_000]
+    assert np.isclose(single.lon_deg[0], lon.mean()) and np.isclose(single.lat_deg[0], lat.mean())
+
+
+def test_sparse_points_keep_the_finest_grid():
+    cells = aggregate_points([0.0, 90.0, -90.0], [0.0, 45.0, -45.0], max_markers=10)
+    assert len(cells) == 3 and (cells.n_lat_bands, cells.n_lon_cols) == (256, 512)
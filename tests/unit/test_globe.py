@@ -0,0 +1,46 @@
+import numpy as np
+
+from utils.events import EventStore
+from utils.globe import BYTES_PER_FACE, BYTES_PER_QUANTIZED_VERTEX, BYTES_PER_VERTEX, Globe
+
+LEVELS = [{'name': 'low', 'simplify_tolerance': 0.5}, {'name': 'high', 'simplify_tolerance': 0.0}]
+
+
+def _globe(quantize, vertices_per_level=(1_000, 10_000)):
+    globe = Globe(lod_levels=LEVELS, quantize=quantize, mesh_cache_dir='unused')
+    for level, vertices in zip(globe.levels, vertices_per_level):
+        level.mesh = (np.zeros((vertices, 3), dtype=np.float32), np.zeros((vertices * 2, 3), dtype=np.int32))
+    return globe
+
+
+def test_estimated_bytes_depends_on_quantization():
+    level = _globe(False).levels[1]
+    assert level.estimated_bytes() == 10_000 * BYTES_PER_VERTEX + 20_000 * BYTES_PER_FACE
+    assert level.estimated_bytes(quantize=True) == 10_000 * BYTES_PER_QUANTIZED_VERTEX + 20_000 * BYTES_PER_FACE
+
+
+def test_quantized_globe_fits_a_finer_level_in_the_same_budget():
+    budget = 10_000 * BYTES_PER_QUANTIZED_VERTEX + 20_000 * BYTES_PER_FACE
+    assert _globe(quantize=False).select_level(max_bytes=budget).name == 'low'
+    assert _globe(quantize=True).select_level(max_bytes=budget).name == 'high'
+    assert _globe(quantize=True).lod_report()[1]['bytes'] == budget
+
+
+def _store(texts):
+    return EventStore([1900, 1950], [10.0, 20.0], [30.0, 40.0], ['Science', 'Art'], texts)
+
+
+def test_timeline_frames_are_keyed_on_event_content():
+    globe = _globe(quantize=True)
+    builds = []
+    build = globe._build_timeline_frames
+    globe._build_timeline_frames = lambda *args: builds.append(args[0]) or build(*args)
+
+    globe.animated_figure(_store(['a', 'b']), year_min=1900, year_max=2000)
+    globe.animated_figure(_store(['a', 'b']), year_min=1900, year_max=2000)
+    assert len(builds) == 1
+
+    changed = _store(['a', 'c'])
+    assert changed.version != builds[0].version
+    globe.animated_figure(changed, year_min=1900, year_max=2000)
+    assert builds[-1] is changed and len(builds) == 2
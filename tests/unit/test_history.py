@@ -0,0 +1,128 @@
+import asyncio
+
+from google.adk.agents import LlmAgent
+from google.adk.events import Event
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.genai import types as genai_types
+
+from config.settings import APP_NAME_FOR_ADK
+from services.history import HistoryCompactionPlugin, compact_contents, compact_events, current_turn_length
+from services.session_store import SqliteSessionService
+
+DOCUMENT = 'Kant argues that the categories are conditions of experience. ' * 200
+OTHER_DOCUMENT = 'Hegel reads history as the unfolding of freedom. ' * 200
+
+
+def _content(role, text):
+    return genai_types.Content(role=role, parts=[genai_types.Part(text=text)])
+
+
+def _event(invocation_id, author, content):
+    return Event(invocation_id=invocation_id, author=author, content=content)
+
+
+def _transfer_turn(invocation_id, document):
+    """The events of a turn the root agent hands over to the summarizer."""
+    call = genai_types.Part(function_call=genai_types.FunctionCall(name='transfer_to_agent', args={'agent_name': 'summarizer'}))
+    response = genai_types.Part(function_response=genai_types.FunctionResponse(name='transfer_to_agent', response={'result': None}))
+    return [
+        _event(invocation_id, 'user', _content('user', document)),
+        _event(invocation_id, 'aura', genai_types.Content(role='model', parts=[call])),
+        _event(invocation_id, 'aura', genai_types.Content(role='user', parts=[response])),
+    ]
+
+
+def test_compact_contents_keeps_the_whole_current_turn():
+    contents = [
+        _content('user', OTHER_DOCUMENT), _content('model', 'A summary.'),
+        _content('user', DOCUMENT), _content('user', 'For context:'), _content('user', '[aura] called tool transfer_to_agent'),
+    ]
+    current_turn = current_turn_length(contents, _content('user', DOCUMENT))
+    assert current_turn == 3
+    compacted = compact_contents(contents, token_budget=100_000, large_message_tokens=100, current_turn=current_turn)
+    assert compacted[0].parts[0].text.startswith('[Earlier text')
+    assert compacted[2].parts[0].text == DOCUMENT
+
+
+def test_compact_contents_drops_old_turns_but_never_the_current_one():
+    contents = [_content('user', OTHER_DOCUMENT), _content('model', 'A summary.'), _content('user', DOCUMENT),
+                _content('model', 'Transferring.')]
+    compacted = compact_contents(contents, token_budget=10, large_message_tokens=100, current_turn=2)
+    assert [content.parts[0].text for content in compacted] == [DOCUMENT, 'Transferring.']
+
+
+def test_current_turn_defaults_to_the_last_message():
+    assert current_turn_length([_content('user', 'a'), _content('model', 'b')], None) == 1
+
+
+def test_compact_events_keeps_a_transfer_turn_in_full():
+    events = [_event('turn1', 'user', _content('user', OTHER_DOCUMENT)), _event('turn1', 'summarizer', _content('model', 'A summary.'))]
+    events += _transfer_turn('turn2', DOCUMENT)
+    assert compact_events(events, token_budget=100_000, large_message_tokens=100, keep_recent_events=2)
+    assert events[0].content.parts[0].text.startswith('[Earlier text')
+    assert events[2].content.parts[0].text == DOCUMENT
+    assert len(events) == 5
+
+
+def test_compact_events_drops_old_turns_but_never_the_current_one():
+    events = [_event('turn1', 'user', _content('user', OTHER_DOCUMENT)), _event('turn1', 'summarizer', _content('model', 'A summary.'))]
+    events += _transfer_turn('turn2', DOCUMENT)
+    compact_events(events, token_budget=10, large_message_tokens=100, keep_recent_events=2)
+    assert [event.invocation_id for event in events] == ['turn2'] * 3
+    assert events[0].content.parts[0].text == DOCUMENT
+
+
+class TransferLlm(BaseLlm):
+    """The root agent's model: hands every turn over to the summarizer."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        call = genai_types.FunctionCall(name='transfer_to_agent', args={'agent_name': 'summarizer'})
+        yield LlmResponse(content=genai_types.Content(role='model', parts=[genai_types.Part(function_call=call)]))
+
+
+def look_up_author(name: str) -> str:
+    """Returns a short biography of an author."""
+    return f'{name} was a philosopher.'
+
+
+class RecordingLlm(BaseLlm):
+    """The summarizer's model: calls look_up_author first, then records the contents it receives and answers."""
+
+    requests: list
+
+    async def generate_content_async(self, llm_request, stream=False):
+        if not any(part.function_response for part in llm_request.contents[-1].parts):
+            call = genai_types.FunctionCall(name='look_up_author', args={'name': 'Kant'})
+            yield LlmResponse(content=genai_types.Content(role='model', parts=[genai_types.Part(function_call=call)]))
+            return
+        self.requests.append([''.join(part.text or '' for part in content.parts) for content in llm_request.contents])
+        yield LlmResponse(content=_content('model', 'A summary.'))
+
+
+def test_sub_agent_receives_the_document_after_a_transfer_and_a_tool_call():
+    summarizer_model = RecordingLlm(model='recording', requests=[])
+    summarizer = LlmAgent(name='summarizer', model=summarizer_model, tools=[look_up_author])
+    root = LlmAgent(name='aura', model=TransferLlm(model='transfer'), sub_agents=[summarizer])
+    service = SqliteSessionService(':memory:')
+    runner = Runner(agent=root, app_name=APP_NAME_FOR_ADK, session_service=service,
+                    plugins=[HistoryCompactionPlugin(token_budget=100_000, large_message_tokens=100)])
+
+    async def turn(text):
+        async for _ in runner.run_async(user_id='user', session_id='chat', new_message=_content('user', text)):
+            pass
+
+    async def scenario():
+        await service.create_session(app_name=APP_NAME_FOR_ADK, user_id='user', session_id='chat')
+        await turn(OTHER_DOCUMENT)
+        await turn(DOCUMENT)
+        return await service.get_session(app_name=APP_NAME_FOR_ADK, user_id='user', session_id='chat')
+
+    session = asyncio.run(scenario())
+    latest = summarizer_model.requests[-1]
+    assert DOCUMENT in latest # The document of the current turn is sent in full...
+    assert OTHER_DOCUMENT not in latest # ...and the earlier one only as a reference.
+    assert any(text.startswith('[Earlier text') for text in latest)
+    stored = [event.content.parts[0].text for event in session.events if event.content and event.content.parts]
+    assert DOCUMENT in stored and OTHER_DOCUMENT not in stored
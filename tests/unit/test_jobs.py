@@ -0,0 +1,40 @@
+from services import jobs
+from utils import doc_store
+from utils.doc_store import DocumentHandle, DocumentStore
+
+
+async def _fake_summary(text, runner=None, on_progress=None, target_tokens=None, outcome=None, map_runner=None):
+    for piece in ('Part one. ', 'Part two.'):
+        yield piece
+
+
+async def _fake_translation(text, on_paragraph=None, runner=None):
+    paragraphs = jobs.split_paragraphs(text)
+    for index, paragraph in enumerate(paragraphs):
+        on_paragraph(index, paragraph.upper())
+    return '\n\n'.join(paragraph.upper() for paragraph in paragraphs)
+
+
+def _run(monkeypatch, tmp_path, kind, text):
+    monkeypatch.setattr(doc_store, '_default_store', DocumentStore(str(tmp_path)))
+    monkeypatch.setattr(jobs, 'get_agent_runner', lambda *args: None)
+    monkeypatch.setattr(jobs, 'stream_summary_async', _fake_summary)
+    monkeypatch.setattr(jobs, 'translate_async', _fake_translation)
+    job = jobs.JobManager().submit('session', 'document', kind, text)
+    job._future.result(timeout=5)
+    return job
+
+
+def test_finished_summary_keeps_only_a_stored_handle(monkeypatch, tmp_path):
+    job = _run(monkeypatch, tmp_path, 'summary', 'Some text.')
+    assert job.status == jobs.DONE
+    assert job.pieces == [] and job.partial_text == ''
+    assert isinstance(job.result, DocumentHandle)
+    assert job.result.text() == 'Part one. Part two.'
+
+
+def test_finished_translation_keeps_only_a_stored_handle(monkeypatch, tmp_path):
+    job = _run(monkeypatch, tmp_path, 'translation', 'uno\n\ndue')
+    assert job.status == jobs.DONE and job.progress == 1.0
+    assert job.pieces == []
+    assert job.result.text() == 'UNO\n\nDUE'
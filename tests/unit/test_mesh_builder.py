@@ -0,0 +1,49 @@
+import numpy as np
+from shapely.geometry import LineString, MultiPolygon, Polygon
+
+from utils import mesh_builder
+from utils.mesh_builder import build_mesh, triangulate_polygon
+
+SQUARE = [(0, 0), (4, 0), (4, 4), (0, 4)]
+HOLE = [(1, 1), (3, 1), (3, 3), (1, 3)]
+
+
+def _area(points, faces):
+    (ax, ay), (bx, by), (cx, cy) = (points[faces[:, i]].T for i in range(3))
+    return np.abs((bx - ax) * (cy - ay) - (by - ay) * (cx - ax)).sum() / 2
+
+
+def test_holes_are_cut_out_of_the_fill():
+    polygon = Polygon(SQUARE, [HOLE])
+    exterior = np.asarray(polygon.exterior.coords)[:-1]
+    hole = np.asarray(polygon.interiors[0].coords)[:-1]
+    points, faces = triangulate_polygon(exterior, [hole])
+    assert np.isclose(_area(points, faces), polygon.area)
+    centroids = points[faces].mean(axis=1)
+    assert not ((centroids > 1) & (centroids < 3)).all(axis=1).any() # No triangle inside the lake.
+
+
+def test_every_part_of_a_multipolygon_is_triangulated():
+    island = Polygon([(10, 0), (12, 0), (12, 2)])
+    vertices, faces, report = build_mesh([MultiPolygon([Polygon(SQUARE), island])], radius=1.0, workers=1)
+    assert report.polygons == 2 and report.failures == []
+    assert len(vertices) == 7 and faces.max() == 6
+    assert np.allclose(np.linalg.norm(vertices, axis=1), 1.0, atol=1e-6)
+
+
+def test_failures_are_reported_per_feature_and_part():
+    flat = Polygon([(0, 0), (1, 0), (2, 0)]) # Collinear: nothing to triangulate.
+    geometries = [Polygon(SQUARE), None, LineString([(0, 0), (1, 1)]), MultiPolygon([Polygon(HOLE), flat])]
+    _, faces, report = build_mesh(geometries, radius=1.0, workers=1)
+    assert len(faces) > 0
+    failed = {(feature, part): reason for feature, part, reason in report.failures}
+    assert set(failed) == {(1, None), (2, None), (3, 1)}
+    assert failed[1, None] == 'empty geometry' and 'LineString' in failed[2, None]
+
+
+def test_process_pool_matches_a_serial_build(monkeypatch):
+    monkeypatch.setattr(mesh_builder, '_MIN_POLYGONS_FOR_POOL', 2)
+    squares = [Polygon([(x + 5 * n, y) for x, y in SQUARE], [[(x + 5 * n, y) for x, y in HOLE]]) for n in range(4)]
+    serial = build_mesh(squares, radius=2.0, workers=1)
+    pooled = build_mesh(squares, radius=2.0, workers=2, batch_size=1)
+    assert np.array_equal(serial[0], pooled[0]) and np.array_equal(serial[1], pooled[1])
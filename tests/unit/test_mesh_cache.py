@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+
+from utils import mesh_cache
+from utils.globe import Globe
+from utils.mesh_builder import MeshBuildReport
+
+LEVELS = [{'name': 'low', 'simplify_tolerance': 0.5}, {'name': 'high', 'simplify_tolerance': 0.0}]
+
+
+def _shapefile(tmp_path, content):
+    path = tmp_path / 'land.shp'
+    path.write_bytes(content)
+    return str(path)
+
+
+def _globe(shapefile, cache_dir, builds):
+    globe = Globe(shapefile_path=shapefile, mesh_cache_dir=str(cache_dir), lod_levels=LEVELS)
+
+    def triangulate(level): # Stands in for reading and triangulating the shapefile.
+        builds.append(level.name)
+        return np.full((3, 3), len(builds), dtype=np.float32), np.array([[0, 1, 2]], dtype=np.int32), MeshBuildReport()
+
+    globe._create_mesh3d_data = triangulate
+    return globe
+
+
+def test_stale_key_is_detected(tmp_path):
+    path = str(tmp_path / 'mesh.npz')
+    assert mesh_cache.is_stale(path, 'a')
+    mesh_cache.save_mesh(path, 'a', np.zeros((3, 3)), [[0, 1, 2]])
+    assert not mesh_cache.is_stale(path, 'a') and mesh_cache.load_mesh(path, 'a') is not None
+    assert mesh_cache.is_stale(path, 'b') and mesh_cache.load_mesh(path, 'b') is None
+
+
+def test_changed_shapefile_rebuilds_and_prunes_the_old_meshes(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    shapefile = _shapefile(tmp_path, b'land v1')
+    builds = []
+    first = _globe(shapefile, cache_dir, builds)
+    for level in first.levels:
+        first.get_mesh(level.name)
+    old_paths = sorted(str(path) for path in cache_dir.iterdir())
+    unrelated = cache_dir / 'lakes_0123456789abcdef.npz'
+    unrelated.write_bytes(b'')
+
+    shapefile = _shapefile(tmp_path, b'land v2, with more coastline')
+    second = _globe(shapefile, cache_dir, builds)
+    assert all(second.mesh_cache_is_stale(level.name) for level in second.levels)
+    vertices, _ = second.get_mesh('high')
+    assert builds == ['low', 'high', 'high'] and vertices[0, 0] == 3
+
+    # Both old levels are gone even though only one level was rebuilt; other shapefiles' meshes stay.
+    remaining = sorted(str(path) for path in cache_dir.iterdir())
+    assert not set(old_paths) & set(remaining)
+    assert remaining == sorted([second.levels[1].cache_path, str(unrelated)])
+    assert not second.mesh_cache_is_stale('high')
+    assert os.path.exists(second.levels[1].cache_path)
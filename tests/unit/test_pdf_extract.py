@@ -0,0 +1,49 @@
+import io
+
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from utils import pdf_extract
+from utils.pdf_extract import extract_pages, iter_pages
+
+
+def _pdf(pages):
+    """A PDF whose page n reads 'Page n'."""
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica'),
+    }))
+    for n in range(pages):
+        page = writer.add_blank_page(612, 792)
+        page[NameObject('/Resources')] = DictionaryObject({NameObject('/Font'): DictionaryObject({NameObject('/F1'): font})})
+        content = DecodedStreamObject()
+        content.set_data(f'BT /F1 12 Tf 72 720 Td (Page {n}) Tj ET'.encode())
+        page[NameObject('/Contents')] = writer._add_object(content)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def test_pool_extracts_every_page_in_order(tmp_path):
+    data = _pdf(20)
+    assert extract_pages(data, workers=2, pages_per_task=4, cache_dir=str(tmp_path)) == [f'Page {n}' for n in range(20)]
+
+
+def test_pdf_is_parsed_once_and_then_read_from_the_cache(tmp_path, monkeypatch):
+    data = _pdf(10)
+    readers = []
+
+    def counting_reader(stream):
+        readers.append(stream)
+        return pdf_extract_reader(stream)
+
+    pdf_extract_reader = pdf_extract.PdfReader
+    monkeypatch.setattr(pdf_extract, 'PdfReader', counting_reader)
+    pages = dict(iter_pages(data, workers=1, pages_per_task=3, cache_dir=str(tmp_path)))
+    assert pages[9] == 'Page 9'
+    assert len(readers) == 2 # One to count the pages, one for every page range.
+
+    assert dict(iter_pages(data, workers=1, cache_dir=str(tmp_path))) == pages
+    assert len(readers) == 2
@@ -0,0 +1,22 @@
+from config.settings import OUTPUT_TOKEN_HEADROOM, OUTPUT_TOKENS_PER_PAGE, SUMMARY_MAP_MAX_OUTPUT_TOKENS
+from services.planner import plan_request
+
+
+def test_summary_plan_targets_the_response_length_with_headroom():
+    plan = plan_request('summary', 'A short chapter on Kant. ' * 50, response_pages=2)
+    assert plan.target_tokens == 2 * OUTPUT_TOKENS_PER_PAGE
+    assert plan.max_output_tokens == int(2 * OUTPUT_TOKENS_PER_PAGE * OUTPUT_TOKEN_HEADROOM)
+    assert plan.key != plan_request('summary', 'A short chapter on Kant. ' * 50, response_pages=3).key
+
+
+def test_translation_plan_has_no_target_length():
+    plan = plan_request('translation', 'Un breve capitolo su Kant. ' * 50)
+    assert plan.target_tokens is None and plan.max_output_tokens is None
+
+
+def test_map_reduce_plan_caps_the_map_pass_separately():
+    plan = plan_request('summary', 'A long chapter on Kant. ' * 20_000, response_pages=1)
+    assert plan.mode == 'map-reduce'
+    assert plan.max_output_tokens == int(OUTPUT_TOKENS_PER_PAGE * OUTPUT_TOKEN_HEADROOM)
+    assert plan.map_max_output_tokens == SUMMARY_MAP_MAX_OUTPUT_TOKENS
+    assert plan_request('summary', 'A short chapter on Kant.').map_max_output_tokens is None
@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+from services import prefetch
+from services.planner import plan_request
+
+TEXT = 'A short chapter on Kant and the categories. ' * 40
+
+
+class RecordingManager:
+    """Stands in for the job manager and records every submitted job."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, session_key, key, kind, text, plan):
+        self.submitted.append(session_key)
+        return session_key
+
+
+def _prefetching(monkeypatch, budget_documents):
+    tokens = plan_request('summary', TEXT, 1).total_input_tokens
+    manager = RecordingManager()
+    monkeypatch.setattr(prefetch, 'PREFETCH_SUMMARY', True)
+    monkeypatch.setattr(prefetch, 'PREFETCH_MAX_TOKENS', tokens * 10)
+    monkeypatch.setattr(prefetch, '_budget', prefetch.DailyTokenBudget(tokens * budget_documents))
+    monkeypatch.setattr(prefetch, 'get_job_manager', lambda: manager)
+    return manager
+
+
+def test_daily_budget_stops_prefetching(monkeypatch):
+    manager = _prefetching(monkeypatch, budget_documents=2)
+    results = [prefetch.prefetch_summary(f'session {n}', TEXT) for n in range(3)]
+    assert results == ['session 0', 'session 1', None]
+    assert manager.submitted == ['session 0', 'session 1']
+
+
+def test_budget_resets_the_next_day(monkeypatch):
+    manager = _prefetching(monkeypatch, budget_documents=1)
+    day = SimpleNamespace(tm_yday=100)
+    monkeypatch.setattr(prefetch.time, 'gmtime', lambda: day)
+    assert prefetch.prefetch_summary('monday', TEXT) and prefetch.prefetch_summary('monday again', TEXT) is None
+    day.tm_yday = 101
+    assert prefetch.prefetch_summary('tuesday', TEXT)
+    assert manager.submitted == ['monday', 'tuesday']
+
+
+def test_documents_above_the_token_cap_are_not_prefetched(monkeypatch):
+    manager = _prefetching(monkeypatch, budget_documents=100)
+    monkeypatch.setattr(prefetch, 'PREFETCH_MAX_TOKENS', 10)
+    assert prefetch.prefetch_summary('session', TEXT) is None
+    assert manager.submitted == [] and prefetch._budget.spent == 0
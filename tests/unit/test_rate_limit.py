@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+from google.genai import errors as genai_errors
+
+from services.rate_limit import RateLimiter, TokenBucket, is_retryable
+
+
+def _limiter(**kwargs):
+    return RateLimiter(**{'backoff_seconds': 0.001, 'max_backoff_seconds': 0.001, **kwargs})
+
+
+def test_only_quota_and_server_errors_are_retryable():
+    assert is_retryable(genai_errors.APIError(429, {}))
+    assert is_retryable(genai_errors.APIError(503, {}))
+    assert not is_retryable(genai_errors.APIError(400, {}))
+    assert not is_retryable(ValueError('bad request'))
+
+
+def test_identical_in_flight_requests_share_one_call():
+    limiter = _limiter()
+    calls = []
+
+    async def answer():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'summary'
+
+    async def scenario():
+        return await asyncio.gather(*(limiter.call(answer, tokens=10, key='chapter') for _ in range(3)))
+
+    assert asyncio.run(scenario()) == ['summary'] * 3
+    assert len(calls) == 1 and limiter.stats()['coalesced'] == 2
+
+
+def test_requests_without_a_key_are_never_coalesced():
+    limiter = _limiter()
+    calls = []
+
+    async def answer():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'reply'
+
+    async def scenario():
+        return await asyncio.gather(*(limiter.call(answer, tokens=10) for _ in range(3)))
+
+    asyncio.run(scenario())
+    assert len(calls) == 3
+
+
+def test_transient_errors_are_retried():
+    limiter = _limiter()
+    errors = [genai_errors.APIError(429, {}), genai_errors.APIError(503, {})]
+
+    async def flaky():
+        if errors:
+            raise errors.pop(0)
+        return 'ok'
+
+    assert asyncio.run(limiter.call(flaky, tokens=10)) == 'ok'
+    assert limiter.stats()['retries'] == 2
+
+
+def test_errors_are_raised_once_retries_run_out():
+    limiter = _limiter(max_retries=1)
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        raise genai_errors.APIError(503, {})
+
+    with pytest.raises(genai_errors.APIError):
+        asyncio.run(limiter.call(failing, tokens=10))
+    assert len(attempts) == 2 and limiter.stats()['failures'] == 1
+
+
+def test_waiters_take_over_when_the_leading_request_is_cancelled():
+    limiter = _limiter()
+    calls = []
+
+    async def answer():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'summary'
+
+    async def scenario():
+        leader = asyncio.create_task(limiter.call(answer, tokens=10, key='chapter'))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(limiter.call(answer, tokens=10, key='chapter'))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(scenario()) == 'summary'
+    assert len(calls) == 2
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(per_minute=600) # Refills 10 units per second.
+
+    async def scenario():
+        assert await bucket.take(600) < 0.01
+        return await bucket.take(1)
+
+    assert asyncio.run(scenario()) >= 0.05
@@ -0,0 +1,48 @@
+from google.adk.agents import LlmAgent
+
+from services.result_cache import ResultCache, result_cache_key
+
+
+def _agent(instruction='Summarize the text.', sub_agents=()):
+    return LlmAgent(name='summarizer', model='gemini-2.0-flash', instruction=instruction, sub_agents=list(sub_agents))
+
+
+def test_key_changes_with_anything_that_shapes_the_answer():
+    key = result_cache_key(_agent(), 'text')
+    assert result_cache_key(_agent(), 'text') == key
+    assert result_cache_key(_agent(), 'other text') != key
+    assert result_cache_key(_agent('Summarize the text briefly.'), 'text') != key
+    child = LlmAgent(name='translator', model='gemini-2.0-flash', instruction='Translate.')
+    assert result_cache_key(_agent(sub_agents=[child]), 'text') != key
+
+
+def test_get_counts_hits_and_misses():
+    cache = ResultCache(':memory:')
+    assert cache.get('a') is None
+    cache.put('a', 'answer', agent_name='summarizer')
+    assert cache.get('a') == 'answer'
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries'], stats['bytes']) == (1, 1, 1, len('answer'))
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    cache = ResultCache(':memory:', max_entries=10)
+    clock = iter(range(1_000))
+    monkeypatch.setattr('services.result_cache.time.time', lambda: next(clock))
+    for i in range(10):
+        cache.put(str(i), 'value')
+    cache.get('0') # Now the most recently used.
+    cache.put('10', 'value')
+    # Evicted down to 90% of the limit: the oldest entries go, the one just read stays.
+    assert cache.stats()['entries'] == 9
+    assert cache.get('0') == 'value'
+    assert cache.get('1') is None and cache.get('2') is None
+    assert cache.get('10') == 'value'
+
+
+def test_entries_are_evicted_over_the_byte_limit():
+    cache = ResultCache(':memory:', max_bytes=100)
+    for i in range(5):
+        cache.put(str(i), 'x' * 30)
+    assert cache.stats()['bytes'] <= 90
+    assert cache.get('4') == 'x' * 30
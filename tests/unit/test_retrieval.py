@@ -0,0 +1,34 @@
+from utils import retrieval
+from utils.doc_store import DocumentStore
+from utils.retrieval import BM25Index, format_passages, get_document_index, split_passages
+
+PAGES = [
+    'Kant holds that the categories are conditions of possible experience.\n\nSpace and time are forms of intuition.',
+    'Hegel reads history as the progress of the consciousness of freedom.',
+    'Hume doubts that causation is ever observed; we only see constant conjunction.',
+]
+
+
+def test_search_ranks_the_matching_passage_first():
+    index = BM25Index(split_passages(PAGES, max_tokens=20))
+    score, page, text = index.search('causation constant conjunction', k=2)[0]
+    assert page == 2 and 'Hume' in text and score > 0
+
+
+def test_search_leaves_out_passages_without_query_terms():
+    index = BM25Index(split_passages(PAGES, max_tokens=20))
+    assert index.search('unrelated words', k=5) == []
+    assert [page for _, page, _ in index.search('freedom', k=5)] == [1]
+
+
+def test_format_passages_orders_by_page():
+    hits = [(2.0, 2, 'later'), (1.0, 0, 'earlier')]
+    assert format_passages(hits) == '[Page 1] earlier\n\n[Page 3] later'
+
+
+def test_index_from_a_handle_is_cached_by_digest(tmp_path, monkeypatch):
+    monkeypatch.setattr(retrieval, '_index_cache', type(retrieval._index_cache)())
+    handle = DocumentStore(str(tmp_path)).put_pages(PAGES)
+    index = get_document_index(handle)
+    assert get_document_index(handle) is index
+    assert [text for _, text in index.passages] == [text for _, text in split_passages(PAGES)]
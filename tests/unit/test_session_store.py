@@ -0,0 +1,167 @@
+import asyncio
+import gc
+import time
+import weakref
+
+from google.adk.events import Event
+from google.genai import types as genai_types
+
+from services import session_store
+from services.session_store import SqliteSessionService
+
+APP = 'aura_app'
+
+
+def _service(path, **kwargs):
+    kwargs = {'flush_events': 100, 'flush_seconds': 60.0, 'compact': False, **kwargs}
+    return SqliteSessionService(path=str(path), **kwargs)
+
+
+def _event(text):
+    return Event(invocation_id='turn', author='user',
+                 content=genai_types.Content(role='user', parts=[genai_types.Part(text=text)]))
+
+
+def _stored_texts(path, user_id, session_id):
+    """Event texts of a session as written to SQLite, read through a fresh service."""
+    session = _service(path)._load((APP, user_id, session_id))
+    return [event.content.parts[0].text for event in session.events]
+
+
+def test_events_are_flushed_after_flush_events(tmp_path):
+    path = tmp_path / 'sessions.sqlite3'
+    service = _service(path, flush_events=3)
+
+    async def scenario():
+        session = await service.create_session(app_name=APP, user_id='alice', session_id='s1')
+        for text in ('one', 'two'):
+            await service.append_event(session, _event(text))
+        assert _stored_texts(path, 'alice', 's1') == []
+        await service.append_event(session, _event('three'))
+        assert _stored_texts(path, 'alice', 's1') == ['one', 'two', 'three']
+
+    asyncio.run(scenario())
+    assert service.stats()['flushes'] == 1 and service.stats()['dirty'] == 0
+
+
+def test_events_are_flushed_after_flush_seconds(tmp_path):
+    path = tmp_path / 'sessions.sqlite3'
+    service = _service(path, flush_seconds=0.01)
+
+    async def scenario():
+        session = await service.create_session(app_name=APP, user_id='alice', session_id='s1')
+        await service.append_event(session, _event('one'))
+        assert _stored_texts(path, 'alice', 's1') == []
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert _stored_texts(path, 'alice', 's1') == ['one']
+
+
+def test_dirty_session_is_written_when_evicted(tmp_path):
+    path = tmp_path / 'sessions.sqlite3'
+    service = _service(path, cache_size=1)
+
+    async def scenario():
+        session = await service.create_session(app_name=APP, user_id='alice', session_id='s1')
+        await service.append_event(session, _event('one'))
+        await service.create_session(app_name=APP, user_id='bob', session_id='s2')
+        # Evicted from the cache, then loaded back from SQLite with its event.
+        reloaded = await service.get_session(app_name=APP, user_id='alice', session_id='s1')
+        assert [event.content.parts[0].text for event in reloaded.events] == ['one']
+
+    asyncio.run(scenario())
+    assert service.stats()['cached'] == 1
+
+
+def test_sessions_are_scoped_per_user(tmp_path):
+    service = _service(tmp_path / 'sessions.sqlite3')
+
+    async def scenario():
+        await service.create_session(app_name=APP, user_id='alice', session_id='s1')
+        assert await service.get_session(app_name=APP, user_id='bob', session_id='s1') is None
+        assert len((await service.list_sessions(app_name=APP, user_id='alice')).sessions) == 1
+
+    asyncio.run(scenario())
+
+
+def test_expired_session_is_deleted_when_loaded(tmp_path, monkeypatch):
+    path = tmp_path / 'sessions.sqlite3'
+    service = _service(path, ttl_seconds=60)
+    asyncio.run(service.create_session(app_name=APP, user_id='alice', session_id='s1'))
+
+    later = time.time() + 120
+    monkeypatch.setattr(session_store.time, 'time', lambda: later)
+    restarted = _service(path, ttl_seconds=60)
+    assert asyncio.run(restarted.get_session(app_name=APP, user_id='alice', session_id='s1')) is None
+    assert restarted.stats()['stored'] == 0
+
+
+def test_expired_sessions_are_purged(tmp_path, monkeypatch):
+    service = _service(tmp_path / 'sessions.sqlite3', ttl_seconds=60)
+
+    async def scenario():
+        await service.create_session(app_name=APP, user_id='alice', session_id='old')
+        later = time.time() + 120
+        monkeypatch.setattr(session_store.time, 'time', lambda: later)
+        await service.create_session(app_name=APP, user_id='alice', session_id='new')
+        assert await service.get_session(app_name=APP, user_id='alice', session_id='old') is None
+
+    asyncio.run(scenario())
+    stats = service.stats()
+    assert stats['expired'] == 1 and stats['stored'] == 1 and stats['cached'] == 1
+
+
+def test_discard_events_removes_a_failed_turn(tmp_path):
+    path = tmp_path / 'sessions.sqlite3'
+    service = _service(path)
+
+    async def scenario():
+        session = await service.create_session(app_name=APP, user_id='alice', session_id='s1')
+        await service.append_event(session, _event('kept'))
+        keep_ids = {event.id for event in session.events}
+        await service.append_event(session, _event('failed'))
+        assert await service.discard_events(app_name=APP, user_id='alice', session_id='s1', keep_ids=keep_ids) == 1
+        assert await service.discard_events(app_name=APP, user_id='bob', session_id='s1', keep_ids=keep_ids) == 0
+
+    asyncio.run(scenario())
+    service.flush()
+    assert _stored_texts(path, 'alice', 's1') == ['kept']
+
+
+def test_expired_session_is_not_served_from_the_cache(tmp_path, monkeypatch):
+    service = _service(tmp_path / 'sessions.sqlite3', ttl_seconds=60)
+
+    async def scenario():
+        await service.create_session(app_name=APP, user_id='alice', session_id='s1')
+        later = time.time() + 120
+        monkeypatch.setattr(session_store.time, 'time', lambda: later)
+        assert await service.get_session(app_name=APP, user_id='alice', session_id='s1') is None
+
+    asyncio.run(scenario())
+    assert service.stats()['cached'] == 0 and service.stats()['stored'] == 0
+
+
+def test_discarded_events_are_flushed_after_flush_seconds(tmp_path):
+    path = tmp_path / 'sessions.sqlite3'
+    service = _service(path, flush_events=2, flush_seconds=0.01)
+
+    async def scenario():
+        session = await service.create_session(app_name=APP, user_id='alice', session_id='s1')
+        await service.append_event(session, _event('kept'))
+        keep_ids = {event.id for event in session.events}
+        await service.append_event(session, _event('failed'))
+        assert _stored_texts(path, 'alice', 's1') == ['kept', 'failed']
+        await service.discard_events(app_name=APP, user_id='alice', session_id='s1', keep_ids=keep_ids)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert _stored_texts(path, 'alice', 's1') == ['kept']
+
+
+def test_exit_flush_does_not_keep_services_alive(tmp_path):
+    service = _service(tmp_path / 'sessions.sqlite3')
+    ref = weakref.ref(service)
+    del service
+    gc.collect()
+    assert ref() is None
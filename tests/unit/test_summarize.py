@@ -0,0 +1,101 @@
+import asyncio
+import random
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types as genai_types
+
+from services import result_cache
+from services.summarize import MAP_PROMPT, stream_summary_async, summarize_async
+from utils.helpers import content_hash
+
+PROMPTS = [] # Text of every model request.
+
+
+class EchoLlm(BaseLlm):
+    """Answers every request with a short digest of it."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        text = llm_request.contents[-1].parts[0].text
+        PROMPTS.append(text)
+        yield LlmResponse(content=genai_types.Content(role='model', parts=[genai_types.Part(text=f'Summary {content_hash(text)[:8]}.')]))
+
+
+def _document(paragraphs, seed=0):
+    rng = random.Random(seed)
+    words = [f'word{i}' for i in range(2_000)]
+    return '\n\n'.join(' '.join(rng.choice(words) for _ in range(40)) for _ in range(paragraphs))
+
+
+def _summarize(runner, text):
+    PROMPTS.clear()
+    summary = asyncio.run(summarize_async(text, runner, long_document_tokens=1_000, chunk_tokens=1_200))
+    return summary, list(PROMPTS)
+
+
+def test_resummarizing_after_an_insert_reuses_the_unchanged_chunks(make_runner):
+    runner = make_runner(EchoLlm(model='echo'))
+    paragraphs = _document(600).split('\n\n')
+
+    _, first = _summarize(runner, '\n\n'.join(paragraphs))
+    map_calls = [prompt for prompt in first if prompt.startswith(MAP_PROMPT.split('{')[0])]
+    assert len(map_calls) > 10
+
+    inserted = _document(15, seed=2).split('\n\n') # About one chunk of new text, so every later chunk moves.
+    edited = paragraphs[:300] + inserted + paragraphs[300:]
+    _, second = _summarize(runner, '\n\n'.join(edited))
+    # Only the chunks around the insert and the final reduce pass go to the model again.
+    assert 1 < len(second) <= 6
+    assert second[-1].startswith('The following are summaries')
+    assert 'Part 1 of' in second[-1]
+
+
+def test_identical_document_is_served_from_the_cache(make_runner):
+    runner = make_runner(EchoLlm(model='echo'))
+    text = _document(100, seed=1)
+    summary, first = _summarize(runner, text)
+    again, second = _summarize(runner, text)
+    assert first and second == [] and again == summary
+
+
+class CappedLlm(BaseLlm):
+    """Records every request and stops as if it had reached the output cap."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        PROMPTS.append(llm_request.contents[-1].parts[0].text)
+        yield LlmResponse(content=genai_types.Content(role='model', parts=[genai_types.Part(text='The summary stops')]),
+                          finish_reason=genai_types.FinishReason.MAX_TOKENS)
+
+
+def test_target_length_is_in_the_prompt_and_truncation_is_reported(make_runner):
+    runner = make_runner(CappedLlm(model='capped'))
+    PROMPTS.clear()
+    outcome = {}
+
+    async def collect():
+        return [piece async for piece in stream_summary_async('A short chapter on Kant.', runner, target_tokens=1_000,
+                                                              outcome=outcome)]
+
+    assert asyncio.run(collect()) == ['The summary stops']
+    assert 'in about 750 words' in PROMPTS[0]
+    assert outcome == {'truncated': True}
+    assert result_cache.get_result_cache().stats()['entries'] == 0 # Cut-off answers are not cached.
+
+    outcome = {}
+    asyncio.run(summarize_async('A short chapter on Kant.', runner, target_tokens=1_000, outcome=outcome))
+    assert outcome == {'truncated': True}
+
+
+def test_only_the_final_summary_reports_truncation(make_runner):
+    capped = make_runner(CappedLlm(model='capped'))
+    echo = make_runner(EchoLlm(model='echo'))
+    text = _document(100, seed=3)
+
+    outcome = {}
+    asyncio.run(summarize_async(text, echo, long_document_tokens=1_000, chunk_tokens=1_200, outcome=outcome,
+                                map_runner=capped))
+    assert outcome == {} # Chunk summaries hitting their own cap are not the final result.
+
+    asyncio.run(summarize_async(text, capped, long_document_tokens=1_000, chunk_tokens=1_200, outcome=outcome,
+                                map_runner=echo))
+    assert outcome == {'truncated': True}
@@ -0,0 +1,41 @@
+import pytest
+
+from utils.text_normalize import _is_page_number, _roman_value, normalize_pages
+
+BODY = 'The categories are the pure concepts of the understanding, applied to intuition.'
+
+
+@pytest.mark.parametrize('line', ['12', '- 12 -', '— 7 —', 'Page 12', 'page 3 of 300', '12/300', 'iv', 'IV', '- ix -', 'Page ii'])
+def test_page_numbers_are_recognized(line):
+    assert _is_page_number(line, page_index=20)
+
+
+@pytest.mark.parametrize('line', ['', '-', '—', ' ', 'mix', 'vi', 'Vi', 'civil', 'CIVIL', 'mid', 'Civil', 'did', 'Page', 'iiii'])
+def test_words_and_empty_lines_are_not_page_numbers(line):
+    assert not _is_page_number(line, page_index=2)
+
+
+def test_roman_page_number_cannot_exceed_the_physical_page():
+    assert _is_page_number('vi', page_index=5)
+    assert not _is_page_number('vi', page_index=4)
+    assert not _is_page_number('mix', page_index=500)
+
+
+def test_roman_value():
+    assert [_roman_value(n) for n in ('i', 'iv', 'ix', 'xiv', 'xl', 'xcix', 'mcmxc')] == [1, 4, 9, 14, 40, 99, 1990]
+
+
+def test_body_lines_that_look_like_numerals_are_kept():
+    pages = [f'{BODY}\n\nmix\n\nvi', f'{BODY}\n\nCivil', f'{BODY}\n\n-']
+    text, report = normalize_pages(pages)
+    for word in ('mix', 'vi', 'Civil', '-'):
+        assert word in text.split('\n\n')
+    assert report.page_numbers_removed == 0
+
+
+def test_page_numbers_are_removed():
+    bodies = [f'{BODY[:-1]} on page {n}.' for n in range(1, 5)] # Distinct, so none counts as a running header.
+    pages = [f'i\n{bodies[0]}', f'{bodies[1]}\nii', f'{bodies[2]}\n\n- 3 -', f'Page 4 of 4\n{bodies[3]}']
+    text, report = normalize_pages(pages)
+    assert report.page_numbers_removed == 4
+    assert text.split('\n\n') == bodies
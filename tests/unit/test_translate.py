@@ -0,0 +1,36 @@
+import asyncio
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types as genai_types
+
+from services.translate import SEGMENT_PROMPT, translate_async
+from utils.helpers import estimate_tokens
+
+PROMPTS = [] # Text of every model request.
+
+
+class UpperLlm(BaseLlm):
+    """'Translates' by upper-casing the message (segment markers are unaffected)."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        text = llm_request.contents[-1].parts[0].text
+        PROMPTS.append(text)
+        if text.startswith(SEGMENT_PROMPT.split('{')[0]):
+            text = text.split('\n\n', 1)[1]
+        yield LlmResponse(content=genai_types.Content(role='model', parts=[genai_types.Part(text=text.upper())]))
+
+
+def test_over_long_paragraph_is_split_into_bounded_passages(make_runner):
+    runner = make_runner(UpperLlm(model='upper'), name='translater')
+    long_paragraph = ' '.join(f'Sentence number {i} of the long paragraph.' for i in range(200))
+    text = f'A short opening.\n\n{long_paragraph}\n\nA short ending.'
+    finished = {}
+    PROMPTS.clear()
+
+    translation = asyncio.run(translate_async(text, on_paragraph=finished.__setitem__, runner=runner, segment_tokens=100))
+
+    assert translation == text.upper()
+    assert finished == {0: 'A SHORT OPENING.', 1: long_paragraph.upper(), 2: 'A SHORT ENDING.'}
+    header = estimate_tokens(SEGMENT_PROMPT.format(text=''))
+    assert len(PROMPTS) > 10 and max(estimate_tokens(prompt) for prompt in PROMPTS) <= 100 + header
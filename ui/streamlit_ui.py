@@ -1,19 +1,135 @@
-from pypdf import PdfReader
+import os
+
 import streamlit as st
-import numpy as np
 
+from utils.events import load_event_store
+from utils.pdf_extract import count_pages, iter_pages
+from utils.text_normalize import normalize_pages
+from utils.retrieval import format_passages, get_document_index
+from utils.doc_store import get_document_store, session_memory
 from utils.globe import Globe
 from services.adk_service import initialize_adk, run_adk_sync
-from config.settings import MESSAGE_HISTORY_KEY, get_api_key
+from services.jobs import DONE, get_job_manager
+from services.planner import plan_request
+from services.prefetch import prefetch_summary
+from config.settings import (
+    EVENT_YEAR_WINDOW, EVENTS_PATH, EXTRACTION_PREVIEW_PAGES, GLOBE_FRAME_BUCKET_YEARS, GLOBE_LOD_LEVELS, GLOBE_MESH_BYTE_BUDGET,
+    GLOBE_QUANTIZE, MAX_EVENTS_LISTED, MESSAGE_HISTORY_KEY, VIEW_PAGES_PER_SCREEN, get_api_key
+)
+
+@st.cache_resource
+def get_globe():
+    """
+    Returns the Globe shared by every session of this process.
+    Uses Streamlit's cache_resource so the mesh is loaded and the base figure built only once.
+    """
+    return Globe(land_color='rgb(117, 45, 55)', lod_levels=GLOBE_LOD_LEVELS, quantize=GLOBE_QUANTIZE)
+
+@st.cache_resource
+def get_event_store():
+    """
+    Returns the historical event store shared by every session of this process.
+    """
+    return load_event_store(EVENTS_PATH)
+
+@st.cache_resource(max_entries = 32)
+def get_timeline_figure(fields, start_year):
+    """
+    Returns the globe with one animation frame per timeline bucket, played entirely in the browser.
+    Cached per field selection and start bucket; sessions only read the shared figure.
+    """
+    return get_globe().animated_figure(
+        get_event_store(),
+        fields = list(fields),
+        year_min = 0,
+        year_max = 2025,
+        bucket_years = GLOBE_FRAME_BUCKET_YEARS,
+        start_year = start_year,
+        marker_color = 'rgb(108, 140, 123)',
+        marker_size = 6,
+        max_bytes = GLOBE_MESH_BYTE_BUDGET
+    )
 
 @st.dialog('View/Edit Fields')
 def field():
     options = st.multiselect(
         "Please select the educational fields you are working with.",
-        ["Science", "Philosophy", 'Math', 'History', 'Economics', 'Medicine', 'Art']
+        ["Science", "Philosophy", 'Math', 'History', 'Economics', 'Medicine', 'Art'],
+        default = st.session_state.fields
     )
+    if st.button('Save'):
+        st.session_state.fields = options # Used to filter the timeline events and globe points.
+        st.rerun()
     
 
+def page_window(document, raw_pages = False):
+    """
+    Shows VIEW_PAGES_PER_SCREEN pages of a stored document, with previous/next buttons and jump-to-page.
+    Only the pages shown are read from the document store, so a rerun costs the same for any document length.
+
+    Args:
+        document (DocumentHandle): The document to show.
+        raw_pages (bool): The pages are extracted PDF pages; their line breaks are joined as in the extraction preview.
+    """
+    total = len(document)
+    key = f'view_page_{document.digest[:16]}' # One position per document, so each view keeps its own place.
+    st.session_state[key] = min(st.session_state.get(key, 1), total)
+
+    def turn(step):
+        st.session_state[key] = min(max(st.session_state[key] + step, 1), total)
+
+    def jump():
+        st.session_state[key] = st.session_state[f'{key}_input']
+
+    if total > VIEW_PAGES_PER_SCREEN:
+        # The input widget's own state is dropped by Streamlit whenever it isn't shown, so it is re-seeded from the position.
+        st.session_state[f'{key}_input'] = st.session_state[key]
+        prev_col, page_col, count_col, next_col = st.columns([1, 2, 2, 1], vertical_alignment = 'center')
+        prev_col.button(':material/chevron_left:', key = f'{key}_prev', type = 'tertiary', on_click = turn, args = (-VIEW_PAGES_PER_SCREEN,))
+        page_col.number_input('Page', min_value = 1, max_value = total, step = 1, key = f'{key}_input', on_change = jump, label_visibility = 'collapsed')
+        count_col.caption(f'of {total} pages')
+        next_col.button(':material/chevron_right:', key = f'{key}_next', type = 'tertiary', on_click = turn, args = (VIEW_PAGES_PER_SCREEN,))
+
+    first = st.session_state[key] - 1
+    for number, page in enumerate(document.pages(first, first + VIEW_PAGES_PER_SCREEN), start = first + 1):
+        if raw_pages:
+            st.caption(f'Page {number}')
+            page = page.replace('\n', ' ')
+        st.markdown(page)
+
+@st.fragment(run_every = 1)
+def job_panel():
+    """
+    Shows progress, partial output and a Cancel button for this session's background jobs.
+    Reruns on its own every second; when a job finishes, its result is stored and the whole app reruns to show it.
+    """
+    manager = get_job_manager()
+    for kind, job_id in list(st.session_state.jobs.items()):
+        job = manager.get(job_id)
+        if job is None or not job.active:
+            del st.session_state.jobs[kind]
+        if job is None:
+            continue
+
+        if job.status == DONE:
+            # The 'summary' and 'translation' views are named after the job kinds; the session keeps only a handle.
+            st.session_state[kind] = job.result
+            if kind == 'summary':
+                st.session_state.summary_timings = {'first_token_seconds': job.first_output, 'total_seconds': job.finished - job.started}
+                st.session_state.summary_truncated = job.truncated
+            st.session_state.viewing = kind
+            st.rerun()
+        elif not job.active:
+            st.toast(f'{kind.title()} {job.status}' + (f': {job.error}' if job.error else ''))
+        else:
+            with st.container(border = True):
+                progress_col, cancel_col = st.columns([8, 1], vertical_alignment = 'center')
+                progress_col.progress(job.progress, text = f'{kind.title()} {job.status}...')
+                if cancel_col.button('Cancel', key = f'cancel_{job.id}', type = 'tertiary'):
+                    job.cancel()
+                if job.partial_text:
+                    st.markdown(job.partial_text)
+
 def run_streamlit_app():
     '''
     Sets up and runs the Streamlit web application for the ADK chat assistant.
@@ -24,14 +140,34 @@ def run_streamlit_app():
         st.session_state.file_name = None
     if 'file_text' not in st.session_state:
         st.session_state.file_text = None
+    if 'file_pages' not in st.session_state:
+        st.session_state.file_pages = None
+    if 'normalization' not in st.session_state:
+        st.session_state.normalization = None
     if 'summary' not in st.session_state:
         st.session_state.summary = None
     if 'translation' not in st.session_state:
         st.session_state.translation = None
+    if 'summary_timings' not in st.session_state:
+        st.session_state.summary_timings = {}
+    if 'summary_truncated' not in st.session_state:
+        st.session_state.summary_truncated = False # The summary reached its output cap and may end mid-sentence.
+    if 'client_id' not in st.session_state:
+        st.session_state.client_id = os.urandom(8).hex() # Keys this browser session's background jobs and ADK sessions.
+    if 'jobs' not in st.session_state:
+        st.session_state.jobs = {} # Job kind ('summary' / 'translation') -> ID of its running job.
+    if 'download_ready' not in st.session_state:
+        st.session_state.download_ready = None # Digest of the document whose download has been prepared.
+    if 'prefetch_job' not in st.session_state:
+        st.session_state.prefetch_job = None # ID of the summary job started speculatively on upload.
     if 'viewing' not in st.session_state:
         st.session_state.viewing = None
     if 'year' not in st.session_state:
-        st.session_state.year = None
+        st.session_state.year = 0
+    if 'fields' not in st.session_state:
+        st.session_state.fields = []
+    if 'animate_timeline' not in st.session_state:
+        st.session_state.animate_timeline = False
 
     st.set_page_config(page_title='Aura', layout='wide') # Configures the browser tab title and page layout.
     
@@ -39,8 +175,8 @@ def run_streamlit_app():
     if not api_key:
         st.error('Action Required: Google API Key Not Found or Invalid! Please set GOOGLE_API_KEY in your .env file. ⚠️')
         st.stop() # Stop the application if the API key is missing, prompting the user for action.
-    # Initialize ADK runner and session ID (cached to run only once).
-    adk_runner, current_session_id = initialize_adk()
+    # The runner is shared (cached); the ADK session is this browser session's own, stored under its client ID.
+    adk_runner, current_session_id = initialize_adk(st.session_state.client_id)
     
     # Display session ID for debugging purposes
     print(f"DEBUG UI: Using ADK session ID: {current_session_id}")
@@ -50,26 +186,29 @@ def run_streamlit_app():
     
     with col1:
         # Display Globe
-        # --- Example Data Generation ---
-        N = 15
-        np.random.seed(42)
-        custom_lat = np.random.uniform(-90, 90, N)
-        custom_lon = np.random.uniform(-180, 180, N)
-
-        # 1. Initialize the globe object (assuming ne_50m_land.shp is in the directory)
-        # Using the 50m data as recommended for stability
-        globe = Globe(land_color='rgb(117, 45, 55)')
-
-        # 2. Create the initial figure object
-        fig = globe.create_figure()
-
-        # 3. Update the scatter data with your custom points
-        globe.update_scatter_data(
-            lon_deg=custom_lon, 
-            lat_deg=custom_lat, 
-            marker_color='rgb(108, 140, 123)', 
-            marker_size=6
-        )
+        if st.session_state.animate_timeline:
+            # Every bucket of the timeline is sent as an animation frame, so scrubbing never reruns the script
+            start_bucket = st.session_state.year - st.session_state.year % GLOBE_FRAME_BUCKET_YEARS
+            fig = get_timeline_figure(tuple(st.session_state.fields), start_bucket)
+        else:
+            # Events near the Timeline year, limited to the selected fields
+            events = get_event_store().query(
+                st.session_state.year - EVENT_YEAR_WINDOW,
+                st.session_state.year + EVENT_YEAR_WINDOW,
+                fields = st.session_state.fields
+            )
+
+            # 1. Get the process-wide globe (continents and ocean are built once and shared by every session)
+            globe = get_globe()
+
+            # 2. Build this session's figure: the shared base plus its own scatter overlay
+            fig = globe.figure_with_points(
+                lon_deg=events.lon,
+                lat_deg=events.lat,
+                marker_color='rgb(108, 140, 123)',
+                marker_size=6,
+                max_bytes=GLOBE_MESH_BYTE_BUDGET
+            )
 
         st.plotly_chart(fig, config = {'displayModeBar': False})
 
@@ -77,19 +216,23 @@ def run_streamlit_app():
         if st.button(':material/edit: View/Edit Fields'):
             field()
         st.subheader(f'Historical Happeninings during :grey[{st.session_state.year}]', divider = 'grey')
-        st.markdown("""
-- **First Human Heart Transplant:** Dr. Christiaan Barnard and his team performed the world's first successful human heart transplantation in Cape Town, South Africa (December 3). Though the patient survived only 18 days, the operation marked a major medical milestone.
-
-- **Discovery of Pulsars:** Radio astronomers Jocelyn Bell Burnell and Antony Hewish discovered the first pulsar (a rapidly rotating neutron star emitting beams of electromagnetic radiation) in November, a finding that fundamentally advanced the field of astrophysics.
-
-- **Venera 4 Probe Reaches Venus:** The Soviet Union's Venera 4 probe successfully entered the atmosphere of Venus on October 18, transmitting the first direct data about the planet's atmospheric composition, temperature, and pressure.
-
-""")    
+        year_events = get_event_store().query(st.session_state.year, fields = st.session_state.fields)
+        if not len(get_event_store()):
+            st.info(f'No events loaded: add `{EVENTS_PATH}` (a .parquet or .csv file with year, lat, lon, field and text columns) and restart the app.')
+        elif len(year_events):
+            st.markdown('\n\n'.join(f"- **{event['field']}:** {event['text']}" for event in year_events.records(MAX_EVENTS_LISTED)))
+        else:
+            st.caption('No recorded events for this year.')
         st.divider()
 
     
     # Timeline
-    st.session_state.year = st.slider('Timeline', min_value = 0, max_value = 2025)
+    # Bound to st.session_state.year through its key, so the globe and events above see the new year on the same rerun.
+    # In animated mode the globe carries its own timeline slider, so the server-side one is disabled.
+    st.slider('Timeline', min_value = 0, max_value = 2025, key = 'year', disabled = st.session_state.animate_timeline)
+    st.toggle('Play timeline in the browser', key = 'animate_timeline')
+
+    extraction_preview = st.empty() # Shows pages of a newly uploaded PDF while the rest are still being extracted.
 
     # Sidebar section
     with st.sidebar:
@@ -101,28 +244,58 @@ def run_streamlit_app():
         file = st.file_uploader("", type=['pdf'], label_visibility= 'collapsed')
 
         if file and (st.session_state.file_name is None or file.name != st.session_state.file_name):
-            reader = PdfReader(file)
-
-            texts = []
-            for page in reader.pages:
-                text = page.extract_text()
-                texts.append(text.replace('\n', ''))
-                texts.append('\n\n')
-
+            # Pages arrive in completion order from a process pool (or straight from the page cache). The opening
+            # pages are previewed as soon as they are complete; a long book is then read in the paginated viewing pane.
+            data = file.getvalue()
+            total_pages = count_pages(data)
+            pages = {}
+            next_page = 0
+            progress = st.progress(0.0, text = 'Extracting text...')
+            with extraction_preview.container():
+                st.header('Original Text', divider = 'grey')
+                for page_number, text in iter_pages(data):
+                    pages[page_number] = text
+                    while next_page < EXTRACTION_PREVIEW_PAGES and next_page in pages:
+                        st.markdown(pages[next_page].replace('\n', ' '))
+                        next_page += 1
+                    progress.progress(len(pages) / total_pages, text = f'Extracted {len(pages)} of {total_pages} pages')
+            progress.empty()
+            extraction_preview.empty()
+
+            pages = [pages[n] for n in range(len(pages))]
+            # Headers, footers, page numbers and line-break hyphens are stripped before the text reaches the agents.
+            file_text, normalization = normalize_pages(pages)
+
+            # Texts are stored compressed on disk (see utils/doc_store.py); the session keeps lightweight handles.
             st.session_state.file_name = file.name
-            st.session_state.file_text = ' '.join(texts)
+            st.session_state.file_pages = get_document_store().put_pages(pages)
+            st.session_state.file_text = get_document_store().put_text(file_text)
+            st.session_state.normalization = normalization
             st.session_state.summary = None
+            st.session_state.summary_truncated = False
             st.session_state.translation = None
             st.session_state.status = f'File Uploaded: {file.name}'
+            for job_id in [*st.session_state.jobs.values(), st.session_state.prefetch_job]: # Results for the previous document are no longer wanted.
+                get_job_manager().cancel(job_id)
+            st.session_state.jobs = {}
+            # Starts the summary before it is asked for, if PREFETCH_SUMMARY is on and within budget (see services/prefetch.py).
+            prefetched = prefetch_summary(st.session_state.client_id, file_text, st.session_state.get('response_pages', 1))
+            st.session_state.prefetch_job = prefetched.id if prefetched else None
 
             st.session_state.viewing = 'file_text' # Set the initial view to the original file
+
+        if st.session_state.normalization:
+            st.caption(f'Text cleanup {st.session_state.normalization}')
+        memory = session_memory(st.session_state)
+        st.caption(f"Session memory ~{memory['memory_bytes'] / 1024:,.0f} KB · "
+                   f"{memory['document_chars'] / 1024:,.0f}K characters of text stored in {memory['stored_bytes'] / 1024:,.0f} KB on disk")
         
         st.divider()
 
         # Configuration Options
 
         # Response length control
-        response_length = st.slider(label = 'Response Length (:material/numbers: pages)', min_value = 1, max_value = 5)
+        response_length = st.slider(label = 'Response Length (:material/numbers: pages)', min_value = 1, max_value = 5, key = 'response_pages')
 
         # Temperature control
         response_type = st.radio(
@@ -134,6 +307,16 @@ def run_streamlit_app():
                                 ]
         )
 
+        # What the summary and translation buttons would send, before anything is sent (see services/planner.py).
+        summary_plan = translation_plan = None
+        if st.session_state.file_text:
+            # Translate the current view content, or just the file text if no view is set
+            content_to_translate = (st.session_state[st.session_state.viewing] if st.session_state.viewing else None) or st.session_state.file_text
+            summary_plan = plan_request('summary', st.session_state.file_text, response_length)
+            translation_plan = plan_request('translation', content_to_translate)
+            st.caption(f':material/planner_review: {summary_plan}')
+            st.caption(f':material/translate: {translation_plan}')
+
     ## < -- Options Section -- >
     col1, col2, col3, col4, _ = st.columns([1, 1, 1, 1, 32], vertical_alignment = 'center')
 
@@ -143,36 +326,32 @@ def run_streamlit_app():
 
 
     if col2.button(':material/planner_review:', type = 'tertiary') and st.session_state.file_text:
+        latest = get_job_manager().latest(st.session_state.client_id, summary_plan.key, 'summary')
         if st.session_state.summary:
             st.session_state.viewing = 'summary'
+        elif latest is not None and latest.status == DONE: # E.g. a prefetched summary that is already complete.
+            st.session_state.summary = latest.result
+            st.session_state.summary_timings = {'first_token_seconds': latest.first_output, 'total_seconds': latest.finished - latest.started}
+            st.session_state.summary_truncated = latest.truncated
+            st.session_state.viewing = 'summary'
         else:
-            # message_placeholder = st.empty() # Placeholder isn't needed here as content is written to main viewing area
-            with st.spinner('Assistant is thinking...', show_time = True): # Show a spinner while the agent processes the request.
-                print(f"DEBUG UI: Sending message to ADK with session ID: {current_session_id}")
-
-                agent_response = run_adk_sync(adk_runner, current_session_id, f'Summarize the following Philosophy chapter, user the summarizer sub-agent: {st.session_state.file_text}') # Call the synchronous ADK runner.
-                print(f"DEBUG UI: Received response from ADK: {agent_response[:50]}...")
-
-                st.session_state.summary = agent_response
-                st.session_state.viewing = 'summary' # Set the view state
+            # Runs in the background (see services/jobs.py); the jobs panel below polls its progress and partial text.
+            # A prefetched job that is still running is joined rather than started again.
+            print("DEBUG UI: Submitting summary job")
+            job = get_job_manager().submit(st.session_state.client_id, summary_plan.key, 'summary', st.session_state.file_text.text(), summary_plan)
+            st.session_state.jobs['summary'] = job.id
 
 
     if col3.button(':material/translate:', type = 'tertiary') and st.session_state.file_text: # Check file_text existence to enable the button
         if st.session_state.translation:
             st.session_state.viewing = 'translation'
         else:
-            # message_placeholder = st.empty() # Placeholder isn't needed here as content is written to main viewing area
-            with st.spinner('Assistant is thinking...', show_time = True): # Show a spinner while the agent processes the request.
-                print(f"DEBUG UI: Sending message to ADK with session ID: {current_session_id}")
-                
-                # Check which content to translate: the current view content or just the file text if no view is set
-                content_to_translate = st.session_state[st.session_state.viewing] if st.session_state.viewing else st.session_state.file_text
-
-                agent_response = run_adk_sync(adk_runner, current_session_id, f'Translate the following text, use the translater sub-agent: {content_to_translate}') # Call the synchronous ADK runner.
-                print(f"DEBUG UI: Received response from ADK: {agent_response[:50]}...")
+            print("DEBUG UI: Submitting translation job")
+            job = get_job_manager().submit(st.session_state.client_id, translation_plan.key, 'translation', content_to_translate.text(), translation_plan)
+            st.session_state.jobs['translation'] = job.id
 
-                st.session_state.translation = agent_response
-                st.session_state.viewing = 'translation' # Set the view state
+    if st.session_state.jobs:
+        job_panel()
     
     if st.session_state.viewing:
         ## < -- Viewing -- >
@@ -180,25 +359,42 @@ def run_streamlit_app():
 
         with view_col1:
             if st.session_state.viewing and st.session_state[st.session_state.viewing]:
-                # Only show the download button if there is content to download
-                col4.download_button(
-                    ':material/download:', 
-                    data = st.session_state[st.session_state.viewing], 
-                    file_name = f'{st.session_state.viewing} - {st.session_state.file_name.split(".")[0]}.md',
-                    type = 'tertiary'
-                )
+                document = st.session_state[st.session_state.viewing]
+                # Only show the download button if there is content to download. The whole text is assembled only
+                # after a first click and only for the following run, not on every rerun of the page.
+                if st.session_state.download_ready == document.digest:
+                    col4.download_button(
+                        ':material/download:',
+                        data = document.text(),
+                        file_name = f'{st.session_state.viewing} - {st.session_state.file_name.split(".")[0]}.md',
+                        type = 'primary',
+                        on_click = lambda: st.session_state.update(download_ready = None)
+                    )
+                elif col4.button(':material/download:', type = 'tertiary', help = 'Prepare download'):
+                    st.session_state.download_ready = document.digest
+                    st.rerun()
 
                 st.header(f'{st.session_state.viewing.title().replace('File_', 'Original ')}', divider = 'grey')
+                if st.session_state.viewing == 'summary' and st.session_state.summary_truncated:
+                    st.warning('The summary reached the Response Length limit and may be cut off; '
+                               'increase Response Length to get a longer one.', icon = ':material/content_cut:')
+
+                # The original is paged as extracted from the PDF, so page numbers match the book (and retrieval citations).
+                if st.session_state.viewing == 'file_text' and st.session_state.file_pages:
+                    page_window(st.session_state.file_pages, raw_pages = True)
+                else:
+                    page_window(document)
 
-                st.markdown(st.session_state[st.session_state.viewing])
+                timings = st.session_state.summary_timings
+                if st.session_state.viewing == 'summary' and timings.get('first_token_seconds') is not None:
+                    st.caption(f"First text after {timings['first_token_seconds']:.1f}s · complete after {timings['total_seconds']:.1f}s")
 
                 st.divider()
 
         with view_col2:
             st.info('New Feature Coming Soon', width = 220)
 
-    '''
-     # Initialize chat message history in Streamlit's session state if it doesn't exist.
+    # Initialize chat message history in Streamlit's session state if it doesn't exist.
     if MESSAGE_HISTORY_KEY not in st.session_state:
         st.session_state[MESSAGE_HISTORY_KEY] = []
     # Display existing chat messages from the session state.
@@ -217,10 +413,15 @@ def run_streamlit_app():
             with st.spinner('Assistant is thinking...', show_time = True): # Show a spinner while the agent processes the request.
                 print(f"DEBUG UI: Sending message to ADK with session ID: {current_session_id}")
 
-                agent_response = run_adk_sync(adk_runner, current_session_id, prompt + f'\nInput: {st.session_state.file}') # Call the synchronous ADK runner.
+                question = prompt
+                if st.session_state.file_pages:
+                    # Only the passages most relevant to the question are sent, not the whole document (see utils/retrieval.py).
+                    # The index is built on the first question about a document and cached by its digest.
+                    context = format_passages(get_document_index(st.session_state.file_pages).search(prompt))
+                    question += f'\nRelevant passages of the document:\n{context}'
+                agent_response = run_adk_sync(adk_runner, current_session_id, question, user_id = st.session_state.client_id) # Call the synchronous ADK runner.
                 print(f"DEBUG UI: Received response from ADK: {agent_response[:50]}...")
                 message_placeholder.markdown(agent_response) # Update the placeholder with the final response.
         
         # Append assistant's response to history.
         st.session_state[MESSAGE_HISTORY_KEY].append({'role': 'assistant', 'content': agent_response})
-        '''
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Token-bounded chunking of long texts on paragraph boundaries.
+
+Chunk boundaries are content-defined: past a minimum size, a chunk ends after
+any paragraph whose hash hits a fixed pattern, and always before it would
+exceed the maximum. An edit therefore only changes the chunks around it;
+boundaries resynchronize right after, so the unchanged chunks (and their
+cached results) are reused.
+"""
+import re
+
+from utils.helpers import content_hash, estimate_tokens
+
+# On average one paragraph in this many ends a chunk once the chunk has reached its minimum size.
+_BOUNDARY_MODULUS = 4
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+
+def split_long_paragraph(text, max_tokens):
+    """Splits an over-long paragraph into sentence groups (or hard slices) of at most max_tokens."""
+    max_chars = max_tokens * 4
+    pieces, current = [], ''
+    for sentence in _SENTENCE_BREAK.split(text):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and estimate_tokens(current) + estimate_tokens(sentence) + 1 > max_tokens:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _paragraphs(text, max_tokens):
+    for paragraph in text.split('\n\n'):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            yield paragraph
+        else:
+            yield from split_long_paragraph(paragraph, max_tokens)
+
+
+def chunk_text(text, max_tokens, min_tokens=None):
+    """
+    Splits text into chunks of whole paragraphs, each at most max_tokens (estimated).
+
+    Args:
+        text (str): Text with paragraphs separated by blank lines.
+        max_tokens (int): Upper bound on the estimated tokens of a chunk.
+        min_tokens (int): Size after which a content-defined boundary may end a chunk;
+            defaults to half of max_tokens.
+
+    Returns:
+        list: The chunks, in order, with paragraphs separated by blank lines.
+    """
+    if min_tokens is None:
+        min_tokens = max_tokens // 2
+    chunks, current, size = [], [], 0
+    for paragraph in _paragraphs(text, max_tokens):
+        tokens = estimate_tokens(paragraph) + 1 # +1 for the paragraph separator.
+        if current and size + tokens > max_tokens:
+            chunks.append('\n\n'.join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += tokens
+        if size >= min_tokens and int(content_hash(paragraph)[:8], 16) % _BOUNDARY_MODULUS == 0:
+            chunks.append('\n\n'.join(current))
+            current, size = [], 0
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
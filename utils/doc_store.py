@@ -0,0 +1,193 @@
+"""
+Compressed on-disk storage of document texts, referenced from st.session_state by handle.
+
+Every session used to keep the extracted text, the summary and the
+translation as full strings in st.session_state, so process memory grew with
+every user and every book. The store instead writes each text once per
+content hash, as individually zlib-compressed pages in one file plus a small
+JSON index of page offsets. Sessions keep only a DocumentHandle (hash, page
+count, sizes); pages are read and decompressed on demand, just the range
+being shown, with a small process-wide LRU of decompressed pages shared by
+all sessions.
+
+Texts are split into pages of about DOC_STORE_PAGE_CHARS on paragraph
+boundaries; PDF page texts are stored one page per page.
+"""
+import json
+import os
+import sys
+import threading
+import zlib
+from functools import lru_cache
+
+from config.settings import DOC_STORE_DIR, DOC_STORE_PAGE_CACHE, DOC_STORE_PAGE_CHARS
+from utils.helpers import content_hash, estimate_tokens
+
+PAGE_SEPARATOR = '\n\n' # Joins the pages of a handle back into one text.
+
+
+class DocumentHandle:
+    """A lightweight reference to a stored document; this, not the text, is what st.session_state holds."""
+
+    __slots__ = ('root', 'digest', 'page_count', 'chars', 'tokens', 'stored_bytes')
+
+    def __init__(self, root, digest, page_count, chars, tokens, stored_bytes):
+        self.root = root
+        self.digest = digest
+        self.page_count = page_count
+        self.chars = chars
+        self.tokens = tokens
+        self.stored_bytes = stored_bytes # Compressed size on disk.
+
+    def __len__(self):
+        return self.page_count
+
+    def __bool__(self):
+        return self.chars > 0
+
+    def page(self, index):
+        """Returns the text of one page (0-based)."""
+        return _read_page(self.root, self.digest, index)
+
+    def pages(self, start=0, end=None):
+        """Returns the texts of pages start to end (exclusive; None reads to the last page)."""
+        end = self.page_count if end is None else min(end, self.page_count)
+        return [self.page(i) for i in range(start, end)]
+
+    def text(self):
+        """Returns the whole text; only for requests and downloads that need all of it."""
+        return PAGE_SEPARATOR.join(self.pages())
+
+
+@lru_cache(maxsize=64)
+def _page_offsets(root, digest):
+    with open(os.path.join(root, f'{digest}.json'), encoding='utf-8') as f:
+        return json.load(f)['offsets']
+
+
+@lru_cache(maxsize=DOC_STORE_PAGE_CACHE)
+def _read_page(root, digest, index):
+    offsets = _page_offsets(root, digest)
+    with open(os.path.join(root, f'{digest}.zpages'), 'rb') as f:
+        f.seek(offsets[index])
+        return zlib.decompress(f.read(offsets[index + 1] - offsets[index])).decode('utf-8')
+
+
+def _split_text(text, page_chars):
+    """Groups paragraphs into pages of about page_chars; joining the pages with PAGE_SEPARATOR gives the text back."""
+    pages, current = [], []
+    size = 0
+    for paragraph in text.split(PAGE_SEPARATOR):
+        if current and size + len(paragraph) > page_chars:
+            pages.append(PAGE_SEPARATOR.join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(paragraph) + len(PAGE_SEPARATOR)
+    pages.append(PAGE_SEPARATOR.join(current))
+    return pages
+
+
+class DocumentStore:
+    """Writes documents once per content hash as compressed pages; returns handles to them."""
+
+    def __init__(self, root=DOC_STORE_DIR):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+
+    def put_text(self, text, page_chars=DOC_STORE_PAGE_CHARS):
+        """
+        Stores a text (e.g. the normalized document, a summary or a translation).
+
+        Args:
+            text (str): The text, with paragraphs separated by blank lines.
+            page_chars (int): Approximate characters per stored page.
+
+        Returns:
+            DocumentHandle: The handle; handle.text() == text.
+        """
+        return self._put(content_hash(text), _split_text(text, page_chars), len(text), estimate_tokens(text))
+
+    def put_pages(self, pages):
+        """
+        Stores a list of page texts (e.g. the pages extracted from a PDF) one stored page per page.
+
+        Args:
+            pages (list): Text of each page, in order.
+
+        Returns:
+            DocumentHandle: The handle.
+        """
+        chars = sum(len(page) for page in pages)
+        return self._put(content_hash('pages', *pages), pages, chars, (chars + 3) // 4)
+
+    def _put(self, digest, pages, chars, tokens):
+        index_path = os.path.join(self.root, f'{digest}.json')
+        if os.path.exists(index_path): # The index is written last, so the document is complete.
+            with open(index_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            return DocumentHandle(self.root, digest, len(meta['offsets']) - 1, meta['chars'], meta['tokens'], meta['offsets'][-1])
+
+        offsets = [0]
+        data_path = os.path.join(self.root, f'{digest}.zpages')
+        temp_path = f'{data_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            for page in pages:
+                offsets.append(offsets[-1] + f.write(zlib.compress(page.encode('utf-8'), 6)))
+        os.replace(temp_path, data_path)
+        temp_path = f'{index_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'offsets': offsets, 'chars': chars, 'tokens': tokens}, f)
+        os.replace(temp_path, index_path)
+        print(f"DEBUG: Stored document {digest[:12]}: {len(pages)} pages, {chars:,} characters in {offsets[-1]:,} bytes")
+        return DocumentHandle(self.root, digest, len(pages), chars, tokens, offsets[-1])
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_document_store():
+    """Returns the process-wide document store."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = DocumentStore()
+        return _default_store
+
+
+def _deep_size(value, seen):
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(item, seen) for item in value)
+    return size
+
+
+def session_memory(state):
+    """
+    Reports what a session keeps in memory and what its documents take on disk.
+
+    Args:
+        state: st.session_state (or any mapping).
+
+    Returns:
+        dict: 'memory_bytes' (approximate deep size of the session's values), 'largest' (key of the
+            biggest value), 'document_chars' and 'stored_bytes' (text held through handles, and its size on disk).
+    """
+    seen, sizes = set(), {}
+    document_chars = stored_bytes = 0
+    for key, value in state.items():
+        sizes[key] = _deep_size(value, seen)
+        if isinstance(value, DocumentHandle):
+            document_chars += value.chars
+            stored_bytes += value.stored_bytes
+    return {
+        'memory_bytes': sum(sizes.values()),
+        'largest': max(sizes, key=sizes.get) if sizes else None,
+        'document_chars': document_chars,
+        'stored_bytes': stored_bytes,
+    }
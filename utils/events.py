@@ -0,0 +1,205 @@
+"""
+Year-indexed store of historical events for the Timeline slider and the globe.
+
+Events are loaded once from a CSV or Parquet file with year, lat, lon, field
+and text columns, sorted by year and held as NumPy arrays. Each field also
+keeps its own year-sorted index, so a year (or year-window) query filtered by
+field is a couple of binary searches (np.searchsorted) per selected field and
+never scans the dataset.
+"""
+import os
+
+import numpy as np
+
+from utils.helpers import content_hash
+
+EVENT_COLUMNS = ('year', 'lat', 'lon', 'field', 'text')
+
+
+class EventQuery:
+    """
+    Result of an EventStore query: row indices into the store, in year order.
+
+    Unfiltered queries hold a slice, so their columns are views rather than copies.
+    """
+
+    def __init__(self, store, indices):
+        self.store = store
+        self.indices = indices
+
+    def __len__(self):
+        if isinstance(self.indices, slice):
+            return self.indices.stop - self.indices.start
+        return len(self.indices)
+
+    @property
+    def lon(self):
+        return self.store.lon[self.indices]
+
+    @property
+    def lat(self):
+        return self.store.lat[self.indices]
+
+    @property
+    def years(self):
+        return self.store.years[self.indices]
+
+    def records(self, limit=None):
+        """
+        Returns the matching events as dicts.
+
+        Args:
+            limit (int): Maximum number of events returned.
+
+        Returns:
+            list: Dicts with 'year', 'lat', 'lon', 'field' and 'text' keys.
+        """
+        indices = self.indices
+        if isinstance(indices, slice):
+            indices = range(indices.start, indices.stop)
+        if limit is not None:
+            indices = indices[:limit]
+        store = self.store
+        return [
+            {
+                'year': int(store.years[i]),
+                'lat': float(store.lat[i]),
+                'lon': float(store.lon[i]),
+                'field': store.field_names[store.field_codes[i]],
+                'text': store.texts[i],
+            }
+            for i in indices
+        ]
+
+
+class EventStore:
+    """Immutable, year-sorted event table with per-field indexes."""
+
+    def __init__(self, years, lat, lon, fields, texts):
+        """
+        Builds the store from column arrays (in any order).
+
+        Args:
+            years (array): Event years (negative for BCE).
+            lat (array): Latitudes in degrees.
+            lon (array): Longitudes in degrees.
+            fields (array): Field name of each event (e.g. 'Science').
+            texts (array): Description of each event (Markdown).
+        """
+        years = np.asarray(years, dtype=np.int32)
+        order = np.argsort(years, kind='stable')
+
+        self.years = years[order]
+        self.lat = np.asarray(lat, dtype=np.float32)[order]
+        self.lon = np.asarray(lon, dtype=np.float32)[order]
+        self.texts = np.asarray(texts, dtype=object)[order]
+        field_names, field_codes = np.unique(np.asarray(fields, dtype=str)[order], return_inverse=True)
+        self.field_names = [str(name) for name in field_names]
+        self.field_codes = field_codes.astype(np.int16)
+
+        # field name -> (row indices of that field in year order, their years)
+        self._by_field = {}
+        for code, name in enumerate(self.field_names):
+            rows = np.flatnonzero(self.field_codes == code)
+            self._by_field[name] = (rows, self.years[rows])
+        self._version = None
+
+    def __len__(self):
+        return len(self.years)
+
+    @property
+    def version(self):
+        """Digest of the store's contents; stores holding the same events share it."""
+        if self._version is None:
+            self._version = content_hash(
+                self.years.tobytes(), self.lat.tobytes(), self.lon.tobytes(), self.field_codes.tobytes(),
+                content_hash(*self.field_names), content_hash(*self.texts),
+            )
+        return self._version
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [], [])
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Loads events from a .csv or .parquet file.
+
+        Args:
+            path (str): File with year, lat, lon, field and text columns.
+
+        Returns:
+            EventStore: The loaded store. Rows missing year, lat or lon are dropped.
+        """
+        import pandas as pd
+
+        if path.endswith('.parquet'):
+            df = pd.read_parquet(path, columns=list(EVENT_COLUMNS))
+        else:
+            df = pd.read_csv(path, usecols=list(EVENT_COLUMNS))
+        df = df.dropna(subset=['year', 'lat', 'lon'])
+        return cls(
+            df['year'].to_numpy(),
+            df['lat'].to_numpy(),
+            df['lon'].to_numpy(),
+            df['field'].fillna('Other').astype(str).to_numpy(),
+            df['text'].fillna('').astype(str).to_numpy(),
+        )
+
+    def query(self, year_start, year_end=None, fields=None):
+        """
+        Returns the events between two years (inclusive), optionally limited to some fields.
+
+        Args:
+            year_start (int): First year of the window.
+            year_end (int): Last year of the window; defaults to year_start.
+            fields (list): Field names to keep; None or empty keeps every field.
+
+        Returns:
+            EventQuery: Matching row indices in year order.
+        """
+        if year_end is None:
+            year_end = year_start
+        # Search with the array's own dtype; a mismatched scalar makes NumPy convert the whole array.
+        year_start, year_end = np.int32(year_start), np.int32(year_end)
+
+        if not fields:
+            lo = np.searchsorted(self.years, year_start, side='left')
+            hi = np.searchsorted(self.years, year_end, side='right')
+            return EventQuery(self, slice(int(lo), int(max(lo, hi))))
+
+        parts = []
+        for name in fields:
+            if name not in self._by_field:
+                continue
+            rows, years = self._by_field[name]
+            lo = np.searchsorted(years, year_start, side='left')
+            hi = np.searchsorted(years, year_end, side='right')
+            if hi > lo:
+                parts.append(rows[lo:hi])
+
+        if not parts:
+            return EventQuery(self, np.empty(0, dtype=np.int64))
+        if len(parts) == 1:
+            return EventQuery(self, parts[0])
+        # Row indices follow year order, so sorting the merged indices restores it.
+        return EventQuery(self, np.sort(np.concatenate(parts)))
+
+
+def load_event_store(path):
+    """
+    Loads the event store, falling back to an empty store if the file is missing.
+
+    Args:
+        path (str): Path of the events .csv or .parquet file.
+
+    Returns:
+        EventStore: The loaded (or empty) store.
+    """
+    if not os.path.exists(path):
+        print(f"DEBUG: No events file at {path}; the timeline will show no events.")
+        return EventStore.empty()
+    store = EventStore.from_file(path)
+    print(f"DEBUG: Loaded {len(store)} events from {path}")
+    return store
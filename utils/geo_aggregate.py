@@ -0,0 +1,85 @@
+"""
+Equal-area binning of lon/lat points on the sphere.
+
+Cells come from a Lambert cylindrical equal-area grid: latitude bands are
+uniform in sin(latitude) and longitude columns are uniform in degrees, so
+every cell covers the same surface area. With a power-of-two number of bands
+and columns, halving either axis maps each cell exactly onto one coarser
+cell, which lets the grid be coarsened from the occupied cells alone. One
+axis is halved per step, so the occupied cells at most halve each time and
+the result stays within a factor of two of the marker budget.
+"""
+import numpy as np
+
+# Finest grid: 256 latitude bands x 512 longitude columns (~3.9e3 km^2 per cell on Earth).
+MAX_LAT_BANDS = 256
+
+
+class PointAggregate:
+    """One marker per occupied cell: count-weighted centroid and number of points."""
+
+    def __init__(self, lon_deg, lat_deg, counts, n_lat_bands, n_lon_cols):
+        self.lon_deg = lon_deg
+        self.lat_deg = lat_deg
+        self.counts = counts
+        self.n_lat_bands = n_lat_bands
+        self.n_lon_cols = n_lon_cols
+
+    def __len__(self):
+        return len(self.counts)
+
+
+def _reduce(cell_ids, counts, lon_sums, lat_sums):
+    """Merges entries that share a cell id."""
+    unique_ids, inverse = np.unique(cell_ids, return_inverse=True)
+    n = len(unique_ids)
+    return (
+        unique_ids,
+        np.bincount(inverse, weights=counts, minlength=n),
+        np.bincount(inverse, weights=lon_sums, minlength=n),
+        np.bincount(inverse, weights=lat_sums, minlength=n),
+    )
+
+
+def aggregate_points(lon_deg, lat_deg, max_markers, max_lat_bands=MAX_LAT_BANDS):
+    """
+    Bins points into the finest equal-area grid that yields at most max_markers occupied cells.
+
+    Args:
+        lon_deg (array): Longitudes in degrees.
+        lat_deg (array): Latitudes in degrees.
+        max_markers (int): Upper bound on the number of returned cells (at least 1).
+        max_lat_bands (int): Number of latitude bands of the finest grid (a power of two).
+
+    Returns:
+        PointAggregate: Centroid lon/lat and point count of every occupied cell.
+    """
+    lon = np.asarray(lon_deg, dtype=np.float64)
+    lat = np.asarray(lat_deg, dtype=np.float64)
+    n_bands, n_cols = max_lat_bands, 2 * max_lat_bands
+
+    # Cell indices on the finest grid (n_bands x n_cols).
+    band = np.clip(((np.sin(np.deg2rad(lat)) + 1.0) * 0.5 * n_bands).astype(np.int64), 0, n_bands - 1)
+    col = np.clip(((lon + 180.0) / 360.0 * n_cols).astype(np.int64), 0, n_cols - 1)
+    # A dense bincount over the finest grid is O(n) and avoids sorting every point.
+    fine_ids = band * n_cols + col
+    n_cells = n_bands * n_cols
+    counts = np.bincount(fine_ids, minlength=n_cells)
+    cell_ids = np.flatnonzero(counts)
+    lon_sums = np.bincount(fine_ids, weights=lon, minlength=n_cells)[cell_ids]
+    lat_sums = np.bincount(fine_ids, weights=lat, minlength=n_cells)[cell_ids]
+    counts = counts[cell_ids].astype(np.float64)
+
+    # Coarsen one axis at a time until the occupied cells fit the marker budget: columns while there are
+    # more columns than bands (keeping cells roughly square at the equator), bands otherwise.
+    while len(cell_ids) > max_markers and n_bands * n_cols > 1:
+        band, col = np.divmod(cell_ids, n_cols)
+        if n_cols > n_bands:
+            n_cols //= 2
+            col //= 2
+        else:
+            n_bands //= 2
+            band //= 2
+        cell_ids, counts, lon_sums, lat_sums = _reduce(band * n_cols + col, counts, lon_sums, lat_sums)
+
+    return PointAggregate(lon_sums / counts, lat_sums / counts, counts.astype(np.int64), n_bands, n_cols)
@@ -1,141 +1,299 @@
-import geopandas as gpd
+import os
+import threading
+from collections import OrderedDict
+
 import numpy as np
 import plotly.graph_objects as go
-import matplotlib.tri as mtri
-from matplotlib.path import Path
+
+from config.settings import (
+    GLOBE_FRAME_MAX_MARKERS, GLOBE_MAX_MARKERS, GLOBE_RAW_POINT_THRESHOLD, MESH_BUILD_WORKERS, MESH_CACHE_DIR
+)
+from utils import mesh_builder, mesh_cache
+from utils.geo_aggregate import aggregate_points
+
+# Settings that change the triangulated geometry; part of the mesh cache key.
+TRIANGULATION_SETTINGS = {'method': 'delaunay_centroid_filter', 'all_parts': True, 'holes': True, 'land_scale': 1.001}
+
+# Bytes per vertex (float32 x, y, z; int16 when quantized) and per triangle (int32 i, j, k) in the browser payload.
+BYTES_PER_VERTEX = 12
+BYTES_PER_QUANTIZED_VERTEX = 6
+BYTES_PER_FACE = 12
+
+# Number of timeline frame sets (one per field selection) kept by animated_figure().
+TIMELINE_FRAME_CACHE_SIZE = 8
+
+# Quantized figures store coordinates as int16 with the land sphere at this radius.
+QUANTIZED_RADIUS = np.iinfo(np.int16).max
+
+
+class MeshLevel:
+    """One level of detail of the continent mesh: a shapefile plus an optional simplification tolerance."""
+
+    def __init__(self, name, shapefile_path, simplify_tolerance, globe_radius, cache_dir):
+        self.name = name
+        self.shapefile_path = shapefile_path
+        self.simplify_tolerance = float(simplify_tolerance or 0.0)
+        settings = dict(TRIANGULATION_SETTINGS, simplify_tolerance=self.simplify_tolerance)
+        self.cache_key = mesh_cache.mesh_cache_key(shapefile_path, globe_radius, settings)
+        self.cache_path = mesh_cache.mesh_cache_path(cache_dir, shapefile_path, self.cache_key)
+        self.mesh = None
+        self.build_report = None
+
+    def estimated_bytes(self, quantize=False):
+        """Returns the typed-array payload size of the loaded mesh, with int16 coordinates if quantize is set."""
+        vertices, faces = self.mesh
+        vertex_bytes = BYTES_PER_QUANTIZED_VERTEX if quantize else BYTES_PER_VERTEX
+        return len(vertices) * vertex_bytes + len(faces) * BYTES_PER_FACE
+
 
 class Globe:
     """
     A class to create a minimal 3D Plotly globe with solid continents (Mesh3d)
     and provide a method to update the scatter data points.
     """
-    def __init__(self, shapefile_path='ui/assets/ne_50m_land.shp', globe_radius=1.0, land_color='rgb(100, 180, 100)'):
+    def __init__(self, shapefile_path='ui/assets/ne_50m_land.shp', globe_radius=1.0, land_color='rgb(100, 180, 100)',
+                 mesh_cache_dir=MESH_CACHE_DIR, mesh_build_workers=MESH_BUILD_WORKERS, lod_levels=None,
+                 quantize=False):
         """
-        Initializes the globe, loading the land data and setting up the base figure.
+        Initializes the globe and resolves the cached continent mesh for each level of detail.
+
+        Shapefiles are only read (through geopandas) when a cached mesh is missing or stale.
 
         Args:
             shapefile_path (str): Path to the Natural Earth land shapefile (e.g., ne_50m_land.shp).
             globe_radius (float): Radius of the sphere in Plotly units.
             land_color (str): Solid color for the continents (e.g., 'rgb(R, G, B)').
+            mesh_cache_dir (str): Directory holding the precomputed mesh artifacts.
+            mesh_build_workers (int): Process pool size used when a mesh has to be built.
+            lod_levels (list): Optional levels of detail, ordered coarse to fine, as dicts with
+                'name', 'shapefile_path' and 'simplify_tolerance' (degrees) keys. Defaults to a
+                single unsimplified level built from shapefile_path.
+            quantize (bool): Send continent and ocean coordinates as int16 instead of float32,
+                halving their payload. All traces are scaled by the same factor, so the
+                rendered globe is unchanged apart from sub-pixel rounding.
         """
         self.R_globe = globe_radius
-        self.R_land = self.R_globe * 1.001
+        self.R_land = self.R_globe * TRIANGULATION_SETTINGS['land_scale']
         self.land_color = land_color
+        self.quantize = quantize
+        self.coord_scale = QUANTIZED_RADIUS / self.R_land if quantize else 1.0
         self.shapefile_path = shapefile_path
         self.fig = None
         self.data_trace_id = 'custom_data_points'
 
-        try:
-            self.world_land = gpd.read_file(self.shapefile_path)
-        except Exception as e:
-            print(f"Error loading shapefile at {shapefile_path}: {e}")
-            raise
+        self.mesh_build_workers = mesh_build_workers
+        self._world_land = {}
+        self._base_figures = {}
+        self._timeline_frames = OrderedDict()
+        self._data_trace_index = None
+        self._mesh_lock = threading.RLock()
+
+        if not lod_levels:
+            lod_levels = [{'name': 'full', 'shapefile_path': shapefile_path, 'simplify_tolerance': 0.0}]
+        self.levels = [
+            MeshLevel(level['name'], level.get('shapefile_path', shapefile_path), level.get('simplify_tolerance'),
+                      globe_radius, mesh_cache_dir)
+            for level in lod_levels
+        ]
+        self.level = self.levels[-1] # Level used by the most recent create_figure() call.
+
+    def _get_level(self, name=None):
+        """Returns the named level, or the finest level when name is None."""
+        if name is None:
+            return self.levels[-1]
+        for level in self.levels:
+            if level.name == name:
+                return level
+        raise KeyError(f"Unknown level of detail: {name}")
+
+    def _read_world_land(self, shapefile_path):
+        """Returns the land GeoDataFrame for a shapefile, reading it on first access."""
+        if shapefile_path not in self._world_land:
+            import geopandas as gpd # Deferred so that cached meshes load without geopandas.
+            try:
+                self._world_land[shapefile_path] = gpd.read_file(shapefile_path)
+            except Exception as e:
+                print(f"Error loading shapefile at {shapefile_path}: {e}")
+                raise
+        return self._world_land[shapefile_path]
+
+    @property
+    def world_land(self):
+        """The land GeoDataFrame of the finest level, read from the shapefile on first access."""
+        return self._read_world_land(self.levels[-1].shapefile_path)
+
+    @property
+    def mesh_cache_path(self):
+        """Path of the cached mesh for the finest level."""
+        return self.levels[-1].cache_path
+
+    def mesh_cache_is_stale(self, level=None):
+        """Returns True if the cached mesh for a level is missing or was built from different inputs."""
+        level = self._get_level(level)
+        return mesh_cache.is_stale(level.cache_path, level.cache_key)
+
+    def rebuild_mesh_cache(self, level=None):
+        """
+        Triangulates the shapefile for a level, overwrites its cached mesh and deletes the meshes no level uses.
+
+        Args:
+            level (str): Level name; defaults to the finest level.
+
+        Returns:
+            tuple: float32 vertices (N, 3) and int32 faces (M, 3).
+        """
+        level = self._get_level(level)
+        with self._mesh_lock:
+            vertices, faces, level.build_report = self._create_mesh3d_data(level)
+            mesh_cache.save_mesh(level.cache_path, level.cache_key, vertices, faces)
+            level.mesh = (vertices, faces)
+            self._prune_mesh_cache(level)
+            return level.mesh
+
+    def _prune_mesh_cache(self, level):
+        """Deletes cached meshes of the level's shapefile whose key matches no level of this globe."""
+        keep = [other.cache_path for other in self.levels]
+        for path in mesh_cache.prune_meshes(os.path.dirname(level.cache_path), level.shapefile_path, keep):
+            print(f"DEBUG: Deleted stale mesh cache {path}")
+
+    def get_mesh(self, level=None):
+        """
+        Returns a level's continent mesh, loading it from the cache or building it on first use.
+
+        Args:
+            level (str): Level name; defaults to the finest level.
+
+        Returns:
+            tuple: float32 vertices (N, 3) and int32 faces (M, 3).
+        """
+        level = self._get_level(level)
+        with self._mesh_lock:
+            if level.mesh is None:
+                cached = mesh_cache.load_mesh(level.cache_path, level.cache_key)
+                if cached is not None:
+                    level.mesh = cached
+                else:
+                    print(f"DEBUG: Building continent mesh cache at {level.cache_path}")
+                    self.rebuild_mesh_cache(level.name)
+            return level.mesh
+
+    def select_level(self, level=None, max_vertices=None, max_bytes=None):
+        """
+        Picks the finest level of detail whose mesh fits the given budgets.
+
+        Args:
+            level (str): Explicit level name; overrides the budgets.
+            max_vertices (int): Maximum number of mesh vertices sent to the client.
+            max_bytes (int): Maximum typed-array payload of the mesh in bytes.
+
+        Returns:
+            MeshLevel: The chosen level, or the coarsest level if none fits.
+        """
+        if level is not None:
+            return self._get_level(level)
+        for candidate in reversed(self.levels):
+            vertices, _ = self.get_mesh(candidate.name)
+            if max_vertices is not None and len(vertices) > max_vertices:
+                continue
+            if max_bytes is not None and candidate.estimated_bytes(self.quantize) > max_bytes:
+                continue
+            return candidate
+        return self.levels[0]
+
+    def lod_report(self):
+        """
+        Returns the size of every level of detail, building missing meshes as needed.
+
+        Returns:
+            list: One dict per level with 'name', 'simplify_tolerance', 'vertices',
+            'triangles' and 'bytes' keys.
+        """
+        report = []
+        for level in self.levels:
+            vertices, faces = self.get_mesh(level.name)
+            report.append({
+                'name': level.name,
+                'simplify_tolerance': level.simplify_tolerance,
+                'vertices': len(vertices),
+                'triangles': len(faces),
+                'bytes': level.estimated_bytes(self.quantize),
+            })
+        return report
 
     def _geographic_to_cartesian(self, lon_deg, lat_deg, R):
         """Converts degrees (lat, lon) to Cartesian (x, y, z) for a sphere of radius R."""
-        lat_rad = np.deg2rad(lat_deg)
-        lon_rad = np.deg2rad(lon_deg)
-        
-        x = R * np.cos(lat_rad) * np.cos(lon_rad)
-        y = R * np.cos(lat_rad) * np.sin(lon_rad)
-        z = R * np.sin(lat_rad)
-        return x, y, z
-
-    def _create_mesh3d_data(self):
-        """
-        Processes GeoDataFrame polygons, projects them to 3D, and triangulates 
-        using stable local centering and triangle filtering.
-        """
-        total_x, total_y, total_z = [], [], []
-        total_i, total_j, total_k = [], [], []
-        vertex_offset = 0 
-        
-        for geom in self.world_land['geometry']:
-            
-            # Geometry extraction (simplified)
-            if geom.geom_type == 'Polygon':
-                coords = np.array(geom.exterior.coords)
-            elif geom.geom_type == 'MultiPolygon' and geom.geoms:
-                coords = np.array(geom.geoms[0].exterior.coords)
-            else:
-                continue
-                
-            lon_deg = coords[:, 0]
-            lat_deg = coords[:, 1]
+        return mesh_builder.geographic_to_cartesian(lon_deg, lat_deg, R)
 
-            # 1. Convert to 3D
-            x, y, z = self._geographic_to_cartesian(lon_deg, lat_deg, self.R_land)
+    def _typed_coords(self, values):
+        """
+        Returns coordinates as a contiguous typed array, which Plotly serializes as a
+        base64 binary array instead of a JSON list of floats.
+        """
+        if self.quantize:
+            return np.rint(np.asarray(values) * self.coord_scale).astype(np.int16)
+        return np.ascontiguousarray(values, dtype=np.float32)
 
-            # 2. Create stable local 2D coordinates for triangulation (CRITICAL FIX)
-            lon_center = np.median(lon_deg)
-            lat_center = np.median(lat_deg)
-            lon_local = lon_deg - lon_center
-            lat_local = lat_deg - lat_center
+    def _create_mesh3d_data(self, level):
+        """
+        Triangulates every polygon part (holes included) of a level's land GeoDataFrame
+        into a single mesh projected onto the land sphere.
 
-            try:
-                # Triangulate
-                tri_finder = mtri.Triangulation(lon_local, lat_local)
-                
-                # Filter (using Path to remove triangles outside the polygon)
-                polygon_path = Path(np.column_stack([lon_local, lat_local]))
-                tri_centers_lon = np.mean(lon_local[tri_finder.triangles], axis=1)
-                tri_centers_lat = np.mean(lat_local[tri_finder.triangles], axis=1)
-                is_inside = polygon_path.contains_points(np.column_stack([tri_centers_lon, tri_centers_lat]))
-                faces = tri_finder.triangles[is_inside]
-                
-                if faces.size == 0:
-                    continue
-
-                # 3. Collect Data and Adjust Indices
-                total_x.extend(x); total_y.extend(y); total_z.extend(z)
-                i, j, k = faces[:, 0], faces[:, 1], faces[:, 2]
-                
-                total_i.extend(i + vertex_offset)
-                total_j.extend(j + vertex_offset)
-                total_k.extend(k + vertex_offset)
-                
-                vertex_offset += len(x)
-
-            except Exception:
-                continue
+        Args:
+            level (MeshLevel): The level of detail to build.
 
-        return total_x, total_y, total_z, total_i, total_j, total_k
+        Returns:
+            tuple: float32 vertices (N, 3), int32 faces (M, 3) and a MeshBuildReport.
+        """
+        vertices, faces, report = mesh_builder.build_mesh(
+            self._read_world_land(level.shapefile_path)['geometry'], self.R_land,
+            workers=self.mesh_build_workers, simplify_tolerance=level.simplify_tolerance
+        )
+        print(f"DEBUG: Built continent mesh '{level.name}': {report}")
+        for feature_index, part_index, reason in report.failures:
+            print(f"DEBUG: Skipped land feature {feature_index} part {part_index}: {reason}")
+        return vertices, faces, report
 
-    def create_figure(self):
+    def _build_base_figure(self, level):
         """
-        Creates and returns the initial Plotly figure object with continents and globe outline.
+        Builds the continent and ocean traces and the layout for one level of detail.
+
+        Returns:
+            dict: {'data': [mesh, surface], 'layout': layout} as plain dicts whose
+            NumPy arrays are read-only, so the result can be shared between sessions.
         """
         # --- Prepare Continent Mesh Data ---
-        land_x, land_y, land_z, land_i, land_j, land_k = self._create_mesh3d_data()
+        vertices, faces = self.get_mesh(level.name)
+        land_x, land_y, land_z = (self._typed_coords(vertices[:, n]) for n in range(3))
+        land_i, land_j, land_k = (np.ascontiguousarray(faces[:, n], dtype=np.int32) for n in range(3))
 
         # --- Prepare Globe Surface Grid ---
         lats = np.linspace(-90, 90, 50)
         lons = np.linspace(-180, 180, 50)
         lon_grid, lat_grid = np.meshgrid(np.deg2rad(lons), np.deg2rad(lats))
-        x_sphere, y_sphere, z_sphere = self._geographic_to_cartesian(
+        x_sphere, y_sphere, z_sphere = (self._typed_coords(c) for c in self._geographic_to_cartesian(
             np.rad2deg(lon_grid), np.rad2deg(lat_grid), self.R_globe
-        )
-        
+        ))
+
         # Initialize Figure
-        self.fig = go.Figure()
+        fig = go.Figure()
 
         # Add the continents using go.Mesh3d
-        self.fig.add_trace(go.Mesh3d(
-            x=land_x, y=land_y, z=land_z, 
+        fig.add_trace(go.Mesh3d(
+            x=land_x, y=land_y, z=land_z,
             i=land_i, j=land_j, k=land_k,
-            color=self.land_color, 
-            opacity=1.0, 
+            color=self.land_color,
+            opacity=1.0,
             flatshading=True,
             name='Continents',
             showlegend=False,
             # Assigning an ID to prevent accidental removal
-            uid='globe_continents_mesh' 
+            uid='globe_continents_mesh'
         ))
 
         # Add the minimalistic globe background (Ocean / Transparent Sphere)
-        self.fig.add_trace(go.Surface(
+        fig.add_trace(go.Surface(
             x=x_sphere, y=y_sphere, z=z_sphere,
-            surfacecolor=np.zeros(z_sphere.shape),
+            surfacecolor=np.zeros(z_sphere.shape, dtype=np.uint8),
             colorscale=[[0, 'rgb(220, 220, 255)'], [1, 'rgb(220, 220, 255)']],
             showscale=False,
             opacity=0.1,
@@ -143,18 +301,9 @@ class Globe:
             name='Ocean Background',
             uid='globe_ocean_surface'
         ))
-        
-        # Add a placeholder scatter trace for custom data (will be updated later)
-        self.fig.add_trace(go.Scatter3d(
-            x=[0], y=[0], z=[0], # Single point placeholder
-            mode='markers',
-            marker=dict(size=5, color='red', opacity=0.9),
-            name='Data Points',
-            uid=self.data_trace_id, 
-        ))
 
         # Layout Customization (Minimalistic style)
-        self.fig.update_layout(
+        fig.update_layout(
             scene=dict(
                 xaxis=dict(showgrid=False, zeroline=False, visible=False),
                 yaxis=dict(showgrid=False, zeroline=False, visible=False),
@@ -166,10 +315,225 @@ class Globe:
             plot_bgcolor='rgb(28, 32, 40)',
             paper_bgcolor='rgb(28, 32, 40)',
         )
-        
+
+        base = {'data': [trace.to_plotly_json() for trace in fig.data], 'layout': fig.layout.to_plotly_json()}
+        _freeze_arrays(base)
+        return base
+
+    def base_figure(self, level=None, max_vertices=None, max_bytes=None):
+        """
+        Returns the shared continent/ocean figure for a level of detail, building it once.
+
+        Args:
+            level (str): Explicit level of detail to draw.
+            max_vertices (int): Vertex budget used to pick a level when none is given.
+            max_bytes (int): Mesh payload budget in bytes used to pick a level when none is given.
+
+        Returns:
+            tuple: The chosen MeshLevel and its frozen {'data': [...], 'layout': {...}} dict.
+            Callers must not mutate the dict; use figure_with_points() to get a figure.
+        """
+        chosen = self.select_level(level, max_vertices=max_vertices, max_bytes=max_bytes)
+        with self._mesh_lock:
+            if chosen.name not in self._base_figures:
+                self._base_figures[chosen.name] = self._build_base_figure(chosen)
+            return chosen, self._base_figures[chosen.name]
+
+    def _scatter_trace(self, lon_deg, lat_deg, marker_size, marker_color, opacity,
+                       aggregate='auto', max_markers=GLOBE_MAX_MARKERS, raw_threshold=GLOBE_RAW_POINT_THRESHOLD):
+        """
+        Returns the scatter overlay for the given points as a plain trace dict.
+
+        Above raw_threshold points (or always, with aggregate=True) the points are binned
+        into an equal-area grid and drawn as one marker per occupied cell, sized by count.
+        """
+        lon_deg = np.asarray(lon_deg, dtype=np.float64)
+        lat_deg = np.asarray(lat_deg, dtype=np.float64)
+        counts = None
+        if aggregate is True or (aggregate == 'auto' and len(lon_deg) > raw_threshold):
+            cells = aggregate_points(lon_deg, lat_deg, max_markers)
+            lon_deg, lat_deg = cells.lon_deg, cells.lat_deg
+            # Marker area grows with the count, from marker_size up to 3x marker_size.
+            scale = np.sqrt(cells.counts / cells.counts.max()) if len(cells) else cells.counts
+            marker_size = (marker_size * (1.0 + 2.0 * scale)).astype(np.float32)
+            counts = cells.counts.astype(np.int32)
+
+        x_scatter, y_scatter, z_scatter = (np.asarray(c, dtype=np.float32) for c in self._geographic_to_cartesian(
+            lon_deg, lat_deg, self.R_land * self.coord_scale
+        ))
+        trace = dict(
+            type='scatter3d',
+            x=x_scatter, y=y_scatter, z=z_scatter,
+            mode='markers',
+            marker=dict(size=marker_size, color=marker_color, opacity=opacity),
+            name='Data Points',
+            uid=self.data_trace_id,
+        )
+        if counts is not None:
+            # Counts travel as a typed array; the label is formatted in the browser.
+            trace.update(customdata=counts, hovertemplate='%{customdata:,} points<extra></extra>')
+        return trace
+
+    @staticmethod
+    def _assemble_figure(base, overlay, frames=None, layout_updates=None):
+        """
+        Combines a shared base figure with a per-session overlay trace.
+
+        The base is validated once when it is built, so the figure is assembled with
+        validation turned off; containers are copied (arrays are shared read-only) so
+        mutating the returned figure never touches the shared base.
+        """
+        layout = _copy_containers(base['layout'])
+        layout.update(layout_updates or {})
+        return go.Figure(
+            data=[_copy_containers(trace) for trace in base['data']] + [overlay],
+            layout=layout,
+            frames=frames,
+            _validate=False,
+        )
+
+    def figure_with_points(self, lon_deg, lat_deg, marker_size=5, marker_color='rgb(69, 82, 75)', opacity=0.9,
+                           level=None, max_vertices=None, max_bytes=None, aggregate='auto',
+                           max_markers=GLOBE_MAX_MARKERS, raw_threshold=GLOBE_RAW_POINT_THRESHOLD):
+        """
+        Returns a new figure made of the shared continents/ocean plus a scatter overlay.
+
+        Unlike create_figure()/update_scatter_data(), this does not touch self.fig, so
+        one Globe can serve any number of concurrent sessions.
+
+        Args:
+            lon_deg (list/array): List of longitudes (degrees).
+            lat_deg (list/array): List of latitudes (degrees).
+            marker_size (int): Size of the scatter markers.
+            marker_color (str): Color of the scatter markers.
+            opacity (float): Opacity of the scatter markers.
+            level (str): Explicit level of detail to draw.
+            max_vertices (int): Vertex budget used to pick a level when none is given.
+            max_bytes (int): Mesh payload budget in bytes used to pick a level when none is given.
+            aggregate (bool/str): True to always bin points into equal-area cells, False to
+                always draw raw points, 'auto' to bin only above raw_threshold points.
+            max_markers (int): Maximum number of markers drawn when aggregating.
+            raw_threshold (int): Largest point count drawn as raw markers in 'auto' mode.
+        """
+        _, base = self.base_figure(level, max_vertices=max_vertices, max_bytes=max_bytes)
+        overlay = self._scatter_trace(lon_deg, lat_deg, marker_size, marker_color, opacity,
+                                      aggregate=aggregate, max_markers=max_markers, raw_threshold=raw_threshold)
+        return self._assemble_figure(base, overlay)
+
+    def animated_figure(self, event_store, fields=None, year_min=0, year_max=2025, bucket_years=10,
+                        start_year=None, max_markers_per_frame=GLOBE_FRAME_MAX_MARKERS, marker_size=5,
+                        marker_color='rgb(69, 82, 75)', opacity=0.9, level=None, max_vertices=None, max_bytes=None):
+        """
+        Returns a figure whose timeline plays in the browser via Plotly animation frames.
+
+        Each frame covers bucket_years years and carries only the scatter overlay; the
+        continents and ocean come from the shared base figure and are sent once. A
+        frame's points are binned into at most max_markers_per_frame equal-area cells,
+        so the payload is bounded by the number of buckets times that cap.
+
+        Args:
+            event_store (EventStore): Source of the per-bucket points.
+            fields (list): Field names to keep; None or empty keeps every field.
+            year_min (int): First year of the timeline.
+            year_max (int): Last year of the timeline.
+            bucket_years (int): Number of years per frame (e.g. 10 for decades).
+            start_year (int): Year whose frame is shown first; defaults to year_min.
+            max_markers_per_frame (int): Upper bound on markers drawn in one frame.
+            marker_size (int): Size of the scatter markers.
+            marker_color (str): Color of the scatter markers.
+            opacity (float): Opacity of the scatter markers.
+            level (str): Explicit level of detail to draw.
+            max_vertices (int): Vertex budget used to pick a level when none is given.
+            max_bytes (int): Mesh payload budget in bytes used to pick a level when none is given.
+        """
+        _, base = self.base_figure(level, max_vertices=max_vertices, max_bytes=max_bytes)
+        overlay_index = len(base['data'])
+
+        # Frames depend only on the events, the query and the marker style, so they are built once and shared.
+        key = (event_store.version, tuple(fields or ()), year_min, year_max, bucket_years, max_markers_per_frame,
+               marker_size, marker_color, opacity, overlay_index)
+        with self._mesh_lock:
+            cached = self._timeline_frames.get(key)
+            if cached is not None:
+                self._timeline_frames.move_to_end(key)
+        if cached is None:
+            cached = self._build_timeline_frames(event_store, fields, year_min, year_max, bucket_years,
+                                                 max_markers_per_frame, marker_size, marker_color, opacity,
+                                                 overlay_index)
+            with self._mesh_lock:
+                self._timeline_frames[key] = cached
+                while len(self._timeline_frames) > TIMELINE_FRAME_CACHE_SIZE:
+                    self._timeline_frames.popitem(last=False)
+        frames, steps = cached
+
+        start_year = year_min if start_year is None else start_year
+        active = min(max((start_year - year_min) // bucket_years, 0), len(frames) - 1)
+        font = dict(color='rgb(240, 239, 227)')
+        layout_updates = dict(
+            uirevision='globe', # Keep the user's camera while frames play.
+            sliders=[dict(active=active, steps=steps, pad=dict(t=10), font=font,
+                          currentvalue=dict(prefix='Timeline: ', font=font))],
+            updatemenus=[dict(
+                type='buttons', direction='left', x=0, y=0, xanchor='left', yanchor='top', showactive=False,
+                pad=dict(t=50), font=dict(color='rgb(28, 32, 40)'),
+                buttons=[
+                    dict(label='Play', method='animate',
+                         args=[None, dict(frame=dict(duration=300, redraw=True), fromcurrent=True,
+                                          transition=dict(duration=0))]),
+                    dict(label='Pause', method='animate',
+                         args=[[None], dict(mode='immediate', frame=dict(duration=0, redraw=False))]),
+                ],
+            )],
+        )
+        return self._assemble_figure(base, _copy_containers(frames[active]['data'][0]),
+                                     frames=_copy_containers(frames), layout_updates=_copy_containers(layout_updates))
+
+    def _build_timeline_frames(self, event_store, fields, year_min, year_max, bucket_years, max_markers_per_frame,
+                               marker_size, marker_color, opacity, overlay_index):
+        """Builds the animation frames and matching slider steps for animated_figure()."""
+        frames, steps = [], []
+        for bucket_start in range(year_min, year_max + 1, bucket_years):
+            bucket_end = min(bucket_start + bucket_years - 1, year_max)
+            events = event_store.query(bucket_start, bucket_end, fields=fields)
+            overlay = self._scatter_trace(events.lon, events.lat, marker_size, marker_color, opacity,
+                                          max_markers=max_markers_per_frame, raw_threshold=max_markers_per_frame)
+            name = str(bucket_start)
+            frames.append(dict(name=name, data=[overlay], traces=[overlay_index]))
+            steps.append(dict(
+                method='animate',
+                label=name if bucket_years == 1 else f'{bucket_start}s',
+                args=[[name], dict(mode='immediate', frame=dict(duration=0, redraw=True), transition=dict(duration=0))],
+            ))
+        _freeze_arrays(frames)
+        return frames, steps
+
+    def create_figure(self, level=None, max_vertices=None, max_bytes=None):
+        """
+        Creates and returns the initial Plotly figure object with continents and globe outline.
+
+        Args:
+            level (str): Explicit level of detail to draw.
+            max_vertices (int): Vertex budget used to pick a level when none is given.
+            max_bytes (int): Mesh payload budget in bytes used to pick a level when none is given.
+        """
+        self.level, base = self.base_figure(level, max_vertices=max_vertices, max_bytes=max_bytes)
+
+        # Add a placeholder scatter trace for custom data (will be updated later)
+        placeholder = dict(
+            type='scatter3d',
+            x=[0], y=[0], z=[0], # Single point placeholder
+            mode='markers',
+            marker=dict(size=5, color='red', opacity=0.9),
+            name='Data Points',
+            uid=self.data_trace_id,
+        )
+        self.fig = self._assemble_figure(base, placeholder)
+        self._data_trace_index = len(base['data'])
+
         return self.fig
 
-    def update_scatter_data(self, lon_deg, lat_deg, marker_size=5, marker_color='rgb(69, 82, 75)', opacity=0.9):
+    def update_scatter_data(self, lon_deg, lat_deg, marker_size=5, marker_color='rgb(69, 82, 75)', opacity=0.9,
+                            aggregate='auto', max_markers=GLOBE_MAX_MARKERS, raw_threshold=GLOBE_RAW_POINT_THRESHOLD):
         """
         Updates the scatter data points on the globe.
 
@@ -179,29 +543,42 @@ class Globe:
             marker_size (int): Size of the scatter markers.
             marker_color (str): Color of the scatter markers.
             opacity (float): Opacity of the scatter markers.
+            aggregate (bool/str): True to always bin points into equal-area cells, False to
+                always draw raw points, 'auto' to bin only above raw_threshold points.
+            max_markers (int): Maximum number of markers drawn when aggregating.
+            raw_threshold (int): Largest point count drawn as raw markers in 'auto' mode.
         """
         if self.fig is None:
             raise RuntimeError("Figure must be created first. Call create_figure().")
 
-        # Convert the new geographic data to Cartesian coordinates
-        x_scatter, y_scatter, z_scatter = self._geographic_to_cartesian(
-            lon_deg, lat_deg, self.R_land
-        )
-        
-        # Find the index of the scatter data trace using its UID
-        trace_index = next((i for i, trace in enumerate(self.fig.data) if trace.uid == self.data_trace_id), None)
-
-        if trace_index is not None:
-            # Use the data dictionary to update the existing trace
-            self.fig.data[trace_index].update(
-                x=x_scatter,
-                y=y_scatter,
-                z=z_scatter,
-                marker=dict(
-                    size=marker_size,
-                    color=marker_color,
-                    opacity=opacity
-                )
-            )
-        else:
-             print("Error: Scatter data placeholder trace not found.")
\ No newline at end of file
+        overlay = self._scatter_trace(lon_deg, lat_deg, marker_size, marker_color, opacity,
+                                      aggregate=aggregate, max_markers=max_markers, raw_threshold=raw_threshold)
+
+        # The overlay's position is recorded by create_figure(), so no scan over fig.data is needed.
+        trace = self.fig.data[self._data_trace_index]
+        if trace.uid != self.data_trace_id:
+            print("Error: Scatter data placeholder trace not found.")
+            return
+        trace.update(x=overlay['x'], y=overlay['y'], z=overlay['z'], marker=overlay['marker'],
+                     customdata=overlay.get('customdata'), hovertemplate=overlay.get('hovertemplate'))
+
+
+def _freeze_arrays(obj):
+    """Marks every NumPy array nested in dicts/lists as read-only."""
+    if isinstance(obj, np.ndarray):
+        obj.flags.writeable = False
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            _freeze_arrays(value)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            _freeze_arrays(value)
+
+
+def _copy_containers(obj):
+    """Copies nested dicts/lists while sharing the (read-only) arrays and scalars they hold."""
+    if isinstance(obj, dict):
+        return {key: _copy_containers(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_copy_containers(value) for value in obj]
+    return obj
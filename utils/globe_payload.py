@@ -0,0 +1,15 @@
+"""
+JSON export of Globe figures, as Streamlit sends them to the browser.
+
+Globe traces hold contiguous float32/int16/int32 NumPy arrays, which Plotly
+serializes as base64 typed arrays ({"dtype": "f4", "bdata": ...}) rather than
+lists of decimal floats. st.plotly_chart serializes the figure it is given on
+every rerun and takes no pre-encoded JSON, so the payload is kept small
+rather than cached: see benchmarks/globe_payload.py.
+"""
+import plotly.io as pio
+
+
+def figure_to_json(fig) -> str:
+    """Serializes a figure the same way Streamlit does before sending it to the browser."""
+    return pio.to_json(fig, validate=False)
@@ -0,0 +1,52 @@
+import hashlib
+
+
+def content_hash(*parts) -> str:
+    """
+    Returns a stable SHA-256 hex digest for the given parts.
+
+    Args:
+        *parts: Strings or bytes to hash. Each part is length-prefixed so that
+            ('ab', 'c') and ('a', 'bc') produce different digests.
+
+    Returns:
+        The hex digest of the combined parts.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(len(part).to_bytes(8, 'little'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Returns the SHA-256 hex digest of a file's contents, read in chunks.
+
+    Args:
+        path: Path of the file to hash.
+        chunk_size: Number of bytes read per iteration.
+
+    Returns:
+        The hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Returns a rough token count for text sent to the model (about 4 characters per token).
+
+    Args:
+        text: The text to estimate.
+
+    Returns:
+        The estimated number of tokens.
+    """
+    return (len(text) + 3) // 4
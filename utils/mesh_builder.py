@@ -0,0 +1,205 @@
+"""
+Vectorized, optionally parallel triangulation of land polygons into a single Mesh3d.
+
+Every part of a MultiPolygon is triangulated, and interior rings (lakes, inland
+seas) are cut out of the fill. Polygons can be spread across a process pool; the
+results are written into preallocated NumPy arrays at offsets computed with a
+prefix sum, so no per-vertex Python lists are ever built.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import matplotlib.tri as mtri
+from matplotlib.path import Path
+
+# Below this many polygons a process pool costs more than it saves.
+_MIN_POLYGONS_FOR_POOL = 256
+
+
+class MeshBuildReport:
+    """Summary of a mesh build, including every polygon that could not be triangulated."""
+
+    def __init__(self):
+        self.polygons = 0
+        self.vertices = 0
+        self.faces = 0
+        self.seconds = 0.0
+        self.failures = [] # (feature_index, part_index, reason)
+
+    def __repr__(self):
+        return (f"MeshBuildReport(polygons={self.polygons}, vertices={self.vertices}, "
+                f"faces={self.faces}, failures={len(self.failures)}, seconds={self.seconds:.2f})")
+
+
+def geographic_to_cartesian(lon_deg, lat_deg, R):
+    """Converts degrees (lat, lon) to Cartesian (x, y, z) for a sphere of radius R."""
+    lat_rad = np.deg2rad(lat_deg)
+    lon_rad = np.deg2rad(lon_deg)
+
+    x = R * np.cos(lat_rad) * np.cos(lon_rad)
+    y = R * np.cos(lat_rad) * np.sin(lon_rad)
+    z = R * np.sin(lat_rad)
+    return x, y, z
+
+
+def _open_ring(coords):
+    """Returns ring coordinates as an (n, 2) float array without the closing point."""
+    ring = np.asarray(coords, dtype=np.float64)[:, :2]
+    if len(ring) > 1 and np.array_equal(ring[0], ring[-1]):
+        ring = ring[:-1]
+    return ring
+
+
+def extract_polygons(geometries):
+    """
+    Flattens geometries into polygon parts ready for triangulation.
+
+    Args:
+        geometries (iterable): Shapely geometries (e.g. a GeoDataFrame's geometry column).
+
+    Returns:
+        tuple: A list of (feature_index, part_index, exterior, holes) entries, where
+        exterior is an (n, 2) lon/lat array and holes is a list of such arrays, and
+        a list of (feature_index, part_index, reason) for skipped geometries.
+    """
+    polygons, skipped = [], []
+    for feature_index, geom in enumerate(geometries):
+        if geom is None or geom.is_empty:
+            skipped.append((feature_index, None, 'empty geometry'))
+            continue
+        if geom.geom_type == 'Polygon':
+            parts = [geom]
+        elif geom.geom_type in ('MultiPolygon', 'GeometryCollection'):
+            parts = list(geom.geoms)
+        else:
+            skipped.append((feature_index, None, f'unsupported geometry type {geom.geom_type}'))
+            continue
+
+        for part_index, part in enumerate(parts):
+            if part.geom_type != 'Polygon' or part.is_empty:
+                skipped.append((feature_index, part_index, f'unsupported part type {part.geom_type}'))
+                continue
+            holes = [_open_ring(ring.coords) for ring in part.interiors]
+            polygons.append((feature_index, part_index, _open_ring(part.exterior.coords), holes))
+    return polygons, skipped
+
+
+def triangulate_polygon(exterior, holes=()):
+    """
+    Triangulates one polygon in local lon/lat coordinates.
+
+    A Delaunay triangulation of all ring vertices is filtered down to the triangles
+    whose centroids lie inside the exterior ring and outside every hole.
+
+    Args:
+        exterior (np.ndarray): (n, 2) lon/lat exterior ring, not closed.
+        holes (list): (k, 2) lon/lat interior rings, not closed.
+
+    Returns:
+        tuple: (points, faces) as an (n, 2) float64 lon/lat array and an (m, 3) int32
+        array of indices into points.
+
+    Raises:
+        ValueError: If the ring is degenerate or produces no triangles.
+    """
+    if len(exterior) < 3:
+        raise ValueError(f'exterior ring has only {len(exterior)} vertices')
+    points = np.vstack([exterior, *holes]) if holes else exterior
+
+    # Stable local 2D coordinates for triangulation.
+    center = np.median(exterior, axis=0)
+    local = points - center
+
+    triangles = mtri.Triangulation(local[:, 0], local[:, 1]).triangles
+    centroids = local[triangles].mean(axis=1)
+    inside = Path(exterior - center).contains_points(centroids)
+    for hole in holes:
+        if len(hole) >= 3:
+            inside &= ~Path(hole - center).contains_points(centroids)
+
+    faces = triangles[inside]
+    if faces.size == 0:
+        raise ValueError('no triangles inside the polygon')
+    return points, faces.astype(np.int32, copy=False)
+
+
+def _triangulate_batch(batch):
+    """Process-pool worker: triangulates a batch of polygons, capturing errors per polygon."""
+    results = []
+    for exterior, holes in batch:
+        try:
+            results.append(triangulate_polygon(exterior, holes))
+        except Exception as e: # Qhull and Path raise a variety of types; report them all.
+            results.append(f'{type(e).__name__}: {e}')
+    return results
+
+
+def _batched(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def build_mesh(geometries, radius, workers=None, batch_size=64, simplify_tolerance=0.0):
+    """
+    Builds a single continent mesh from shapely geometries.
+
+    Args:
+        geometries (iterable): Shapely Polygon/MultiPolygon geometries.
+        radius (float): Radius the vertices are projected onto.
+        workers (int): Process pool size. None uses os.cpu_count(); 1 builds serially.
+        batch_size (int): Number of polygons sent to a worker per task.
+        simplify_tolerance (float): Douglas-Peucker tolerance in degrees applied before
+            triangulation (topology preserving); 0 keeps the source resolution.
+
+    Returns:
+        tuple: float32 vertices (N, 3), int32 faces (M, 3) and a MeshBuildReport.
+    """
+    start = time.perf_counter()
+    report = MeshBuildReport()
+
+    if simplify_tolerance:
+        import shapely # Only needed for simplified levels of detail.
+        geometries = shapely.simplify(np.asarray(list(geometries), dtype=object), simplify_tolerance,
+                                      preserve_topology=True)
+
+    polygons, skipped = extract_polygons(geometries)
+    report.failures.extend(skipped)
+    report.polygons = len(polygons)
+    tasks = [(exterior, holes) for _, _, exterior, holes in polygons]
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(tasks) >= _MIN_POLYGONS_FOR_POOL:
+        # Spawned, not forked: forking the multithreaded Streamlit process can copy locks held by other threads.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            results = [r for batch in executor.map(_triangulate_batch, _batched(tasks, batch_size)) for r in batch]
+    else:
+        results = _triangulate_batch(tasks)
+
+    triangulated = []
+    for (feature_index, part_index, _, _), result in zip(polygons, results):
+        if isinstance(result, str):
+            report.failures.append((feature_index, part_index, result))
+        else:
+            triangulated.append(result)
+
+    # Prefix sums give each polygon its slice of the preallocated output arrays.
+    vertex_counts = np.array([len(points) for points, _ in triangulated], dtype=np.int64)
+    face_counts = np.array([len(faces) for _, faces in triangulated], dtype=np.int64)
+    vertex_offsets = np.concatenate([[0], np.cumsum(vertex_counts)])
+    face_offsets = np.concatenate([[0], np.cumsum(face_counts)])
+
+    lonlat = np.empty((vertex_offsets[-1], 2), dtype=np.float64)
+    faces_out = np.empty((face_offsets[-1], 3), dtype=np.int32)
+    for n, (points, faces) in enumerate(triangulated):
+        lonlat[vertex_offsets[n]:vertex_offsets[n + 1]] = points
+        np.add(faces, vertex_offsets[n], out=faces_out[face_offsets[n]:face_offsets[n + 1]], casting='unsafe')
+
+    vertices = np.empty((len(lonlat), 3), dtype=np.float32)
+    vertices[:, 0], vertices[:, 1], vertices[:, 2] = geographic_to_cartesian(lonlat[:, 0], lonlat[:, 1], radius)
+
+    report.vertices = len(vertices)
+    report.faces = len(faces_out)
+    report.seconds = time.perf_counter() - start
+    return vertices, faces_out, report
@@ -0,0 +1,214 @@
+"""
+On-disk cache for the triangulated continent mesh drawn by utils.globe.Globe.
+
+The mesh is stored as an uncompressed .npz holding float32 vertices (N, 3) and
+int32 faces (M, 3). Loading it only needs NumPy, so geopandas is imported only
+when the cache is missing or stale.
+
+Rebuilding a level deletes the meshes of its shapefile that no current level
+uses, so files left behind by old keys don't pile up in the cache directory.
+
+Build or check the cache from the command line:
+
+    python -m utils.mesh_cache            # build every level of detail if missing or stale
+    python -m utils.mesh_cache --check    # exit code 1 if any level is stale
+    python -m utils.mesh_cache --force    # always rebuild
+    python -m utils.mesh_cache --report   # vertex, triangle and byte count per level
+"""
+import json
+import os
+import re
+
+import numpy as np
+
+from utils.helpers import content_hash, file_hash
+
+# Bump whenever the stored layout or the triangulation code changes in a way
+# that invalidates previously written meshes.
+MESH_FORMAT_VERSION = 1
+
+# Sidecar files that make up a shapefile dataset; all that exist are hashed.
+_SHAPEFILE_PARTS = ('.shp', '.shx', '.dbf', '.prj', '.cpg')
+
+# (path, size, mtime) -> digest, so repeated Globe instances don't re-hash the files.
+_digest_memo = {}
+
+
+def shapefile_digest(shapefile_path: str) -> str:
+    """
+    Returns a digest of the shapefile and its sidecar files.
+
+    Args:
+        shapefile_path: Path to the .shp file.
+
+    Returns:
+        A hex digest covering the contents of every existing sidecar file.
+    """
+    base, _ = os.path.splitext(shapefile_path)
+    parts = []
+    for ext in _SHAPEFILE_PARTS:
+        path = base + ext
+        if not os.path.exists(path):
+            continue
+        stat = os.stat(path)
+        memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if memo_key not in _digest_memo:
+            _digest_memo[memo_key] = file_hash(path)
+        parts.extend([ext, _digest_memo[memo_key]])
+
+    if not parts:
+        raise FileNotFoundError(f"Shapefile not found: {shapefile_path}")
+    return content_hash(*parts)
+
+
+def mesh_cache_key(shapefile_path: str, globe_radius: float, settings: dict) -> str:
+    """
+    Builds the cache key for a mesh.
+
+    Args:
+        shapefile_path: Path to the source shapefile.
+        globe_radius: Radius the mesh vertices were projected onto.
+        settings: Triangulation settings that affect the output geometry.
+
+    Returns:
+        A hex digest identifying the mesh.
+    """
+    return content_hash(
+        str(MESH_FORMAT_VERSION),
+        shapefile_digest(shapefile_path),
+        repr(float(globe_radius)),
+        json.dumps(settings, sort_keys=True),
+    )
+
+
+def mesh_cache_path(cache_dir: str, shapefile_path: str, key: str) -> str:
+    """Returns the path of the cached mesh file for the given key."""
+    name = os.path.splitext(os.path.basename(shapefile_path))[0]
+    return os.path.join(cache_dir, f"{name}_{key[:16]}.npz")
+
+
+def load_mesh(path: str, key: str):
+    """
+    Loads a cached mesh if it exists and matches the key.
+
+    Args:
+        path: Path of the cached .npz file.
+        key: Expected cache key.
+
+    Returns:
+        A (vertices, faces) tuple of float32 (N, 3) and int32 (M, 3) arrays, or
+        None if the file is missing, unreadable or stale.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if str(data['key']) != key:
+                return None
+            return data['vertices'], data['faces']
+    except (OSError, KeyError, ValueError) as e:
+        print(f"DEBUG: Ignoring unreadable mesh cache {path}: {e}")
+        return None
+
+
+def save_mesh(path: str, key: str, vertices, faces):
+    """
+    Atomically writes a mesh to the cache.
+
+    Args:
+        path: Destination .npz path.
+        key: Cache key stored alongside the arrays.
+        vertices: Array-like of shape (N, 3).
+        faces: Array-like of shape (M, 3).
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(
+            f,
+            key=np.array(key),
+            vertices=np.ascontiguousarray(vertices, dtype=np.float32),
+            faces=np.ascontiguousarray(faces, dtype=np.int32),
+        )
+    os.replace(tmp_path, path)
+
+
+def prune_meshes(cache_dir: str, shapefile_path: str, keep_paths) -> list:
+    """
+    Deletes the cached meshes of a shapefile that are not in keep_paths, e.g. those built for old keys.
+
+    Args:
+        cache_dir: Directory holding the cached meshes.
+        shapefile_path: Source shapefile whose meshes are considered.
+        keep_paths: Paths of the meshes still in use.
+
+    Returns:
+        The paths of the deleted files.
+    """
+    if not os.path.isdir(cache_dir):
+        return []
+    name = os.path.splitext(os.path.basename(shapefile_path))[0]
+    pattern = re.compile(rf"{re.escape(name)}_[0-9a-f]{{16}}\.npz")
+    keep = {os.path.abspath(path) for path in keep_paths}
+    removed = []
+    for entry in sorted(os.listdir(cache_dir)):
+        path = os.path.join(cache_dir, entry)
+        if pattern.fullmatch(entry) and os.path.abspath(path) not in keep:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"DEBUG: Could not delete stale mesh cache {path}: {e}")
+                continue
+            removed.append(path)
+    return removed
+
+
+def is_stale(path: str, key: str) -> bool:
+    """Returns True if the cached mesh at `path` is missing or was built for a different key."""
+    if not os.path.exists(path):
+        return True
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            return str(data['key']) != key
+    except (OSError, KeyError, ValueError):
+        return True
+
+
+def main(argv=None):
+    import argparse
+
+    from config.settings import GLOBE_LOD_LEVELS
+    from utils.globe import Globe
+
+    parser = argparse.ArgumentParser(description="Build or check the cached continent meshes.")
+    parser.add_argument('--radius', type=float, default=1.0)
+    parser.add_argument('--check', action='store_true', help="Only report whether the caches are stale.")
+    parser.add_argument('--force', action='store_true', help="Rebuild even if the caches are current.")
+    parser.add_argument('--report', action='store_true', help="Print the size of every level of detail.")
+    args = parser.parse_args(argv)
+
+    globe = Globe(globe_radius=args.radius, lod_levels=GLOBE_LOD_LEVELS)
+    any_stale = False
+    for level in globe.levels:
+        stale = globe.mesh_cache_is_stale(level.name)
+        any_stale = any_stale or stale
+        if args.check:
+            print(f"{level.name}: {level.cache_path}: {'stale' if stale else 'up to date'}")
+        elif stale or args.force:
+            vertices, faces = globe.rebuild_mesh_cache(level.name)
+            print(f"{level.name}: wrote {level.cache_path}: {len(vertices)} vertices, {len(faces)} faces")
+        else:
+            print(f"{level.name}: {level.cache_path} is up to date")
+    if args.check:
+        return 1 if any_stale else 0
+
+    if args.report:
+        print(f"{'level':<10}{'tolerance':>10}{'vertices':>12}{'triangles':>12}{'bytes':>12}")
+        for row in globe.lod_report():
+            print(f"{row['name']:<10}{row['simplify_tolerance']:>10g}{row['vertices']:>12}"
+                  f"{row['triangles']:>12}{row['bytes']:>12}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
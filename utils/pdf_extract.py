@@ -0,0 +1,170 @@
+"""
+Parallel, streaming PDF text extraction with a per-page disk cache.
+
+Pages are extracted by a process pool in small page ranges and yielded as soon
+as each range finishes, so the UI can show text before the whole document is
+done. Every extracted page is cached on disk by the SHA-256 of the PDF bytes
+and the page number; re-uploading the same file (or rerunning the script)
+reads the cache and never opens the PDF again.
+"""
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pypdf import PdfReader
+
+from config.settings import PDF_CACHE_DIR, PDF_EXTRACT_WORKERS
+from utils.helpers import content_hash
+
+# Documents with fewer pages are extracted in-process; a pool would only add start-up cost.
+_MIN_PAGES_FOR_POOL = 16
+
+# Worker-process reader of the PDF, parsed once per worker by _init_worker.
+_worker_reader = None
+
+
+def pdf_digest(data: bytes) -> str:
+    """Returns the content hash used to key a PDF's cached pages."""
+    return content_hash(data)
+
+
+class PageCache:
+    """Extracted page texts of one PDF, stored as <cache_dir>/<digest>/<page>.txt."""
+
+    def __init__(self, digest, cache_dir=PDF_CACHE_DIR):
+        self.digest = digest
+        self.path = os.path.join(cache_dir, digest)
+
+    def _page_path(self, page_number):
+        return os.path.join(self.path, f"{page_number:05d}.txt")
+
+    def page_count(self):
+        """Returns the cached page count, or None if this PDF has never been opened."""
+        try:
+            with open(os.path.join(self.path, 'meta.json'), encoding='utf-8') as f:
+                return json.load(f)['pages']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def set_page_count(self, pages):
+        self._write(os.path.join(self.path, 'meta.json'), json.dumps({'pages': pages}))
+
+    def get(self, page_number):
+        """Returns a cached page's text, or None if it has not been extracted yet."""
+        try:
+            with open(self._page_path(page_number), encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, page_number, text):
+        self._write(self._page_path(page_number), text)
+
+    def _write(self, path, text):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+def count_pages(data: bytes, cache_dir=PDF_CACHE_DIR) -> int:
+    """
+    Returns the number of pages of a PDF, opening it only the first time it is seen.
+
+    Args:
+        data (bytes): Contents of the PDF file.
+        cache_dir (str): Root directory of the page cache.
+
+    Returns:
+        int: The page count.
+    """
+    cache = PageCache(pdf_digest(data), cache_dir)
+    total = cache.page_count()
+    if total is None:
+        total = len(PdfReader(io.BytesIO(data)).pages)
+        cache.set_page_count(total)
+    return total
+
+
+def _init_worker(data):
+    global _worker_reader
+    _worker_reader = PdfReader(io.BytesIO(data))
+
+
+def _extract_range(page_numbers, reader=None):
+    """Extracts the text of the given pages; runs in a worker process or in-process with the given reader."""
+    reader = reader or _worker_reader
+    return [(n, reader.pages[n].extract_text() or '') for n in page_numbers]
+
+
+def _ranges(page_numbers, size):
+    return [page_numbers[i:i + size] for i in range(0, len(page_numbers), size)]
+
+
+def iter_pages(data: bytes, workers=PDF_EXTRACT_WORKERS, pages_per_task=8, cache_dir=PDF_CACHE_DIR):
+    """
+    Yields (page_number, text) pairs as pages become available, in completion order.
+
+    Cached pages are yielded first; the remaining pages are extracted by a process
+    pool (or in-process for short documents) and cached as they finish.
+
+    Args:
+        data (bytes): Contents of the PDF file.
+        workers (int): Process pool size. None uses os.cpu_count(); 1 extracts in-process.
+        pages_per_task (int): Number of consecutive pages extracted per pool task.
+        cache_dir (str): Root directory of the page cache.
+
+    Yields:
+        tuple: The zero-based page number and its extracted text.
+    """
+    cache = PageCache(pdf_digest(data), cache_dir)
+    total = count_pages(data, cache_dir)
+
+    missing = []
+    for n in range(total):
+        text = cache.get(n)
+        if text is None:
+            missing.append(n)
+        else:
+            yield n, text
+    if not missing:
+        return
+
+    print(f"DEBUG: Extracting {len(missing)} of {total} pages from PDF {cache.digest[:12]}")
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(missing) < _MIN_PAGES_FOR_POOL:
+        reader = PdfReader(io.BytesIO(data))
+        for page_range in _ranges(missing, pages_per_task):
+            for n, text in _extract_range(page_range, reader):
+                cache.put(n, text)
+                yield n, text
+        return
+
+    # Spawned, not forked: forking the multithreaded Streamlit process can copy locks held by other threads.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(data,)) as executor:
+        futures = [executor.submit(_extract_range, page_range) for page_range in _ranges(missing, pages_per_task)]
+        for future in as_completed(futures):
+            for n, text in future.result():
+                cache.put(n, text)
+                yield n, text
+
+
+def extract_pages(data: bytes, **kwargs):
+    """
+    Returns the text of every page, in page order.
+
+    Args:
+        data (bytes): Contents of the PDF file.
+        **kwargs: Passed through to iter_pages().
+
+    Returns:
+        list: One string per page.
+    """
+    pages = {}
+    for n, text in iter_pages(data, **kwargs):
+        pages[n] = text
+    return [pages[n] for n in range(len(pages))]
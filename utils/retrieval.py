@@ -0,0 +1,182 @@
+"""
+Local BM25 retrieval over the pages of an uploaded document.
+
+Questions about a document don't need the whole document in the prompt: the
+text is split into passages of at most RETRIEVAL_PASSAGE_TOKENS within each
+page (see utils/chunking.py), indexed with BM25, and only the top-k passages
+are sent with a question. The index is a term-sorted postings list in NumPy
+arrays (CSR layout: term -> passage IDs and term frequencies), so a query
+touches only the postings of its own terms. Everything runs in-process.
+
+Indexes are built on the first question about a document, not on upload,
+and cached per document hash (the stored document's digest when given a
+DocumentHandle, so a cache hit reads no pages). Passage tokenization is cached per
+passage hash, so re-indexing an edited or re-uploaded document only
+tokenizes the passages that changed; building the arrays from cached term
+counts is cheap.
+"""
+import re
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from config.settings import RETRIEVAL_CACHE_DOCUMENTS, RETRIEVAL_PASSAGE_TOKENS, RETRIEVAL_TOP_K
+from utils.chunking import chunk_text
+from utils.doc_store import DocumentHandle
+from utils.helpers import content_hash, estimate_tokens
+
+_TERM = re.compile(r'\w+')
+_TERM_CACHE_SIZE = 50_000 # Passages whose term counts are kept for incremental re-indexing.
+
+_term_cache = OrderedDict() # Passage hash -> Counter of terms.
+_index_cache = OrderedDict() # Document hash -> BM25Index.
+_cache_lock = threading.Lock()
+
+
+def tokenize(text):
+    """Returns the lowercase word terms of a text (words of one character are skipped)."""
+    return [term for term in _TERM.findall(text.lower()) if len(term) > 1]
+
+
+def _term_counts(passage):
+    key = content_hash(passage)
+    with _cache_lock:
+        counts = _term_cache.get(key)
+        if counts is not None:
+            _term_cache.move_to_end(key)
+            return counts
+    counts = Counter(tokenize(passage))
+    with _cache_lock:
+        _term_cache[key] = counts
+        while len(_term_cache) > _TERM_CACHE_SIZE:
+            _term_cache.popitem(last=False)
+    return counts
+
+
+def split_passages(pages, max_tokens=RETRIEVAL_PASSAGE_TOKENS):
+    """
+    Splits page texts into passages on paragraph (or sentence) boundaries, never across pages.
+
+    Args:
+        pages (list): Text of each page, in order.
+        max_tokens (int): Maximum estimated tokens per passage.
+
+    Returns:
+        list: (page index, passage text) tuples, in document order.
+    """
+    passages = []
+    for page_index, page in enumerate(pages):
+        for chunk in chunk_text(page, max_tokens):
+            text = ' '.join(chunk.split())
+            if text:
+                passages.append((page_index, text))
+    return passages
+
+
+class BM25Index:
+    """An Okapi BM25 index over a fixed list of passages."""
+
+    def __init__(self, passages, k1=1.5, b=0.75):
+        """
+        Args:
+            passages (list): (page index, text) tuples, e.g. from split_passages().
+            k1 (float): Term frequency saturation.
+            b (float): Passage length normalization.
+        """
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        counts = [_term_counts(text) for _, text in passages]
+        self.vocabulary = {term: i for i, term in enumerate(sorted({term for c in counts for term in c}))}
+
+        term_ids, passage_ids, frequencies = [], [], []
+        for passage_id, c in enumerate(counts):
+            term_ids.extend(self.vocabulary[term] for term in c)
+            passage_ids.extend([passage_id] * len(c))
+            frequencies.extend(c.values())
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+        order = np.argsort(term_ids, kind='stable')
+        self.passage_ids = np.asarray(passage_ids, dtype=np.int32)[order]
+        self.frequencies = np.asarray(frequencies, dtype=np.float32)[order]
+        self.indptr = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(self.vocabulary)), out=self.indptr[1:])
+
+        self.lengths = np.asarray([sum(c.values()) for c in counts], dtype=np.float32)
+        average = self.lengths.mean() if len(passages) else 1.0
+        self._length_norm = k1 * (1 - b + b * self.lengths / max(average, 1.0))
+        document_frequency = np.diff(self.indptr).astype(np.float32)
+        self.idf = np.log1p((len(passages) - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def search(self, query, k=RETRIEVAL_TOP_K):
+        """
+        Returns the passages that best match a query.
+
+        Args:
+            query (str): The question or search terms.
+            k (int): Maximum number of passages returned.
+
+        Returns:
+            list: (score, page index, passage text) tuples, best first; passages with no query term are left out.
+        """
+        scores = np.zeros(len(self.passages), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            ids, tf = self.passage_ids[start:end], self.frequencies[start:end]
+            scores[ids] += self.idf[term_id] * tf * (self.k1 + 1) / (tf + self._length_norm[ids])
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), *self.passages[i]) for i in top]
+
+
+def get_document_index(pages, passage_tokens=RETRIEVAL_PASSAGE_TOKENS):
+    """
+    Returns the BM25 index of a document, building it on first use and caching it by document hash.
+
+    Args:
+        pages (list or DocumentHandle): Text of each page, in order, or a handle to the stored pages.
+        passage_tokens (int): Maximum estimated tokens per passage.
+
+    Returns:
+        BM25Index: The document's index.
+    """
+    if isinstance(pages, DocumentHandle):
+        key = content_hash(str(passage_tokens), pages.digest)
+    else:
+        key = content_hash(str(passage_tokens), *pages)
+    with _cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+    if isinstance(pages, DocumentHandle):
+        pages = pages.pages()
+    index = BM25Index(split_passages(pages, passage_tokens))
+    print(f"DEBUG: Built retrieval index of {len(index.passages)} passages and {len(index.vocabulary)} terms")
+    with _cache_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > RETRIEVAL_CACHE_DOCUMENTS:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def format_passages(hits):
+    """
+    Formats search results as prompt context, in document order with their page numbers.
+
+    Args:
+        hits (list): (score, page index, text) tuples from BM25Index.search().
+
+    Returns:
+        str: One '[Page n] text' block per passage, separated by blank lines.
+    """
+    ordered = sorted(hits, key=lambda hit: hit[1])
+    context = '\n\n'.join(f'[Page {page + 1}] {text}' for _, page, text in ordered)
+    print(f"DEBUG: Retrieved {len(hits)} passages ({estimate_tokens(context)} tokens)")
+    return context
@@ -5,11 +5,21 @@ def init_session_state():
     defaults = {
         'file_name': None,
         'file_text': None,
+        'file_pages': None,
+        'normalization': None,
         'summary': None,
         'translation': None,
+        'summary_timings': {},
+        'summary_truncated': False,
+        'jobs': {},
+        'download_ready': None,
+        'prefetch_job': None,
         'lang': 'English',
         'status': 'Awaiting Upload',
-        'viewing': None
+        'viewing': None,
+        'year': 0,
+        'fields': [],
+        'animate_timeline': False
     }
     for key, value in defaults.items():
         if key not in st.session_state:
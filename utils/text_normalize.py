@@ -0,0 +1,185 @@
+"""
+Token-reducing normalization of extracted PDF text.
+
+Runs between PDF extraction and the agents: removes running headers, footers
+and page numbers repeated across pages, re-joins words hyphenated at line
+breaks, rebuilds paragraphs from the page layout (blank lines and short
+closing lines) and collapses whitespace. The report tells how many characters
+and estimated tokens were saved.
+"""
+import re
+from collections import Counter
+
+from utils.helpers import estimate_tokens
+
+# Number of lines at the top and bottom of each page searched for headers, footers and page numbers.
+EDGE_LINES = 3
+# Longer edge lines are treated as body text, never as a running header or footer.
+MAX_HEADER_CHARS = 80
+
+_WHITESPACE = re.compile(r'[ \t\u00a0\u2000-\u200b\u3000]+')
+_DIGITS = re.compile(r'\d+')
+# A line holding nothing but a page number: '12', '- 12 -', 'Page 12 of 300', '12/300'...
+_ARABIC_PAGE_NUMBER = re.compile(r'^[-–—\s]*(?:page\s+)?\d+(?:\s*(?:of|/)\s*\d+)?[-–—\s]*$', re.IGNORECASE)
+# ...or a canonical roman numeral of at least one character: 'xii', '- XII -', 'Page iv'.
+_ROMAN_PAGE_NUMBER = re.compile(
+    r'^[-–—\s]*(?:page\s+)?(?=[ivxlcdm])(m{0,3}(?:c[md]|d?c{0,3})(?:x[cl]|l?x{0,3})(?:i[xv]|v?i{0,3}))[-–—\s]*$',
+    re.IGNORECASE,
+)
+_ROMAN_VALUES = {'i': 1, 'v': 5, 'x': 10, 'l': 50, 'c': 100, 'd': 500, 'm': 1000}
+# A word broken at the end of a line: letters followed by a hyphen (not a dash between spaces).
+_HYPHENATED = re.compile(r'[^\W\d_]-$')
+_SENTENCE_END = re.compile(r'[.!?:;"”\')\]]$')
+
+
+class NormalizationReport:
+    """Size of the text before and after normalization, and what was removed."""
+
+    def __init__(self, chars_before, chars_after, tokens_before, tokens_after,
+                 header_lines_removed, page_numbers_removed, hyphens_joined):
+        self.chars_before = chars_before
+        self.chars_after = chars_after
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        self.header_lines_removed = header_lines_removed
+        self.page_numbers_removed = page_numbers_removed
+        self.hyphens_joined = hyphens_joined
+
+    @property
+    def chars_saved(self):
+        return self.chars_before - self.chars_after
+
+    @property
+    def tokens_saved(self):
+        return self.tokens_before - self.tokens_after
+
+    def __str__(self):
+        return (f"saved {self.chars_saved:,} characters (~{self.tokens_saved:,} tokens, "
+                f"{self.tokens_saved / max(self.tokens_before, 1):.0%})")
+
+
+def _roman_value(numeral):
+    values = [_ROMAN_VALUES[c] for c in numeral.lower()]
+    return sum(-v if v < next_v else v for v, next_v in zip(values, values[1:] + [0]))
+
+
+def _is_page_number(line, page_index):
+    """
+    Returns True if a line is a page number. Roman numerals also read as words ('vi', 'mix', 'Civil'),
+    so they must be in one case and no greater than the physical page number (roman numbering is for
+    front matter, which can't run ahead of the page count).
+    """
+    if _ARABIC_PAGE_NUMBER.match(line):
+        return True
+    match = _ROMAN_PAGE_NUMBER.match(line)
+    if match is None:
+        return False
+    numeral = match.group(1)
+    return (numeral.islower() or numeral.isupper()) and _roman_value(numeral) <= page_index + 1
+
+
+def _line_key(line):
+    """Header/footer identity of a line: case-folded, with numbers masked (e.g. 'Chapter 3 | 41')."""
+    return _DIGITS.sub('#', line.casefold())
+
+
+def _edge_indices(lines):
+    """Indices of the first and last EDGE_LINES lines of a page."""
+    n = len(lines)
+    return set(range(min(EDGE_LINES, n))) | set(range(max(n - EDGE_LINES, 0), n))
+
+
+def _repeated_edge_lines(pages_lines, min_fraction):
+    """Returns the keys of lines that appear at the edge of at least min_fraction of the pages."""
+    if len(pages_lines) < 3:
+        return set()
+    counts = Counter()
+    for lines in pages_lines:
+        counts.update({_line_key(lines[i]) for i in _edge_indices(lines) if len(lines[i]) <= MAX_HEADER_CHARS})
+    threshold = max(2, int(min_fraction * len(pages_lines) + 0.5))
+    return {key for key, count in counts.items() if count >= threshold}
+
+
+def _join(left, right):
+    """Joins two pieces of running text, re-joining a word hyphenated across the break."""
+    if _HYPHENATED.search(left) and right[:1].islower():
+        return left[:-1] + right, True
+    return f"{left} {right}", False
+
+
+def _paragraphs(lines):
+    """
+    Rebuilds the paragraphs of one page from its lines.
+
+    A paragraph ends at a blank line, or at a line that ends a sentence and is
+    clearly shorter than the page's typical line (the last line of a paragraph).
+    """
+    lengths = sorted(len(line) for line in lines if line)
+    typical = lengths[len(lengths) * 3 // 4] if lengths else 0
+
+    paragraphs, current, hyphens = [], '', 0
+    for line in lines:
+        if not line:
+            if current:
+                paragraphs.append(current)
+                current = ''
+            continue
+        if current:
+            current, joined = _join(current, line)
+            hyphens += joined
+        else:
+            current = line
+        if _SENTENCE_END.search(line) and len(line) < 0.8 * typical:
+            paragraphs.append(current)
+            current = ''
+    if current:
+        paragraphs.append(current)
+    return paragraphs, hyphens
+
+
+def normalize_pages(pages, min_repeat_fraction=0.5):
+    """
+    Normalizes the extracted text of a document's pages.
+
+    Args:
+        pages (list): Extracted text of each page, in page order.
+        min_repeat_fraction (float): Fraction of pages an edge line must appear on to count
+            as a running header or footer.
+
+    Returns:
+        tuple: The normalized text (paragraphs separated by blank lines) and a NormalizationReport.
+    """
+    raw = '\n'.join(pages)
+    pages_lines = [[_WHITESPACE.sub(' ', line).strip() for line in page.splitlines()] for page in pages]
+    repeated = _repeated_edge_lines([[line for line in lines if line] for lines in pages_lines], min_repeat_fraction)
+
+    header_lines = page_numbers = hyphens = 0
+    paragraphs = []
+    for page_index, lines in enumerate(pages_lines):
+        content = [i for i, line in enumerate(lines) if line]
+        edges = {content[i] for i in _edge_indices(content)}
+        kept = []
+        for i, line in enumerate(lines):
+            if i in edges and _is_page_number(line, page_index):
+                page_numbers += 1
+            elif i in edges and _line_key(line) in repeated:
+                header_lines += 1
+            else:
+                kept.append(line)
+
+        page_paragraphs, page_hyphens = _paragraphs(kept)
+        hyphens += page_hyphens
+        if not page_paragraphs:
+            continue
+        # A paragraph that runs over the page break continues the previous page's last paragraph.
+        if paragraphs and not _SENTENCE_END.search(paragraphs[-1]) and page_paragraphs[0][:1].islower():
+            paragraphs[-1], joined = _join(paragraphs[-1], page_paragraphs.pop(0))
+            hyphens += joined
+        paragraphs.extend(page_paragraphs)
+
+    text = '\n\n'.join(paragraphs)
+    report = NormalizationReport(len(raw), len(text), estimate_tokens(raw), estimate_tokens(text),
+                                 header_lines, page_numbers, hyphens)
+    print(f"DEBUG: Normalized {len(pages)} pages: {report} "
+          f"({header_lines} header/footer lines, {page_numbers} page numbers, {hyphens} hyphenations)")
+    return text, report